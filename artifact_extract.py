@@ -654,7 +654,7 @@ def main():
 
     # Use artifact-specific offsets (independent of fact extraction offsets)
     # We temporarily swap the offset file to use our own
-    from extract import _parse_all_messages, CONTEXT_OVERLAP
+    from extract import _parse_all_messages, _format_messages, CONTEXT_OVERLAP
 
     # Pre-filter: compress transcript for artifact extraction
     artifact_filter = None
@@ -708,15 +708,11 @@ def main():
         # Build transcript with context separator
         parts = []
         if context_msgs:
-            parts.append("[--- CONTEXT FROM PREVIOUS EXTRACTION (for reference only, already processed) ---]")
-            for m in context_msgs:
-                parts.append(f"[{m['role']}]: {m['content']}")
-            parts.append("")
-            parts.append("[--- NEW MESSAGES BELOW (extract artifacts from these) ---]")
-            parts.append("")
-
-        for m in new_msgs:
-            parts.append(f"[{m['role']}]: {m['content']}")
+            parts += ["[--- CONTEXT FROM PREVIOUS EXTRACTION (for reference only, already processed) ---]",
+                      _format_messages(context_msgs), "",
+                      "[--- NEW MESSAGES BELOW (extract artifacts from these) ---]", ""]
+        if new_msgs:
+            parts.append(_format_messages(new_msgs))
 
         transcript = "\n\n".join(parts)
         new_end_offset = all_messages[-1]["index"]
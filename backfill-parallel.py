@@ -7,10 +7,10 @@ DB writes happen sequentially on the main thread (SQLite is single-writer).
 Usage:
     caffeinate -is python3 backfill-parallel.py          # Default 10 workers
     caffeinate -is python3 backfill-parallel.py -w 15    # 15 workers
+    caffeinate -is python3 backfill-parallel.py -b 3     # 3 sessions per API request
 """
 
 import argparse
-import json
 import os
 import sys
 import time
@@ -40,24 +40,10 @@ def log(msg: str):
 
 
 def read_session_transcript(path: Path) -> str:
-    messages = []
-    with open(path) as f:
-        for line in f:
-            try:
-                msg = json.loads(line)
-                role = msg.get("type", "")
-                if role not in ("user", "assistant"):
-                    continue
-                inner = msg.get("message", {})
-                content = inner.get("content", "") if isinstance(inner, dict) else ""
-                if isinstance(content, list):
-                    text_parts = [c.get("text", "") for c in content if isinstance(c, dict) and c.get("type") == "text"]
-                    content = "\n".join(text_parts)
-                if content:
-                    messages.append(f"[{role}]: {content}")
-            except json.JSONDecodeError:
-                continue
-    return "\n\n".join(messages[-50:])
+    # extract.py's parser (binary reads, orjson when installed); last 50 messages
+    # to stay within model limits
+    messages = extract._parse_all_messages(str(path))[-50:]
+    return extract._format_messages(messages)
 
 
 def get_session_date(path: Path) -> str:
@@ -74,8 +60,8 @@ def get_project_name(path: Path) -> str:
     return "unknown"
 
 
-def extract_from_session(idx: int, total: int, path: Path, model: str) -> dict:
-    """Call the extraction API (parallel-safe, no DB access)."""
+def prepare_session(idx: int, total: int, path: Path) -> dict:
+    """Read and truncate one session's transcript (no API or DB access)."""
     proj = get_project_name(path)
     date = get_session_date(path)
     size = path.stat().st_size
@@ -91,15 +77,12 @@ def extract_from_session(idx: int, total: int, path: Path, model: str) -> dict:
     if len(transcript) > 50000:
         transcript = transcript[-50000:]
 
-    try:
-        extractions = extract.call_extraction_model(transcript, model)
-    except SystemExit:
-        log(f"[{idx}/{total}] FAILED (extraction error)")
-        return {"status": "failed", "idx": idx}
-    except Exception as e:
-        log(f"[{idx}/{total}] FAILED ({e})")
-        return {"status": "failed", "idx": idx}
+    return {"status": "ready", "idx": idx, "transcript": transcript, "source": source, "date": date}
+
 
+def finish_session(prepared: dict, total: int, extractions: dict) -> dict:
+    """Classify one session's extraction result."""
+    idx = prepared["idx"]
     n = sum(len(extractions.get(k, [])) for k in ('entities', 'facts', 'relations', 'decisions'))
     if n == 0:
         log(f"[{idx}/{total}] Skipped (nothing extracted)")
@@ -110,17 +93,49 @@ def extract_from_session(idx: int, total: int, path: Path, model: str) -> dict:
         "idx": idx,
         "total": total,
         "extractions": extractions,
-        "source": source,
-        "date": date,
+        "source": prepared["source"],
+        "date": prepared["date"],
     }
 
 
+def extract_from_sessions(batch: list[tuple[int, Path]], total: int, model: str) -> list[dict]:
+    """Call the extraction API for a batch of sessions (parallel-safe, no DB access).
+
+    Batches larger than one session share a single request via
+    extract.call_extraction_model_multi().
+    """
+    results = []
+    ready = []
+    for idx, path in batch:
+        prepared = prepare_session(idx, total, path)
+        (ready if prepared["status"] == "ready" else results).append(prepared)
+    if not ready:
+        return results
+
+    try:
+        all_extractions = extract.call_extraction_model_multi([p["transcript"] for p in ready], model)
+    except SystemExit:
+        for p in ready:
+            log(f"[{p['idx']}/{total}] FAILED (extraction error)")
+        return results + [{"status": "failed", "idx": p["idx"]} for p in ready]
+    except Exception as e:
+        for p in ready:
+            log(f"[{p['idx']}/{total}] FAILED ({e})")
+        return results + [{"status": "failed", "idx": p["idx"]} for p in ready]
+
+    for p, extractions in zip(ready, all_extractions):
+        results.append(finish_session(p, total, extractions))
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(description="Parallel backfill from historical sessions")
     parser.add_argument('-w', '--workers', type=int, default=10, help='Parallel workers (default: 10)')
     parser.add_argument('--model', '-m', default=extract.DEFAULT_MODEL)
     parser.add_argument('--min-size', type=int, default=MIN_SIZE)
     parser.add_argument('--dry-run', '-n', action='store_true')
+    parser.add_argument('-b', '--batch-size', type=int, default=1,
+                        help='Sessions per API request (default: 1)')
     args = parser.parse_args()
 
     sessions = []
@@ -150,30 +165,33 @@ def main():
     # Single DB connection for all writes (main thread only)
     db = extract.get_db()
 
+    numbered = list(enumerate(sessions, 1))
+    batch_size = max(1, args.batch_size)
+    batches = [numbered[i:i + batch_size] for i in range(0, total, batch_size)]
+
     with ThreadPoolExecutor(max_workers=args.workers) as pool:
-        futures = {
-            pool.submit(extract_from_session, i + 1, total, path, args.model): path
-            for i, path in enumerate(sessions)
-        }
+        futures = [
+            pool.submit(extract_from_sessions, batch, total, args.model)
+            for batch in batches
+        ]
 
         for future in as_completed(futures):
-            result = future.result()
-
-            if result["status"] == "extracted":
-                # Write to DB on main thread — no lock contention
-                try:
-                    stats = extract.upsert_extractions(
-                        db, result["extractions"], result["source"], result["date"]
-                    )
-                    log(f"[{result['idx']}/{total}] OK: {stats['entities']}e {stats['facts']}f {stats['relations']}r {stats['decisions']}d ({stats['superseded']} superseded)")
-                    succeeded += 1
-                except Exception as e:
-                    log(f"[{result['idx']}/{total}] FAILED writing DB ({e})")
+            for result in future.result():
+                if result["status"] == "extracted":
+                    # Write to DB on main thread — no lock contention
+                    try:
+                        stats = extract.upsert_extractions(
+                            db, result["extractions"], result["source"], result["date"]
+                        )
+                        log(f"[{result['idx']}/{total}] OK: {stats['entities']}e {stats['facts']}f {stats['relations']}r {stats['decisions']}d ({stats['superseded']} superseded)")
+                        succeeded += 1
+                    except Exception as e:
+                        log(f"[{result['idx']}/{total}] FAILED writing DB ({e})")
+                        failed += 1
+                elif result["status"] == "failed":
                     failed += 1
-            elif result["status"] == "failed":
-                failed += 1
-            else:
-                skipped += 1
+                else:
+                    skipped += 1
 
     db.close()
 
@@ -12,7 +12,6 @@ Usage:
 """
 
 import argparse
-import json
 import os
 import sys
 import time
@@ -43,28 +42,10 @@ def log(msg: str):
 
 def read_session_transcript(path: Path) -> str:
     """Read a session JSONL and return the transcript text."""
-    messages = []
-    with open(path) as f:
-        for line in f:
-            try:
-                msg = json.loads(line)
-                role = msg.get("type", "")
-                if role not in ("user", "assistant"):
-                    continue
-
-                inner = msg.get("message", {})
-                content = inner.get("content", "") if isinstance(inner, dict) else ""
-
-                if isinstance(content, list):
-                    text_parts = [c.get("text", "") for c in content if isinstance(c, dict) and c.get("type") == "text"]
-                    content = "\n".join(text_parts)
-                if content:
-                    messages.append(f"[{role}]: {content}")
-            except json.JSONDecodeError:
-                continue
-
-    # Take last 50 messages to stay within model limits
-    return "\n\n".join(messages[-50:])
+    # extract.py's parser (binary reads, orjson when installed); last 50 messages
+    # to stay within model limits
+    messages = extract._parse_all_messages(str(path))[-50:]
+    return extract._format_messages(messages)
 
 
 def find_all_sessions(min_size: int = MIN_SIZE) -> list[tuple[Path, int, float]]:
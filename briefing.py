@@ -9,30 +9,32 @@ import sqlite3
 import os
 from datetime import datetime, timezone
 
-from config import (get_db_path, get_brief_path, get_domains, get_domain_order,
-                    get_briefing_key_entities, get_briefing_key_attrs)
+from config import (get_db_path, get_brief_path, get_domain_order,
+                    get_briefing_key_entities, get_briefing_key_attrs,
+                    detect_domain as _config_detect_domain)
 
 DB_PATH = str(get_db_path())
 BRIEF_PATH = str(get_brief_path())
-DOMAIN_RULES = get_domains()
 DOMAIN_ORDER = get_domain_order()
 
 
 def detect_domain(source: str) -> str:
     """Map a source string to a domain name."""
-    source_lower = source.lower()
-    for domain, patterns in DOMAIN_RULES:
-        for pat in patterns:
-            if pat.lower() in source_lower:
-                return domain
-    return "Other"
+    return _config_detect_domain(source) or "Other"
+
+
+def _write_brief(text: str):
+    """Replace BRIEF.md atomically, so overlapping regenerations can't interleave."""
+    tmp_path = f"{BRIEF_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, BRIEF_PATH)
 
 
 def generate():
     if not os.path.exists(DB_PATH):
-        with open(BRIEF_PATH, 'w') as f:
-            f.write("<!-- Auto-generated by knowledge-base. Do not edit manually. -->\n")
-            f.write("# Knowledge Brief\n\nNo facts recorded yet.\n")
+        _write_brief("<!-- Auto-generated by knowledge-base. Do not edit manually. -->\n"
+                     "# Knowledge Brief\n\nNo facts recorded yet.\n")
         return
 
     db = sqlite3.connect(DB_PATH)
@@ -186,8 +188,7 @@ def generate():
 
     db.close()
 
-    with open(BRIEF_PATH, 'w') as f:
-        f.write('\n'.join(lines) + '\n')
+    _write_brief('\n'.join(lines) + '\n')
 
     print(f"Generated {BRIEF_PATH} ({len(lines)} lines, {entity_count} entities, {fact_count} facts)")
 
@@ -17,7 +17,9 @@ Usage:
 
 import json
 import os
+import re
 import sys
+import threading
 from pathlib import Path
 
 # --- Defaults ---
@@ -34,10 +36,27 @@ DEFAULTS = {
     "extraction_model": "qwen/qwen3.5-397b-a17b",
     "reconciliation_model": "google/gemini-3.1-flash-lite-preview",
     "http_referer": "",
+    "api_max_attempts": 5,
     "context_overlap": 10,
+    "context_summary": True,
+    "json_response_format": True,
     "max_transcript_chars": 50000,
+    "max_transcript_chunks": 1,
+    "max_transcript_tokens": 0,
+    "tokenizer_encoding": "cl100k_base",
+    "batch_max_chars": 40000,
+    "min_extraction_chars": 500,
+    "session_idle_seconds": 300,
+    "domain_context_tokens": 2000,
+    "sqlite_cache_size": -65536,
+    "sqlite_mmap_size": 268435456,
     "artifact_max_transcript_chars": 60000,
     "reconciliation_batch_size": 15,
+    "reconciliation_call_size": 8,
+    "ship_commit_match_ratio": 0.8,
+    "state_cache_ttl": 120,
+    "llm_cache_ttl": 3600,
+    "extraction_cache_days": 30,
     "context_frame_ttl_hours": 6,
     "daemon_max_per_run": 5,
     "backfill_min_session_size": 10000,
@@ -177,6 +196,21 @@ def get_session_offsets_file() -> Path:
     return get_kb_dir() / ".session-offsets.json"
 
 
+def get_domain_context_dir() -> Path:
+    """Directory of cached per-domain extraction context blocks."""
+    return get_kb_dir() / ".domain-context"
+
+
+def get_state_cache_dir() -> Path:
+    """Directory of short-lived cached system-state loads (Konban, Brain, git, ...)."""
+    return get_kb_dir() / ".state-cache"
+
+
+def get_llm_cache_dir() -> Path:
+    """Directory of cached reconciliation/consistency model results."""
+    return get_kb_dir() / ".llm-cache"
+
+
 def get_artifact_offsets_file() -> Path:
     """Path to .artifact-offsets.json."""
     return get_kb_dir() / ".artifact-offsets.json"
@@ -212,6 +246,11 @@ def get_backfill_log() -> Path:
     return get_kb_dir() / "backfill.log"
 
 
+def get_briefing_log() -> Path:
+    """Path to briefing.log (output of detached BRIEF.md regeneration)."""
+    return get_kb_dir() / "briefing.log"
+
+
 # --- Tool paths ---
 
 def get_konban_script() -> Path | None:
@@ -256,13 +295,26 @@ def get_recall_script() -> Path | None:
 
 # --- API key ---
 
+_api_key_cache = None
+
+
 def get_api_key() -> str:
     """Get OpenRouter API key from configured sources.
 
     Checks sources in order:
     1. OPENROUTER_API_KEY environment variable
     2. Each path in openrouter_api_key_sources config
+
+    The resolved key is cached for the life of the process.
     """
+    global _api_key_cache
+    if _api_key_cache is None:
+        _api_key_cache = _find_api_key()
+    return _api_key_cache
+
+
+def _find_api_key() -> str:
+    """Resolve the API key from env/config sources (uncached)."""
     # Check env first (always)
     key = os.environ.get("OPENROUTER_API_KEY")
     if key:
@@ -314,13 +366,36 @@ def get_domains() -> list[tuple[str, list[str]]]:
     return result
 
 
+_domain_matchers_cache = None  # (config it was built from, [(name, compiled regex)])
+
+
+def _domain_matchers() -> list:
+    """Domain rules compiled to one regex alternation per domain.
+
+    Rebuilt only when the config is reloaded, so per-row callers (e.g.
+    migrate-domains.py) don't re-parse the rules and patterns every call.
+    """
+    global _domain_matchers_cache
+    config = load_config()
+    if _domain_matchers_cache is None or _domain_matchers_cache[0] is not config:
+        matchers = [
+            (name, re.compile("|".join(re.escape(p.lower()) for p in patterns)))
+            for name, patterns in get_domains() if patterns
+        ]
+        _domain_matchers_cache = (config, matchers)
+    return _domain_matchers_cache[1]
+
+
 def detect_domain(path: str) -> str | None:
-    """Detect domain from a session path using configured rules."""
+    """Detect domain from a session path using configured rules.
+
+    Domains are tried in configured order; the first with a pattern
+    occurring in the (lowercased) path wins.
+    """
     path_lower = path.lower() if path else ""
-    for name, patterns in get_domains():
-        for pattern in patterns:
-            if pattern.lower() in path_lower:
-                return name
+    for name, matcher in _domain_matchers():
+        if matcher.search(path_lower):
+            return name
     return None
 
 
@@ -413,3 +488,146 @@ def get_username_path_segment() -> str:
     home = str(Path.home())
     # /Users/jdoe → -Users-jdoe-
     return home.replace("/", "-") + "-"
+
+
+# --- Log files ---
+
+def tail_lines(path, n: int, block: int = 8192) -> list[str]:
+    """Last `n` lines of a text file (trailing blank lines ignored), read from the end.
+
+    Reads a growing window from the end of the file instead of the whole
+    (append-only, unrotated) log. Undecodable bytes are replaced.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        window = block
+        while True:
+            start = max(0, size - window)
+            f.seek(start)
+            text = f.read().decode("utf-8", errors="replace").rstrip()
+            lines = text.split("\n") if text else []
+            # The first line of a partial window may be cut mid-line (or
+            # mid-character); it is never among the lines returned
+            if start == 0 or len(lines) > n:
+                return lines[-n:]
+            window *= 2
+
+
+# --- In-process stages ---
+
+def run_in_process(fn, *args) -> int:
+    """Call a script entry point in this interpreter; returns its exit code.
+
+    SystemExit maps to its code (a message exits 1, as the interpreter would)
+    and an uncaught exception is printed and exits 1, so callers see the same
+    result as running the script as a subprocess.
+    """
+    import traceback
+    try:
+        fn(*args)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+    return 0
+
+
+# --- HTTP ---
+
+# Idle keep-alive connections per (scheme, host, proxy). Threads check one out
+# per request, and later requests in the same process (batches, in-process
+# pipeline stages) reuse them instead of paying a new TCP + TLS handshake.
+_http_idle: dict[tuple, list] = {}
+_http_lock = threading.Lock()
+
+
+def _http_proxy(parts) -> str | None:
+    """Proxy URL for a request, from the same env/system settings urllib uses."""
+    import urllib.request
+    if urllib.request.proxy_bypass(parts.hostname or ""):
+        return None
+    return urllib.request.getproxies().get(parts.scheme)
+
+
+def _http_connect(parts, proxy: str | None, timeout: float):
+    """New connection for `parts` (direct, or via an HTTP proxy); returns (conn, extra headers)."""
+    import http.client
+    from urllib.parse import unquote, urlsplit
+
+    https = parts.scheme == "https"
+    if not proxy:
+        cls = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        return cls(parts.netloc, timeout=timeout), {}
+    p = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    auth = {}
+    if p.username:
+        import base64
+        token = base64.b64encode(f"{unquote(p.username)}:{unquote(p.password or '')}".encode()).decode()
+        auth = {"Proxy-Authorization": f"Basic {token}"}
+    if https:
+        # CONNECT tunnel through the proxy; TLS is negotiated with the target host
+        conn = http.client.HTTPSConnection(p.hostname, p.port or 80, timeout=timeout)
+        conn.set_tunnel(parts.hostname, parts.port or 443, headers=auth)
+        return conn, {}
+    return http.client.HTTPConnection(p.hostname, p.port or 80, timeout=timeout), auth
+
+
+def http_post(url: str, payload: bytes, headers: dict, timeout: float = 120,
+              read=None) -> tuple[int, bytes, "http.client.HTTPMessage"]:
+    """POST over a pooled keep-alive HTTP(S) connection; returns (status, body, headers).
+
+    Honors HTTP(S)_PROXY / NO_PROXY like urllib (plain-HTTP proxies, CONNECT
+    for https). Redirects are not followed: a 3xx comes back as-is. `read`,
+    if given, consumes a 200 response in place of resp.read() and its return
+    value becomes the body; it must read to EOF so the connection can be
+    reused. `headers` of the result is the response's HTTPMessage
+    (case-insensitive lookups). A request on a connection the server already
+    dropped is retried once on a fresh one. Network failures raise OSError or
+    http.client.HTTPException.
+    """
+    # Imported here: http.client pulls in email/ssl (~20ms), which --help,
+    # --dry-run, cache hits and DB-only callers never need
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    proxy = _http_proxy(parts)
+    key = (parts.scheme, parts.netloc, proxy)
+    # Through a plain-HTTP proxy the request line carries the absolute URL
+    path = url if proxy and parts.scheme == "http" else parts.path + (f"?{parts.query}" if parts.query else "")
+    for attempt in (1, 2):
+        with _http_lock:
+            idle = _http_idle.get(key)
+            pooled = idle.pop() if idle else None
+        reused = pooled is not None
+        if reused:
+            conn, extra = pooled
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        else:
+            conn, extra = _http_connect(parts, proxy, timeout)
+        try:
+            conn.request("POST", path, body=payload, headers={**headers, **extra})
+            resp = conn.getresponse()
+            status = resp.status
+            body = read(resp) if read is not None and status == 200 else resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused or attempt == 2:
+                raise
+            continue
+        except BaseException:  # incl. errors from `read`; never pool a half-read socket
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            with _http_lock:
+                _http_idle.setdefault(key, []).append((conn, extra))
+        return status, body, resp.headers
@@ -526,6 +526,9 @@ def execute_create_linear_issue(action: dict, dry_run: bool) -> dict:
     exit_code, stdout, stderr = run_command(cmd, timeout=30)
     result = {"status": "success" if exit_code == 0 else "failed",
               "exit_code": exit_code, "title": title}
+    if exit_code == 0 and _linear_all_cache is not None:
+        # Add to cache so subsequent creates in the same run also dedup against it
+        _linear_all_cache.append(title)
     if stdout:
         result["output"] = stdout
     if stderr:
@@ -1519,7 +1522,7 @@ def generate_review(report: dict = None) -> str:
     return review
 
 
-def main():
+def main(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(description="Reconciliation pipeline executor")
     input_group = parser.add_mutually_exclusive_group()
     input_group.add_argument("--plan", "-p", help="Action plan JSON file")
@@ -1529,7 +1532,7 @@ def main():
     parser.add_argument("--dry-run", "-n", action="store_true", help="Log actions without executing")
     parser.add_argument("--output", "-o", help="Save execution report to JSON file")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.review:
         review = generate_review()
@@ -1546,18 +1549,29 @@ def main():
         parser.print_help()
         return
 
+    run_plan(plan, dry_run=args.dry_run, output=args.output)
+
+
+def run_plan(plan: dict, dry_run: bool = False, output: str = None) -> dict:
+    """Execute an action plan, print its review and optionally save the report."""
+    global _konban_all_cache, _linear_all_cache
+    # The dedup caches are per run; pipeline_reconcile.py keeps this module
+    # loaded across batches, so titles created by earlier runs must be reloaded
+    _konban_all_cache = _linear_all_cache = None
+
     # Execute
-    report = execute_plan(plan, dry_run=args.dry_run)
+    report = execute_plan(plan, dry_run=dry_run)
 
     # Generate review
     review = generate_review(report)
     print(review)
 
     # Save report
-    if args.output:
-        with open(args.output, "w") as f:
+    if output:
+        with open(output, "w") as f:
             json.dump(report, f, indent=2, default=str)
-        print(f"\nReport saved to {args.output}")
+        print(f"\nReport saved to {output}")
+    return report
 
 
 if __name__ == "__main__":
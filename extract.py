@@ -14,25 +14,74 @@ API key: Set OPENROUTER_API_KEY env var, or create ~/.claude/secrets/openrouter.
 """
 
 import argparse
+import hashlib
 import json
+import mmap
+import operator
 import os
+import random
+import re
+import secrets
 import sqlite3
 import sys
-import uuid
-import urllib.request
-import urllib.error
-from datetime import datetime, timezone
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from config import (get_db_path, get_session_offsets_file, get_openrouter_url,
+try:
+    import orjson  # Optional: faster JSON for transcript parsing and API payloads
+except ImportError:
+    orjson = None
+
+try:
+    import tiktoken  # Optional: token-accurate transcript truncation (max_transcript_tokens)
+except ImportError:
+    tiktoken = None
+
+try:
+    import fcntl  # Unix only: serializes concurrent offset-file updates
+except ImportError:
+    fcntl = None
+
+from config import (get_db_path, get_session_offsets_file, get_domain_context_dir,
+                    get_openrouter_url,
                     get_extraction_model, get_api_key, get_http_referer,
-                    detect_domain as _config_detect_domain, cfg)
+                    detect_domain as _config_detect_domain, cfg, http_post)
+from search_index import ensure_search_index
 
 DB_PATH = str(get_db_path())
 SESSION_OFFSETS_FILE = str(get_session_offsets_file())
+DOMAIN_CONTEXT_DIR = get_domain_context_dir()
 OPENROUTER_URL = get_openrouter_url()
 DEFAULT_MODEL = get_extraction_model()
 CONTEXT_OVERLAP = cfg("context_overlap", 10)
+MAX_TRANSCRIPT_CHARS = cfg("max_transcript_chars", 50000)
+# Windows of MAX_TRANSCRIPT_CHARS extracted per transcript; beyond one, long
+# sessions are chunked (with overlap) instead of losing everything but the tail
+MAX_TRANSCRIPT_CHUNKS = max(1, cfg("max_transcript_chunks", 1))
+TRANSCRIPT_CHAR_BUDGET = MAX_TRANSCRIPT_CHARS * MAX_TRANSCRIPT_CHUNKS
+# Token budget for the transcript tail (0 = off); needs tiktoken, else the char cap alone applies
+MAX_TRANSCRIPT_TOKENS = cfg("max_transcript_tokens", 0)
+BATCH_MAX_CHARS = cfg("batch_max_chars", 40000)  # Per request in --all-new-sessions
+API_MAX_ATTEMPTS = max(1, cfg("api_max_attempts", 5))  # Per request, including the first
+# Incremental windows with less new text than this wait for the next run, unless
+# the session has been idle SESSION_IDLE_SECONDS (finished: nothing more is coming)
+MIN_EXTRACTION_CHARS = cfg("min_extraction_chars", 500)
+EXTRACTION_CACHE_DAYS = cfg("extraction_cache_days", 30)  # Cached model responses kept this long
+SESSION_IDLE_SECONDS = cfg("session_idle_seconds", 300)
+EXIT_DEFERRED = 3  # --session window too small to extract yet; offset not advanced
+# Prompt budget for the known-entities block (0 = only the max_entities cap); counted
+# with tiktoken when installed, else estimated at ~4 chars per token
+DOMAIN_CONTEXT_TOKENS = cfg("domain_context_tokens", 2000)
+# Incremental runs send facts already extracted from the session instead of raw overlap messages
+CONTEXT_SUMMARY = cfg("context_summary", True)
+# Request JSON mode for single-transcript extraction (batched answers are arrays, which it can't express)
+JSON_RESPONSE_FORMAT = cfg("json_response_format", True)
+SQLITE_CACHE_SIZE = cfg("sqlite_cache_size", -65536)  # Negative = KiB (64 MB)
+SQLITE_MMAP_SIZE = cfg("sqlite_mmap_size", 268435456)  # Bytes; 0 disables mmap reads
 
 SYSTEM_PROMPT = """You are a knowledge extraction system for a solopreneur's personal knowledge base. Your job: extract knowledge that has NO OTHER QUERYABLE CANONICAL SOURCE.
 
@@ -203,12 +252,82 @@ def detect_session_domain(session_path: str) -> str:
     return _config_detect_domain(session_path)
 
 
+# (domain, max_entities) -> context block; cleared whenever upsert_extractions writes.
+# Bounded like lru_cache(maxsize=32) so a long-lived batch process can't grow it unchecked.
+_domain_context_cache = {}
+_DOMAIN_CONTEXT_CACHE_SIZE = 32
+
+
 def load_domain_context(db: sqlite3.Connection, domain: str, max_entities: int = 100) -> str:
     """Load known entities in a domain for context-aware extraction.
 
     Returns a text block to inject into the extraction prompt so the model
-    reuses existing entity names and knows about existing facts.
+    reuses existing entity names and knows about existing facts. Cached per
+    domain, so a process extracting several sessions of the same domain
+    queries it once (until the next upsert_extractions).
+    """
+    key = (domain, max_entities)
+    if key in _domain_context_cache:
+        _domain_context_cache[key] = _domain_context_cache.pop(key)  # Mark most recently used
+        return _domain_context_cache[key]
+    if len(_domain_context_cache) >= _DOMAIN_CONTEXT_CACHE_SIZE:
+        del _domain_context_cache[next(iter(_domain_context_cache))]  # Evict least recently used
+    _domain_context_cache[key] = _load_domain_context_file(db, domain, max_entities)
+    return _domain_context_cache[key]
+
+
+def _domain_context_signature(db: sqlite3.Connection) -> str:
+    """Fingerprint of the tables the domain context is built from.
+
+    Changes on any insert, delete or entity touch (max rowid, counts, latest
+    updated_at), and on facts ended in place (`kb delete-fact` only sets
+    valid_to), via the current-fact count. MAX(rowid) is a B-tree end lookup;
+    the COUNT(*)s still walk every entry, but of the smallest covering index
+    (idx_facts_current for current facts) rather than the table rows.
+    """
+    row = db.execute("""
+        SELECT (SELECT COALESCE(MAX(updated_at), '') FROM entities),
+               (SELECT COUNT(*) FROM entities),
+               (SELECT COALESCE(MAX(rowid), 0) FROM facts),
+               (SELECT COUNT(*) FROM facts),
+               (SELECT COUNT(*) FROM facts WHERE valid_to IS NULL),
+               (SELECT COUNT(*) FROM entity_domains)
+    """).fetchone()
+    return "|".join(str(v) for v in row)
+
+
+def _load_domain_context_file(db: sqlite3.Connection, domain: str, max_entities: int) -> str:
+    """Domain context from the on-disk cache, rebuilt when the DB has changed.
+
+    Each file starts with a `# sig=...` line; a stale or unreadable file is
+    regenerated. Write failures only cost the cache, never the extraction.
     """
+    try:
+        sig = _domain_context_signature(db)
+    except sqlite3.OperationalError:
+        return _build_domain_context(db, domain, max_entities)  # No entity_domains table yet
+    header = f"# sig={sig} max_entities={max_entities} tokens={DOMAIN_CONTEXT_TOKENS}\n"
+    path = DOMAIN_CONTEXT_DIR / (re.sub(r"[^\w.-]", "_", domain) + ".txt")
+    try:
+        cached = path.read_text()
+        if cached.startswith(header):
+            return cached[len(header):]
+    except OSError:
+        pass
+
+    context = _build_domain_context(db, domain, max_entities)
+    try:
+        DOMAIN_CONTEXT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(header + context)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return context
+
+
+def _build_domain_context(db: sqlite3.Connection, domain: str, max_entities: int) -> str:
+    """Query the domain's top entities and their latest facts (uncached)."""
     # Check if entity_domains table exists
     has_table = db.execute(
         "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='entity_domains'"
@@ -232,90 +351,231 @@ def load_domain_context(db: sqlite3.Connection, domain: str, max_entities: int =
     if not entities:
         return ""
 
-    lines = [f"Known entities in the '{domain}' domain (reuse these names exactly):"]
+    # Top 3 current facts per entity, fetched in one windowed query
+    ids = [e['id'] for e in entities]
+    placeholders = ",".join("?" * len(ids))
+    facts_by_entity = defaultdict(list)
+    for f in db.execute(f"""
+        SELECT entity_id, attribute, value FROM (
+            SELECT entity_id, attribute, value,
+                   ROW_NUMBER() OVER (PARTITION BY entity_id ORDER BY created_at DESC) AS rn
+            FROM facts
+            WHERE valid_to IS NULL AND entity_id IN ({placeholders})
+        ) WHERE rn <= 3
+        ORDER BY entity_id, rn
+    """, ids):
+        facts_by_entity[f['entity_id']].append(f)
+
+    header = f"Known entities in the '{domain}' domain (reuse these names exactly):"
+    footer = [
+        "",
+        "If a fact updates an existing value, use the SAME entity name and attribute",
+        "so the database supersedes the old value automatically.",
+        "Only create a new entity if it genuinely doesn't exist above.",
+    ]
+    # Entities come most-facts-first, so filling the budget greedily keeps the
+    # highest-signal ones; each line costs its tokens plus a newline
+    used = _count_tokens(header) + sum(_count_tokens(line) + 1 for line in footer)
+    lines = [header]
     for e in entities:
-        # Get top 3 facts for context
-        facts = db.execute("""
-            SELECT attribute, value FROM facts
-            WHERE entity_id = ? AND valid_to IS NULL
-            ORDER BY created_at DESC LIMIT 3
-        """, (e['id'],)).fetchall()
-
-        fact_str = ", ".join(f"{f['attribute']}={f['value'][:40]}" for f in facts)
+        facts = facts_by_entity.get(e['id'], ())
+        fact_str = ", ".join(f"{f['attribute']}={_shorten_value(f['value'])}" for f in facts)
         entry = f"- {e['name']} ({e['type']})"
         if fact_str:
             entry += f" [{fact_str}]"
+        if DOMAIN_CONTEXT_TOKENS:
+            used += _count_tokens(entry) + 1
+            if used > DOMAIN_CONTEXT_TOKENS and len(lines) > 1:
+                break
         lines.append(entry)
 
-    lines.append("")
-    lines.append("If a fact updates an existing value, use the SAME entity name and attribute")
-    lines.append("so the database supersedes the old value automatically.")
-    lines.append("Only create a new entity if it genuinely doesn't exist above.")
-
+    lines += footer
     return "\n".join(lines)
 
 
-def get_db():
+def get_db(read_only: bool = False):
+    """Open the knowledge DB (WAL, tuned caches, schema migrated).
+
+    `read_only` opens it through a mode=ro URI for dry runs: no journal-mode
+    switch, no migrations, and any accidental write fails loudly.
+    """
     if not os.path.exists(DB_PATH):
         print(f"Error: Database not found at {DB_PATH}", file=sys.stderr)
         sys.exit(2)
+    if read_only:
+        conn = sqlite3.connect(f"{Path(DB_PATH).as_uri()}?mode=ro", uri=True, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        return conn
     conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA busy_timeout=30000")
+    # NORMAL is durable under WAL except for the last commit on power loss,
+    # which extraction can simply redo; the rest keeps the entity index hot
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    _migrate_schema(conn)
     return conn
 
 
-def call_extraction_model(transcript: str, model: str = DEFAULT_MODEL, domain_context: str = "") -> dict:
-    """Call OpenRouter to extract structured knowledge from a transcript."""
-    api_key = get_api_key()
+def _migrate_schema(conn: sqlite3.Connection):
+    """Idempotent migrations for tables/indexes added after schema.sql.
+
+    - extraction_cache: model responses keyed by a hash of their inputs,
+      indexed by created_at for expiry
+    - idx_facts_source: facts by source, for load_source_summary()
+    - idx_relations_{from,to}_type: current relations by endpoint, ordered by
+      relation_type (kb.py query's ORDER BY), replacing the single-column
+      idx_relations_{from,to}
+    - idx_relations_{from,to}_entity: every relation (ended ones too) by
+      endpoint, for `kb query --history` and reconcile.py's entity merges,
+      which would otherwise scan relations
+    - UNIQUE index on lower(name) backing the entity UPSERT. Fails while
+      case-insensitive duplicate names exist (run reconcile.py to merge
+      them); until then new entities fall back to a plain INSERT and a
+      non-unique index on the same expression serves lookups.
+    - sqlite_stat1: a one-time ANALYZE so the planner has statistics for the
+      partial (valid_to IS NULL) indexes; PRAGMA optimize on close keeps
+      them current
+    - kb_fts: the trigram search index behind `kb search`
+      (search_index.ensure_search_index), built here so a read-only search
+      never has to
+
+    Either index turns `lower(name) = lower(?)` / `IN (lower(?), ...)`
+    lookups into B-tree searches instead of evaluating lower() per row.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            hash TEXT PRIMARY KEY,
+            result_json TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_extraction_cache_created ON extraction_cache(created_at)"
+    )
+    # The _dup fallback records a failed UNIQUE build, so it isn't retried
+    # (a full-table index build) on every connection; reconcile.py swaps in
+    # the UNIQUE index once it has merged the duplicates
+    has_fallback = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_entities_name_lower_dup'"
+    ).fetchone()
+    if not has_fallback:
+        try:
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_name_lower ON entities(lower(name))"
+            )
+        except sqlite3.IntegrityError:
+            print("Warning: duplicate entity names block idx_entities_name_lower "
+                  "(run reconcile.py to merge them)", file=sys.stderr)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entities_name_lower_dup ON entities(lower(name))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_source ON facts(source)")
+    for side in ("from", "to"):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_relations_{side}_type "
+            f"ON relations({side}_entity_id, relation_type) WHERE valid_to IS NULL"
+        )
+        conn.execute(f"DROP INDEX IF EXISTS idx_relations_{side}")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_relations_{side}_entity ON relations({side}_entity_id)"
+        )
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        conn.execute("ANALYZE")
+    ensure_search_index(conn)
+
+
+MULTI_TRANSCRIPT_PROMPT = """
+
+BATCH MODE:
+You will receive {count} transcripts, each introduced by a line `===TRANSCRIPT n===` (n = 1..{count}).
+Extract from each transcript independently — never carry entities or facts across transcripts.
+Respond with ONLY a JSON array of exactly {count} extraction objects (schema above), in transcript order."""
 
-    # Build user message with optional domain context
-    user_parts = []
-    if domain_context:
-        user_parts.append(domain_context)
-        user_parts.append("")
-    user_parts.append("Extract knowledge from this transcript:\n\n" + transcript)
 
-    payload = json.dumps({
+# Transient statuses worth retrying: timeout, rate limit, upstream/provider errors
+_RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def _retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Seconds to wait before retry `attempt`: Retry-After if given, else capped exponential + full jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), 120.0)
+        except ValueError:
+            pass  # HTTP-date form — fall back to backoff
+    return random.uniform(0, min(30.0, 2.0 ** attempt))
+
+
+def _request_completion(system_prompt: str, user_content: str, model: str,
+                        json_object: bool = False) -> str:
+    """POST one chat completion to OpenRouter and return the message content.
+
+    With `json_object` (and json_response_format enabled), asks the provider
+    for JSON mode; providers that ignore it are still covered by
+    _strip_response_wrappers().
+    """
+    import http.client
+
+    api_key = get_api_key()
+    referer = get_http_referer()
+
+    body = {
         "model": model,
         "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": "\n".join(user_parts)}
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
         ],
         "temperature": 0.3,
         "provider": {"data_collection": "deny"},
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        OPENROUTER_URL,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-            **({"HTTP-Referer": get_http_referer()} if get_http_referer() else {}),
-            "X-Title": "Knowledge Base Extraction",
-        },
-    )
-
-    try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        print(f"Error: OpenRouter API returned {e.code}: {body}", file=sys.stderr)
-        sys.exit(2)
-    except urllib.error.URLError as e:
-        print(f"Error: Could not reach OpenRouter: {e.reason}", file=sys.stderr)
+    }
+    if json_object and JSON_RESPONSE_FORMAT:
+        body["response_format"] = {"type": "json_object"}
+    payload = orjson.dumps(body) if orjson else json.dumps(body).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        **({"HTTP-Referer": referer} if referer else {}),
+        "X-Title": "Knowledge Base Extraction",
+    }
+
+    for attempt in range(1, API_MAX_ATTEMPTS + 1):
+        try:
+            status, raw, resp_headers = http_post(OPENROUTER_URL, payload, headers)
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == API_MAX_ATTEMPTS:
+                print(f"Error: Could not reach OpenRouter: {e}", file=sys.stderr)
+                sys.exit(2)
+            delay = _retry_delay(attempt)
+            print(f"OpenRouter unreachable ({e}), retry {attempt}/{API_MAX_ATTEMPTS - 1} in {delay:.1f}s",
+                  file=sys.stderr)
+        else:
+            if status not in _RETRYABLE_STATUSES or attempt == API_MAX_ATTEMPTS:
+                break
+            delay = _retry_delay(attempt, resp_headers.get("Retry-After"))
+            print(f"OpenRouter returned {status}, retry {attempt}/{API_MAX_ATTEMPTS - 1} in {delay:.1f}s",
+                  file=sys.stderr)
+        time.sleep(delay)
+
+    if status != 200:  # Redirects aren't followed: a 3xx body isn't a completion either
+        body = raw.decode("utf-8", errors="replace")
+        print(f"Error: OpenRouter API returned {status}: {body}", file=sys.stderr)
         sys.exit(2)
+    result = orjson.loads(raw) if orjson else json.loads(raw.decode("utf-8"))
 
     content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
     if not content:
         print("Error: Empty response from model", file=sys.stderr)
         print(f"Full response: {json.dumps(result, indent=2)}", file=sys.stderr)
         sys.exit(2)
+    return content
 
-    # Parse JSON from response (handle markdown fences, thinking tags, stray prefixes)
+
+def _strip_response_wrappers(content: str, opener: str = "{") -> str:
+    """Strip markdown fences, thinking tags and stray prefixes around a JSON response."""
     content = content.strip()
     if content.startswith("```"):
         content = content.split("\n", 1)[1]
@@ -324,19 +584,209 @@ def call_extraction_model(transcript: str, model: str = DEFAULT_MODEL, domain_co
         content = content.split("</think>")[-1].strip()
     if "<output>" in content:
         content = content.split("<output>")[1].split("</output>")[0].strip()
-    if not content.startswith("{"):
-        idx = content.find("{")
+    if not content.startswith(opener):
+        idx = content.find(opener)
         if idx >= 0:
             content = content[idx:]
+    return content
+
+
+def _json_loads(text: str | bytes):
+    """Parse JSON with orjson when installed.
+
+    Anything orjson rejects (NaN, integers beyond 64 bits) is retried with
+    the stdlib, so errors are still reported as json.JSONDecodeError.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def _json_dumps(obj) -> str:
+    """Compact JSON text, via orjson when installed (stdlib for what it can't encode)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj)
+
+
+def call_extraction_model(transcript: str, model: str = DEFAULT_MODEL, domain_context: str = "") -> dict:
+    """Call OpenRouter to extract structured knowledge from a transcript."""
+    # Build user message with optional domain context
+    user_parts = []
+    if domain_context:
+        user_parts.append(domain_context)
+        user_parts.append("")
+    user_parts.append("Extract knowledge from this transcript:\n\n" + transcript)
+
+    content = _request_completion(SYSTEM_PROMPT, "\n".join(user_parts), model, json_object=True)
+
+    # Parse JSON from response (handle markdown fences, thinking tags, stray prefixes)
+    content = _strip_response_wrappers(content)
 
     try:
-        return json.loads(content)
+        return _json_loads(content)
     except json.JSONDecodeError as e:
         print(f"Error parsing model response as JSON: {e}", file=sys.stderr)
         print(f"Raw response (first 500 chars):\n{content[:500]}", file=sys.stderr)
         sys.exit(2)
 
 
+def call_extraction_model_multi(transcripts: list[str], model: str = DEFAULT_MODEL,
+                                domain_context: str = "") -> list[dict]:
+    """Extract from several transcripts with a single OpenRouter request.
+
+    Amortizes request overhead when rate-limited on requests rather than
+    tokens. The transcripts are concatenated behind `===TRANSCRIPT n===`
+    markers and the model answers with a JSON array, one extraction per
+    transcript. If the array can't be parsed or has the wrong length, every
+    transcript is re-extracted on its own; individual malformed entries are
+    retried individually. `domain_context` is shared by every transcript, so
+    callers should only batch sessions from the same domain.
+    """
+    if len(transcripts) == 1:
+        return [call_extraction_model(transcripts[0], model, domain_context)]
+
+    user_content = "Extract knowledge from each of these transcripts:\n\n" + "\n\n".join(
+        f"===TRANSCRIPT {i}===\n{t}" for i, t in enumerate(transcripts, 1)
+    )
+    if domain_context:
+        user_content = domain_context + "\n\n" + user_content
+    system_prompt = SYSTEM_PROMPT + MULTI_TRANSCRIPT_PROMPT.format(count=len(transcripts))
+    content = _strip_response_wrappers(_request_completion(system_prompt, user_content, model), "[")
+
+    try:
+        results = _json_loads(content)
+    except json.JSONDecodeError as e:
+        print(f"Warning: batched response unparseable ({e}), extracting individually", file=sys.stderr)
+        results = None
+    if not isinstance(results, list) or len(results) != len(transcripts):
+        results = [None] * len(transcripts)
+
+    return [r if isinstance(r, dict) else call_extraction_model(t, model, domain_context)
+            for t, r in zip(transcripts, results)]
+
+
+# Message boundaries in a formatted transcript ("\n\n[user]: ..." / "\n\n[assistant]: ...")
+_MESSAGE_BOUNDARY_RE = re.compile(r'\n\n(?=\[(?:user|assistant)\]: )')
+
+
+def chunk_transcript(transcript: str, max_chars: int, overlap_frac: float = 0.1) -> list[str]:
+    """Split a transcript into chunks of at most max_chars on message boundaries.
+
+    Each chunk after the first repeats the trailing messages of the previous
+    one (up to overlap_frac * max_chars) so facts spanning the cut keep their
+    context. A single message longer than max_chars is hard-split.
+    """
+    if len(transcript) <= max_chars:
+        return [transcript]
+    blocks = []
+    for block in _MESSAGE_BOUNDARY_RE.split(transcript):
+        blocks += [block[i:i + max_chars] for i in range(0, len(block), max_chars)] or [block]
+
+    overlap_chars = int(max_chars * overlap_frac)
+    chunks, current, size = [], [], -2
+    for block in blocks:
+        if current and size + 2 + len(block) > max_chars:
+            chunks.append("\n\n".join(current))
+            # Carry trailing blocks into the next chunk as overlap
+            carry, carry_size = [], -2
+            for prev in reversed(current):
+                if carry_size + 2 + len(prev) > overlap_chars or carry_size + 2 + len(prev) + 2 + len(block) > max_chars:
+                    break
+                carry.insert(0, prev)
+                carry_size += 2 + len(prev)
+            current, size = carry, carry_size
+        current.append(block)
+        size += 2 + len(block)
+    chunks.append("\n\n".join(current))
+    return chunks
+
+
+def merge_extractions(results: list[dict]) -> dict:
+    """Combine per-chunk extractions in chunk order.
+
+    Entities and decisions are deduplicated by lowercased name/title; facts
+    and relations keep chunk order so later chunks supersede earlier ones.
+    Malformed entries (no string name/title) and non-dict chunk results are
+    dropped rather than losing the whole extraction.
+    """
+    merged = {"entities": [], "facts": [], "relations": [], "decisions": []}
+    seen_entities, seen_decisions = set(), set()
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        for ent in result.get("entities", []):
+            if not isinstance(ent, dict) or not isinstance(ent.get("name"), str):
+                continue
+            key = ent["name"].lower()
+            if key not in seen_entities:
+                seen_entities.add(key)
+                merged["entities"].append(ent)
+        merged["facts"] += result.get("facts", [])
+        merged["relations"] += result.get("relations", [])
+        for dec in result.get("decisions", []):
+            if not isinstance(dec, dict) or not isinstance(dec.get("title"), str):
+                continue
+            key = dec["title"].lower()
+            if key not in seen_decisions:
+                seen_decisions.add(key)
+                merged["decisions"].append(dec)
+    return merged
+
+
+def extract_chunks(chunks: list[str], model: str = DEFAULT_MODEL, domain_context: str = "") -> dict:
+    """Extract each chunk (concurrently when there are several) and merge the results."""
+    if len(chunks) == 1:
+        return call_extraction_model(chunks[0], model, domain_context)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        results = list(pool.map(lambda c: call_extraction_model(c, model, domain_context), chunks))
+    return merge_extractions(results)
+
+
+def extraction_cache_key(transcript: str, model: str, context: str = "") -> str:
+    """Content hash of everything that determines an extraction result."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (model, context, transcript):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_cached_extraction(db: sqlite3.Connection, key: str) -> dict | None:
+    """Return a previous extraction for identical input, or None."""
+    try:
+        row = db.execute("SELECT result_json FROM extraction_cache WHERE hash = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:  # read-only (dry run) DB not yet migrated
+        return None
+    return _json_loads(row["result_json"]) if row else None
+
+
+def store_cached_extraction(db: sqlite3.Connection, key: str, extractions: dict):
+    """Remember an extraction so re-runs on unchanged input skip the model call.
+
+    Entries older than EXTRACTION_CACHE_DAYS are dropped on each store.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=EXTRACTION_CACHE_DAYS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    db.execute("DELETE FROM extraction_cache WHERE created_at < ?", (cutoff,))
+    db.execute(
+        "INSERT OR REPLACE INTO extraction_cache (hash, result_json, created_at) VALUES (?, ?, ?)",
+        (key, _json_dumps(extractions), now.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    )
+    db.commit()
+
+
+# Significant words (4+ letters) for fuzzy entity matching
+_SIGNIFICANT_WORD_RE = re.compile(r'[a-z]{4,}')
+
+
 def _fuzzy_find_entity(db: sqlite3.Connection, name: str) -> sqlite3.Row | None:
     """Fuzzy-match an entity name against existing entities.
 
@@ -345,7 +795,7 @@ def _fuzzy_find_entity(db: sqlite3.Connection, name: str) -> sqlite3.Row | None:
     if 50%+ of significant words (4+ chars) match an existing entity, it's a hit.
     """
     # Extract significant words from the new name
-    words = set(re.findall(r'[a-z]{4,}', name.lower()))
+    words = set(_SIGNIFICANT_WORD_RE.findall(name.lower()))
     if not words:
         return None
 
@@ -362,7 +812,7 @@ def _fuzzy_find_entity(db: sqlite3.Connection, name: str) -> sqlite3.Row | None:
     best_score = 0.0
 
     for c in candidates:
-        c_words = set(re.findall(r'[a-z]{4,}', c["name"].lower()))
+        c_words = set(_SIGNIFICANT_WORD_RE.findall(c["name"].lower()))
         if not c_words:
             continue
         overlap = words & c_words
@@ -378,6 +828,46 @@ def _fuzzy_find_entity(db: sqlite3.Connection, name: str) -> sqlite3.Row | None:
     return best_match
 
 
+def _lookup_entity_ids(db: sqlite3.Connection, names) -> dict:
+    """Resolve many entity names by exact (case-insensitive) match in one query.
+
+    Returns {lowercased name: entity id} for the names that already exist.
+    """
+    names = list(names)
+    if not names:
+        return {}
+    placeholders = ",".join(["lower(?)"] * len(names))
+    found = {}
+    for row in db.execute(
+        f"SELECT id, name FROM entities WHERE lower(name) IN ({placeholders})", names
+    ):
+        found.setdefault(row["name"].lower(), row["id"])
+    return found
+
+
+def _insert_entity(db: sqlite3.Connection, name: str, etype: str, now: str,
+                   upsert: bool) -> tuple[str, bool]:
+    """Insert a new entity, returning (id, created).
+
+    With the unique lower(name) index this is a single UPSERT: an entity
+    written concurrently under the same name is touched and reused instead
+    of duplicated.
+    """
+    eid = secrets.token_hex(4)
+    if not upsert:
+        db.execute(
+            "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (eid, name, etype, now, now)
+        )
+        return eid, True
+    row = db.execute(
+        "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(lower(name)) DO UPDATE SET updated_at = excluded.updated_at RETURNING id",
+        (eid, name, etype, now, now)
+    ).fetchone()
+    return row["id"], row["id"] == eid
+
+
 def upsert_extractions(db: sqlite3.Connection, extractions: dict, source: str, date: str, domain: str = None):
     """Write extracted knowledge into the database."""
     now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -385,194 +875,383 @@ def upsert_extractions(db: sqlite3.Connection, extractions: dict, source: str, d
 
     VALID_TYPES = {'person', 'project', 'company', 'concept', 'feature', 'tool'}
 
+    # Take the write lock up front: the whole upsert is one transaction, and a
+    # deferred read transaction that later upgrades can fail with SQLITE_BUSY
+    # (no busy-wait) if another writer committed in between
+    if not db.in_transaction:
+        db.execute("BEGIN IMMEDIATE")
+
+    # Tier 1 (exact match, case-insensitive) for every referenced name in a
+    # single query, instead of one SELECT per entity, fact and relation
+    names = {ent["name"] for ent in extractions.get("entities", [])}
+    names.update(fact["entity_name"] for fact in extractions.get("facts", []))
+    for rel in extractions.get("relations", []):
+        names.update((rel["from"], rel["to"]))
+    entity_map = _lookup_entity_ids(db, names)  # lowercased name -> id
+    domain_rows = []  # (entity_id, domain) for newly created entities
+    has_name_index = db.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND name='idx_entities_name_lower'"
+    ).fetchone()[0]
+    # Hot-loop locals: skip repeated attribute/global lookups per row
+    emap_get = entity_map.get
+    token = secrets.token_hex
+    touched_rows = []  # (updated_at, entity_id) for existing entities
+
     # 1. Ensure all entities exist
-    entity_map = {}  # name -> id
     for ent in extractions.get("entities", []):
         name = ent["name"]
         etype = ent.get("type", "concept").lower().strip()
         if etype not in VALID_TYPES:
             etype = "concept"  # Default for unknown types
 
-        # Tier 1: exact match (case-insensitive)
-        existing = db.execute(
-            "SELECT * FROM entities WHERE lower(name) = lower(?)", (name,)
-        ).fetchone()
+        eid = emap_get(name.lower())
 
         # Tier 2: fuzzy match (word overlap) — prevents near-duplicates
-        if not existing:
+        if not eid:
             existing = _fuzzy_find_entity(db, name)
             if existing:
+                eid = existing['id']
                 stats["deduped"] += 1
 
-        if existing:
-            entity_map[name.lower()] = existing['id']
-            db.execute("UPDATE entities SET updated_at = ? WHERE id = ?", (now, existing['id']))
+        if eid:
+            entity_map[name.lower()] = eid
+            touched_rows.append((now, eid))
         else:
-            eid = str(uuid.uuid4())[:8]
-            db.execute(
-                "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-                (eid, name, etype, now, now)
-            )
+            eid, created = _insert_entity(db, name, etype, now, has_name_index)
             entity_map[name.lower()] = eid
-            stats["entities"] += 1
+            if created:
+                stats["entities"] += 1
 
-            # Assign domain to new entity
-            if domain:
-                db.execute(
-                    "INSERT OR IGNORE INTO entity_domains (entity_id, domain, confidence, source) VALUES (?, ?, 1.0, 'extraction')",
-                    (eid, domain)
-                )
+                # Assign domain to new entity
+                if domain:
+                    domain_rows.append((eid, domain))
 
-    # 2. Assert facts
+    # 2. Assert facts — resolve each fact's entity first
+    resolved_facts = []  # (entity_id, attribute, value)
     for fact in extractions.get("facts", []):
         entity_name = fact["entity_name"]
-        attribute = fact["attribute"]
-        value = fact["value"]
 
         # Find entity (might have been created above, or might already exist)
-        eid = entity_map.get(entity_name.lower())
+        eid = emap_get(entity_name.lower())
         if not eid:
-            # Tier 1: exact match
-            existing = db.execute(
-                "SELECT id FROM entities WHERE lower(name) = lower(?)", (entity_name,)
-            ).fetchone()
             # Tier 2: fuzzy match
-            if not existing:
-                existing = _fuzzy_find_entity(db, entity_name)
+            existing = _fuzzy_find_entity(db, entity_name)
             if existing:
                 eid = existing['id']
             else:
                 # Create entity on the fly
-                eid = str(uuid.uuid4())[:8]
-                db.execute(
-                    "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, 'concept', ?, ?)",
-                    (eid, entity_name, now, now)
-                )
-                entity_map[entity_name.lower()] = eid
-                stats["entities"] += 1
-
-                if domain:
-                    db.execute(
-                        "INSERT OR IGNORE INTO entity_domains (entity_id, domain, confidence, source) VALUES (?, ?, 1.0, 'extraction')",
-                        (eid, domain)
-                    )
-
+                eid, created = _insert_entity(db, entity_name, "concept", now, has_name_index)
+                if created:
+                    stats["entities"] += 1
+
+                    if domain:
+                        domain_rows.append((eid, domain))
+            # Remember the resolution so later facts for this name skip the fuzzy scan
+            entity_map[entity_name.lower()] = eid
+
+        resolved_facts.append((eid, fact["attribute"], fact["value"]))
+
+    # Preload current facts for all touched entities in one query
+    current_facts = {}  # (entity_id, attribute) -> (fact_id, normalized value)
+    fact_eids = list({eid for eid, _, _ in resolved_facts})
+    if fact_eids:
+        placeholders = ",".join("?" * len(fact_eids))
+        for row in db.execute(
+            f"SELECT id, entity_id, attribute, value FROM facts "
+            f"WHERE valid_to IS NULL AND entity_id IN ({placeholders})",
+            fact_eids,
+        ):
+            current_facts.setdefault((row["entity_id"], row["attribute"]),
+                                     (row["id"], str(row["value"]).strip().lower()))
+
+    fact_rows = []
+    superseded_rows = []
+    current_get = current_facts.get
+    for eid, attribute, value in resolved_facts:
         # Supersede existing fact for same entity+attribute
-        existing_fact = db.execute(
-            "SELECT * FROM facts WHERE entity_id = ? AND attribute = ? AND valid_to IS NULL",
-            (eid, attribute)
-        ).fetchone()
-
-        fact_id = str(uuid.uuid4())[:8]
+        existing_fact = current_get((eid, attribute))
 
+        # Normalized once per fact; current_facts holds normalized values, so a
+        # repeat within this batch is caught by the same equality check. str():
+        # the model sometimes emits bare numbers/booleans, stored as TEXT
+        new_val = str(value).strip().lower()
         if existing_fact:
             # Don't supersede if value is the same or essentially the same
-            old_val = existing_fact['value'].strip().lower()
-            new_val = value.strip().lower()
+            old_val = existing_fact[1]
             if old_val == new_val:
                 continue
             # Fuzzy dedup: if one is a substring of the other (minor rephrasing), keep the longer one
             if old_val in new_val or new_val in old_val:
                 if len(old_val) >= len(new_val):
                     continue  # Existing fact is more detailed, skip
-            db.execute(
-                "UPDATE facts SET valid_to = ?, superseded_by = ? WHERE id = ?",
-                (date, fact_id, existing_fact['id'])
-            )
+            fact_id = token(4)
+            superseded_rows.append((date, fact_id, existing_fact[0]))
             stats["superseded"] += 1
+        else:
+            fact_id = token(4)
 
-        db.execute(
-            "INSERT INTO facts (id, entity_id, attribute, value, source, valid_from, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (fact_id, eid, attribute, value, source, date, now)
-        )
-
+        fact_rows.append((fact_id, eid, attribute, value, source, date, now))
+        current_facts[(eid, attribute)] = (fact_id, new_val)
         stats["facts"] += 1
 
-    # 3. Assert relations
+    db.executemany("UPDATE entities SET updated_at = ? WHERE id = ?", touched_rows)
+
+    # Inserts first: a fact written earlier in this batch may itself be superseded
+    db.executemany(
+        "INSERT INTO facts (id, entity_id, attribute, value, source, valid_from, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        fact_rows
+    )
+    db.executemany("UPDATE facts SET valid_to = ?, superseded_by = ? WHERE id = ?", superseded_rows)
+    db.executemany(
+        "INSERT INTO entity_domains (entity_id, domain, confidence, source) VALUES (?, ?, 1.0, 'extraction') "
+        "ON CONFLICT(entity_id, domain) DO NOTHING",
+        domain_rows
+    )
+
+    # 3. Assert relations — decided in memory against the active set, written in bulk
+    resolved_rels = []  # (from_id, relation_type, to_id, ended)
     for rel in extractions.get("relations", []):
-        from_name = rel["from"]
-        to_name = rel["to"]
-        rel_type = rel["relation"]
-        ended = rel.get("ended", False)
-
-        from_id = entity_map.get(from_name.lower()) or db.execute(
-            "SELECT id FROM entities WHERE lower(name) = lower(?)", (from_name,)
-        ).fetchone()
-        to_id = entity_map.get(to_name.lower()) or db.execute(
-            "SELECT id FROM entities WHERE lower(name) = lower(?)", (to_name,)
-        ).fetchone()
-
-        if isinstance(from_id, sqlite3.Row):
-            from_id = from_id['id']
-        if isinstance(to_id, sqlite3.Row):
-            to_id = to_id['id']
+        from_id = emap_get(rel["from"].lower())
+        to_id = emap_get(rel["to"].lower())
 
         if not from_id or not to_id:
             continue  # Skip if entities can't be resolved
 
-        if ended:
-            # End existing relation
-            db.execute(
-                "UPDATE relations SET valid_to = ? WHERE from_entity_id = ? AND to_entity_id = ? AND relation_type = ? AND valid_to IS NULL",
-                (date, from_id, to_id, rel_type)
+        resolved_rels.append((from_id, rel["relation"], to_id, rel.get("ended", False)))
+
+    active_rels = set()  # (from_id, relation_type, to_id) with valid_to IS NULL
+    rel_from_ids = list({r[0] for r in resolved_rels})
+    if rel_from_ids:
+        placeholders = ",".join("?" * len(rel_from_ids))
+        active_rels.update(
+            tuple(row) for row in db.execute(
+                f"SELECT from_entity_id, relation_type, to_entity_id FROM relations "
+                f"WHERE valid_to IS NULL AND from_entity_id IN ({placeholders})",
+                rel_from_ids,
             )
-        else:
-            # Check if relation already exists
-            existing_rel = db.execute(
-                "SELECT id FROM relations WHERE from_entity_id = ? AND to_entity_id = ? AND relation_type = ? AND valid_to IS NULL",
-                (from_id, to_id, rel_type)
-            ).fetchone()
-
-            if not existing_rel:
-                rid = str(uuid.uuid4())[:8]
-                db.execute(
-                    "INSERT INTO relations (id, from_entity_id, relation_type, to_entity_id, valid_from, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-                    (rid, from_id, rel_type, to_id, date, now)
-                )
-                stats["relations"] += 1
+        )
+
+    ended_rows = []
+    relation_rows = []
+    pending = {}  # key -> index into relation_rows, for rows inserted by this batch
+    for from_id, rel_type, to_id, ended in resolved_rels:
+        key = (from_id, rel_type, to_id)
+        if ended:
+            # End existing relation (or one added earlier in this batch)
+            ended_rows.append((date, from_id, to_id, rel_type))
+            if key in pending:
+                relation_rows[pending.pop(key)][5] = date
+            active_rels.discard(key)
+        elif key not in active_rels:
+            pending[key] = len(relation_rows)
+            relation_rows.append([token(4), from_id, rel_type, to_id, date, None, now])
+            active_rels.add(key)
+            stats["relations"] += 1
+
+    db.executemany(
+        "UPDATE relations SET valid_to = ? WHERE from_entity_id = ? AND to_entity_id = ? AND relation_type = ? AND valid_to IS NULL",
+        ended_rows
+    )
+    db.executemany(
+        "INSERT INTO relations (id, from_entity_id, relation_type, to_entity_id, valid_from, valid_to, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        relation_rows
+    )
 
     # 4. Log decisions
-    for dec in extractions.get("decisions", []):
-        did = str(uuid.uuid4())[:8]
-        db.execute(
-            "INSERT INTO decisions (id, title, rationale, status, decided_at, created_at) VALUES (?, ?, ?, 'active', ?, ?)",
-            (did, dec["title"], dec.get("rationale", ""), date, now)
-        )
-        stats["decisions"] += 1
+    decision_rows = [
+        (token(4), dec["title"], dec.get("rationale", ""), date, now)
+        for dec in extractions.get("decisions", [])
+    ]
+    db.executemany(
+        "INSERT INTO decisions (id, title, rationale, status, decided_at, created_at) VALUES (?, ?, ?, 'active', ?, ?)",
+        decision_rows
+    )
+    stats["decisions"] += len(decision_rows)
 
     db.commit()
+    _domain_context_cache.clear()  # Entities/facts changed — rebuild context on next use
     return stats
 
 
+# (st_mtime_ns, st_size, parsed dict) of the offsets file as last read or written
+_offsets_file_cache = None
+
+
 def _load_session_offsets() -> dict:
-    """Load per-session offset tracking file."""
-    if os.path.exists(SESSION_OFFSETS_FILE):
-        try:
-            with open(SESSION_OFFSETS_FILE) as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    """Load per-session offset tracking file.
+
+    The parsed dict is cached against the file's mtime and size, so repeated
+    loads in one process skip the JSON parse until another writer changes it.
+    Returns a copy — callers are free to mutate it.
+    """
+    global _offsets_file_cache
+    try:
+        st = os.stat(SESSION_OFFSETS_FILE)
+    except OSError:
+        return {}
+    if _offsets_file_cache and _offsets_file_cache[:2] == (st.st_mtime_ns, st.st_size):
+        return dict(_offsets_file_cache[2])
+    try:
+        with open(SESSION_OFFSETS_FILE, "rb") as f:
+            raw = f.read()
+        offsets = orjson.loads(raw) if orjson else json.loads(raw)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    _offsets_file_cache = (st.st_mtime_ns, st.st_size, offsets)
+    return dict(offsets)
 
 
 def _save_session_offsets(offsets: dict):
-    """Save per-session offset tracking file."""
+    """Save per-session offset tracking file.
+
+    Written to a temp file and swapped in with os.replace(), so a crash or a
+    concurrent reader never sees a half-written file.
+    """
     os.makedirs(os.path.dirname(SESSION_OFFSETS_FILE), exist_ok=True)
-    with open(SESSION_OFFSETS_FILE, "w") as f:
-        json.dump(offsets, f, indent=2)
+    if orjson:
+        data = orjson.dumps(offsets, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(offsets, indent=2).encode("utf-8")
+    tmp_path = f"{SESSION_OFFSETS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, SESSION_OFFSETS_FILE)
+    global _offsets_file_cache
+    st = os.stat(SESSION_OFFSETS_FILE)
+    _offsets_file_cache = (st.st_mtime_ns, st.st_size, dict(offsets))
+
+
+@contextmanager
+def _offsets_lock():
+    """Hold an exclusive lock on the offsets file's sidecar lock file (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(SESSION_OFFSETS_FILE), exist_ok=True)
+    with open(SESSION_OFFSETS_FILE + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class OffsetStore:
+    """Per-session offsets, read on first use and written back once on exit.
+
+    Usage:
+        with OffsetStore() as offsets:
+            transcript, start, end, resume_at = parse_session_incremental(path, offsets=offsets)
+            ...
+            save_session_offset(path, end, resume_at, offsets=offsets)
+    """
+
+    def __init__(self):
+        self._offsets = None
+        self._changed = {}  # session_key -> value set by this run
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def _data(self) -> dict:
+        if self._offsets is None:
+            self._offsets = _load_session_offsets()
+        return self._offsets
+
+    def get(self, session_key: str, default=-1):
+        return self._data().get(session_key, default)
+
+    def __setitem__(self, session_key: str, value):
+        self._data()[session_key] = value
+        self._changed[session_key] = value
+
+    def flush(self):
+        """Write pending changes, if any.
+
+        Re-reads the file under an exclusive lock and applies only the keys
+        this run changed, so an overlapping run (daemon + manual) writing
+        other sessions' offsets in the meantime isn't clobbered.
+        """
+        if not self._changed:
+            return
+        with _offsets_lock():
+            current = _load_session_offsets()
+            current.update(self._changed)
+            _save_session_offsets(current)
+        self._offsets = current
+        self._changed = {}
+
+
+# Shared decoder for JSONL lines — raw_decode skips json.loads' per-call type dispatch
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _decode_line(line: str | bytes):
+    """Decode one JSONL line — orjson when installed, else the module-level decoder.
+
+    Both raise a json.JSONDecodeError subclass on malformed input.
+    """
+    if orjson is not None:
+        return orjson.loads(line)
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    return _JSON_DECODER.raw_decode(line)[0]
+
+
+# Byte markers a line must contain to possibly be a user/assistant message or
+# carry a tool_use block — cheap substring checks that skip JSON decoding of
+# summary, file-history-snapshot and similar lines
+_ROLE_MARKERS = (b'"user"', b'"assistant"')
+_TOOL_LINE_MARKERS = (b'"user"', b'"tool_use"')
+# A role line with tool blocks but no "text" key is a tool-only turn (call or
+# result) and yields no message text; these are most of a session's bytes
+_TEXT_MARKER = b'"text"'
+_TOOL_BLOCK_MARKERS = (b'"tool_result"', b'"tool_use"')
+
+# Read buffer for session files — multi-MB JSONL reads in a few large syscalls
+_READ_BUFFER_SIZE = 1024 * 1024
 
 
 def _parse_all_messages(session_path: str) -> list[dict]:
     """Parse ALL user/assistant messages from a JSONL session file.
 
-    Returns list of dicts: [{"index": N, "role": "user"|"assistant", "content": "...", "timestamp": "..."}]
+    Returns list of dicts: [{"index": N, "role": "user"|"assistant", "content": "...",
+    "timestamp": "...", "byte_offset": B}]
+    """
+    return _parse_messages_from(session_path)
+
+
+def _parse_messages_from(session_path: str, byte_offset: int = 0, msg_index: int = 0,
+                         keep_from: int = 0) -> list[dict]:
+    """Parse user/assistant messages starting at a byte offset into the file.
+
+    `msg_index` is the index of the first message at or after `byte_offset`.
+    Each message records the byte offset of its JSONL line, so a later call can
+    seek straight back to it instead of re-reading the file from the start.
+    Messages with an index below `keep_from` are counted but not returned.
     """
     messages = []
-    msg_index = 0
-    with open(session_path) as f:
+    # Per-line loop locals: skip global/attribute lookups on every JSONL line
+    append = messages.append
+    decode = _decode_line
+    user_marker, assistant_marker = _ROLE_MARKERS
+    text_marker = _TEXT_MARKER
+    tool_result_marker, tool_use_marker = _TOOL_BLOCK_MARKERS
+    with open(session_path, "rb", buffering=_READ_BUFFER_SIZE) as f:
+        f.seek(byte_offset)
+        pos = byte_offset
         for line in f:
+            line_start = pos
+            pos += len(line)
+            if user_marker not in line and assistant_marker not in line:
+                continue
+            if text_marker not in line and (tool_result_marker in line or tool_use_marker in line):
+                continue
             try:
-                msg = json.loads(line)
+                msg = decode(line)
                 role = msg.get("type", "")
                 if role not in ("user", "assistant"):
                     continue
@@ -584,21 +1263,26 @@ def _parse_all_messages(session_path: str) -> list[dict]:
                 if isinstance(content, list):
                     text_parts = [c.get("text", "") for c in content if isinstance(c, dict) and c.get("type") == "text"]
                     content = "\n".join(text_parts)
-                if content:
+                if content and msg_index < keep_from:
+                    msg_index += 1  # Already processed — only its position matters
+                elif content:
                     timestamp = msg.get("timestamp", "")
-                    messages.append({
+                    append({
                         "index": msg_index,
                         "role": role,
                         "content": content,
                         "timestamp": timestamp,
+                        "byte_offset": line_start,
                     })
                     msg_index += 1
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
     return messages
 
 
-import re
+# Separates the context-overlap block from new messages in incremental transcripts
+_NEW_MESSAGES_MARKER = "[--- NEW MESSAGES BELOW (extract knowledge from these) ---]"
+
 
 # Pattern to identify Bash calls to skill helper scripts
 _SKILL_HELPER_RE = re.compile(
@@ -624,6 +1308,28 @@ _RAW_API_PATTERNS = {
     "gcal": re.compile(r'googleapis\.com/calendar|GOOGLE_', re.IGNORECASE),
 }
 
+# Result-text indicators for classifying skill helper calls (case-insensitive,
+# so the result text is never lowercased)
+_ERROR_RE = re.compile(r'error:|traceback|exception|failed|invalid|unrecognized', re.IGNORECASE)
+_SOFT_MISS_RE = re.compile(r'not found|no active tasks|no matching|no results|does not exist|0 results',
+                           re.IGNORECASE)
+_USAGE_RE = re.compile(r'usage:', re.IGNORECASE)
+
+# Skill name from a directory path (e.g., .claude/skills/linear)
+_SKILL_DIR_NAME_RE = re.compile(r'/\.claude/skills/([^/\s]+)')
+
+# Short, directive user corrections that redirect a tool call (Pattern 6 in
+# _parse_tool_error_sequences)
+_CORRECTION_RE = re.compile(
+    r'(?:-->\s*\S+@\S+|→\s*\S+@\S+'                 # arrows followed by email address
+    r'|-->\s*[a-z0-9._-]+\.[a-z]'                   # arrows followed by domain/path-like value
+    r'|wrong\s+(?:account|email|address|database|calendar|inbox)'
+    r'|use\s+\S+@\S+|use\s+\S+\s+instead'           # "use x@y" or "use X instead"
+    r'|not\s+(?:that\s+(?:account|email|one))'       # "not that account"
+    r'|should\s+be\s+\S+@)',                         # "should be x@y"
+    re.IGNORECASE,
+)
+
 
 def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dict]:
     """Parse tool_use + tool_result blocks to find suboptimal skill helper calls.
@@ -650,18 +1356,25 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
         }]
     """
     # Step 1: Extract all tool_use, tool_result, and user text messages with ordering
-    tool_calls = {}  # tool_use_id -> {name, input, index}
-    tool_results = {}  # tool_use_id -> {content, index}
+    tool_calls = {}  # tool_use_id -> (name, input, order)
+    tool_results = {}  # tool_use_id -> content
     user_messages = []  # [{text, line, order}] — user text messages (not tool_results)
     block_index = 0
 
-    with open(session_path) as f:
-        for line_num, line in enumerate(f):
+    with open(session_path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return []  # Empty file
+    with mm:
+        for line_num, line in enumerate(iter(mm.readline, b"")):
             if offset >= 0 and line_num < offset:
                 continue
+            if _TOOL_LINE_MARKERS[0] not in line and _TOOL_LINE_MARKERS[1] not in line:
+                continue  # Neither user text/tool_result nor an assistant tool_use
             try:
-                msg = json.loads(line)
-            except json.JSONDecodeError:
+                msg = _decode_line(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
 
             msg_type = msg.get("type", "")
@@ -695,21 +1408,15 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                 if not isinstance(block, dict):
                     continue
 
-                if block.get("type") == "tool_use" and msg_type == "assistant":
-                    tool_calls[block.get("id", "")] = {
-                        "name": block.get("name", ""),
-                        "input": block.get("input", {}),
-                        "line": line_num,
-                        "order": block_index,
-                    }
+                block_type = block.get("type")
+                if block_type == "tool_use" and msg_type == "assistant":
+                    tool_calls[block.get("id", "")] = (
+                        block.get("name", ""), block.get("input", {}), block_index,
+                    )
                     block_index += 1
 
-                elif block.get("type") == "tool_result" and msg_type == "user":
-                    tool_results[block.get("tool_use_id", "")] = {
-                        "content": block.get("content", ""),
-                        "line": line_num,
-                        "order": block_index,
-                    }
+                elif block_type == "tool_result" and msg_type == "user":
+                    tool_results[block.get("tool_use_id", "")] = block.get("content", "")
                     block_index += 1
 
     # Step 2: Index all relevant tool calls across tool types
@@ -718,39 +1425,32 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
     skill_inspections = [] # Read/Grep/Glob targeting skill source code
     mcp_calls = []         # MCP tool calls (workspace-mcp, etc.)
 
-    for tool_id, call in sorted(tool_calls.items(), key=lambda x: x[1]["order"]):
-        result = tool_results.get(tool_id, {})
-        result_text = result.get("content", "")
+    # Insertion order already follows the file; the sort only matters for repeated ids
+    for tool_id, (name, tool_input, order) in sorted(tool_calls.items(), key=lambda x: x[1][2]):
+        result_text = tool_results.get(tool_id, "")
         if isinstance(result_text, list):
             result_text = "\n".join(
                 b.get("text", "") for b in result_text
                 if isinstance(b, dict) and b.get("type") == "text"
             )
 
-        if call["name"] == "Bash":
-            command = call["input"].get("command", "")
+        if name == "Bash":
+            command = tool_input.get("command", "")
             match = _SKILL_HELPER_RE.search(command)
             if match:
                 skill_name = match.group(1)
                 script_name = match.group(2)
                 args_text = match.group(3).strip()
-                result_lower = result_text.lower()
 
                 # Classify: hard error, soft miss, discovery call, or clean
                 issue = None
-                if any(indicator in result_lower for indicator in [
-                    "error:", "traceback", "exception", "failed",
-                    "invalid", "unrecognized",
-                ]):
+                if _ERROR_RE.search(result_text):
                     issue = "error"
-                elif any(indicator in result_lower for indicator in [
-                    "not found", "no active tasks", "no matching",
-                    "no results", "does not exist", "0 results",
-                ]):
+                elif _SOFT_MISS_RE.search(result_text):
                     issue = "soft_miss"
                 elif "--help" in command or (args_text and args_text.startswith("2>&1")):
                     issue = "discovery"
-                elif "usage:" in result_lower and not args_text:
+                elif not args_text and _USAGE_RE.search(result_text):
                     issue = "discovery"
 
                 skill_calls.append({
@@ -759,7 +1459,7 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                     "command": command,
                     "result": result_text[:2000],
                     "issue": issue,
-                    "order": call["order"],
+                    "order": order,
                 })
             else:
                 # Check for raw API calls (bypassing skill helpers)
@@ -769,14 +1469,14 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                             "service": service,
                             "command": command,
                             "result": result_text[:2000],
-                            "order": call["order"],
+                            "order": order,
                         })
                         break
 
-        elif call["name"].startswith("mcp__"):
+        elif name.startswith("mcp__"):
             # Index MCP tool calls (workspace-mcp, claude-in-chrome, etc.)
-            mcp_parts = call["name"].split("__", 2)
-            mcp_server = mcp_parts[1] if len(mcp_parts) > 1 else call["name"]
+            mcp_parts = name.split("__", 2)
+            mcp_server = mcp_parts[1] if len(mcp_parts) > 1 else name
             mcp_method = mcp_parts[2] if len(mcp_parts) > 2 else ""
             # Map MCP servers to skill names for routing
             mcp_skill_map = {
@@ -791,13 +1491,13 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                 "skill": skill_name,
                 "mcp_server": mcp_server,
                 "method": mcp_method,
-                "input": call["input"],
+                "input": tool_input,
                 "result": result_text[:2000],
-                "order": call["order"],
+                "order": order,
             })
 
-        elif call["name"] == "Read":
-            file_path = call["input"].get("file_path", "")
+        elif name == "Read":
+            file_path = tool_input.get("file_path", "")
             match = _SKILL_FILE_RE.search(file_path)
             if match:
                 skill_inspections.append({
@@ -805,11 +1505,11 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                     "skill": match.group(1),
                     "script": match.group(2),
                     "path": file_path,
-                    "order": call["order"],
+                    "order": order,
                 })
 
-        elif call["name"] in ("Grep", "Glob"):
-            path = call["input"].get("path", "") or call["input"].get("pattern", "")
+        elif name in ("Grep", "Glob"):
+            path = tool_input.get("path", "") or tool_input.get("pattern", "")
             if _SKILL_DIR_RE.search(path):
                 skill_name = None
                 skill_match = _SKILL_FILE_RE.search(path)
@@ -817,14 +1517,14 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
                     skill_name = skill_match.group(1)
                 else:
                     # Extract skill name from directory path (e.g., .claude/skills/linear)
-                    dir_match = re.search(r'/\.claude/skills/([^/\s]+)', path)
+                    dir_match = _SKILL_DIR_NAME_RE.search(path)
                     if dir_match:
                         skill_name = dir_match.group(1)
                 skill_inspections.append({
                     "type": "skill_search",
                     "skill": skill_name,
                     "path": path,
-                    "order": call["order"],
+                    "order": order,
                 })
 
     # Step 3: Group into suboptimal → retry sequences per skill+script
@@ -972,15 +1672,7 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
     # - Must contain a redirect signal (-->, →, "use X instead", "wrong account")
     # - Must be CLOSE to a tool call (within 3 ordering positions)
     # - Excludes messages that look like general conversation or task management
-    _CORRECTION_RE = re.compile(
-        r'(?:-->\s*\S+@\S+|→\s*\S+@\S+'                 # arrows followed by email address
-        r'|-->\s*[a-z0-9._-]+\.[a-z]'                   # arrows followed by domain/path-like value
-        r'|wrong\s+(?:account|email|address|database|calendar|inbox)'
-        r'|use\s+\S+@\S+|use\s+\S+\s+instead'           # "use x@y" or "use X instead"
-        r'|not\s+(?:that\s+(?:account|email|one))'       # "not that account"
-        r'|should\s+be\s+\S+@)',                         # "should be x@y"
-        re.IGNORECASE,
-    )
+    # (see _CORRECTION_RE)
 
     # Build ordered list of all tool calls (skill helpers + MCP) for lookback
     all_tool_calls = []
@@ -1026,6 +1718,19 @@ def _parse_tool_error_sequences(session_path: str, offset: int = -1) -> list[dic
     return error_sequences
 
 
+# Keywords _classify_error_type looks for, scanned in one pass. Each match is
+# tagged with its group name; the priority between categories is applied to
+# the set of names found. "integer" precedes "int" so it is tagged as such.
+_CLASSIFY_RE = re.compile(
+    r'(?P<missing_flag>unrecognized|unknown option|no such)'
+    r'|(?P<invalid>invalid|not a valid|must be)'
+    r'|(?P<expected>expected)'
+    r'|(?P<not_found>not found|does not exist)'
+    r'|(?P<type>type)|(?P<integer>integer)|(?P<number>number)|(?P<int>int)|(?P<str>str)',
+    re.IGNORECASE,
+)
+
+
 def _classify_error_type(failed_cmd: str, error_text: str, success_cmd: str = None,
                          issue_hint: str = None) -> str:
     """Classify a skill helper issue into a category.
@@ -1037,17 +1742,12 @@ def _classify_error_type(failed_cmd: str, error_text: str, success_cmd: str = No
             identical_retry, escalation_cascade, output_truncation, skill_inspection
         Fallback: other
     """
-    error_lower = error_text.lower()
-
     # Discovery calls: --help, bare invocation, usage output
     if issue_hint == "discovery":
         return "discovery_call"
 
     # Soft misses: "not found", "no matching", etc. — wasted round trip
     if issue_hint == "soft_miss":
-        # Check if the successful retry used different search terms / entity names
-        if success_cmd and success_cmd != failed_cmd:
-            return "inefficient_lookup"
         return "inefficient_lookup"
 
     # Case sensitivity: error mentions case or the fix changes capitalization
@@ -1058,66 +1758,132 @@ def _classify_error_type(failed_cmd: str, error_text: str, success_cmd: str = No
         if failed_args == success_args and failed_cmd != success_cmd:
             return "case_sensitivity"
 
-    if "unrecognized" in error_lower or "unknown option" in error_lower or "no such" in error_lower:
+    found = {m.lastgroup for m in _CLASSIFY_RE.finditer(error_text)}
+
+    if "missing_flag" in found:
         return "missing_flag"
 
-    if "invalid" in error_lower or "not a valid" in error_lower or "must be" in error_lower:
-        if "type" in error_lower or "integer" in error_lower or "number" in error_lower:
+    if "invalid" in found:
+        if found & {"type", "integer", "number"}:
             return "wrong_arg_type"
         return "invalid_value"
 
-    if "expected" in error_lower and ("int" in error_lower or "str" in error_lower or "number" in error_lower):
+    if "expected" in found and found & {"int", "integer", "str", "number"}:
         return "wrong_arg_type"
 
-    if "not found" in error_lower or "does not exist" in error_lower:
+    if "not_found" in found:
         return "invalid_value"
 
     return "other"
 
 
-def parse_session_jsonl(session_path: str, message_filter=None) -> str:
+def parse_session_jsonl(session_path: str, message_filter=None, max_chars: int = None) -> str:
     """Parse a Claude Code JSONL session file into a readable transcript.
 
-    Non-incremental mode: returns ALL messages (truncation to max_transcript_chars
-    happens downstream in main()). Previously limited to last 50 messages, which
+    Non-incremental mode: returns ALL messages, or the last `max_chars` of the
+    transcript when given. Previously limited to last 50 messages, which
     silently dropped early-session facts during backfill re-extraction.
 
     Args:
         message_filter: Optional callable(messages) -> messages to compress the
             transcript before formatting. Used by the pre-filter pipeline.
+        max_chars: Keep only this many trailing characters; messages wholly
+            before the tail are never formatted.
     """
     messages = _parse_all_messages(session_path)
     if message_filter:
         messages = message_filter(messages)
-    texts = [f"[{m['role']}]: {m['content']}" for m in messages]
-    return "\n\n".join(texts)
+    return _format_messages(messages, max_chars)
+
 
+_ROLE_CONTENT = operator.itemgetter("role", "content")
 
-def parse_session_incremental(session_path: str, message_filter=None) -> tuple[str, int, int]:
+
+def _format_messages(messages: list[dict], max_chars: int = None) -> str:
+    """Render parsed messages as "[role]: content" blocks separated by blank lines.
+
+    Joins a flat list of references to the role/content strings, so message
+    text is copied once, straight into the result, instead of first into a
+    per-message "[role]: content" string (or an io.StringIO buffer that
+    getvalue() copies again). With `max_chars`, returns the same as
+    formatting everything and slicing [-max_chars:], but only formats the
+    messages that reach into that tail.
+    """
+    if max_chars:
+        size = -2  # No separator after the last message
+        start = len(messages)
+        while start > 0 and size < max_chars:
+            start -= 1
+            m = messages[start]
+            size += len(m['role']) + len(m['content']) + 6  # "[" "]: " + "\n\n"
+        messages = messages[start:]
+    parts = []
+    extend = parts.extend
+    for role, content in map(_ROLE_CONTENT, messages):
+        extend(("[", role, "]: ", content, "\n\n"))
+    if parts:
+        parts.pop()  # No separator after the last message
+    text = "".join(parts)
+    return text[-max_chars:] if max_chars else text
+
+
+def parse_session_incremental(session_path: str, message_filter=None,
+                              offsets: OffsetStore = None,
+                              max_chars: int = None,
+                              context_overlap: int = None) -> tuple[str, int, int, tuple | None]:
     """Parse a session incrementally using offset tracking.
 
-    Returns (transcript, new_start_index, new_end_index) where:
+    Returns (transcript, new_start_index, new_end_index, resume_at) where:
     - transcript includes CONTEXT_OVERLAP old messages marked as context,
       then a separator, then new messages for extraction
     - new_start_index is the first genuinely new message index
     - new_end_index is the last message index (to save as offset)
+    - resume_at is (byte_offset, message_index) of the first context message
+      for the NEXT run, to pass to save_session_offset()
+
+    Offsets saved with a byte position let the parser seek past everything
+    before the context window; legacy entries (bare message index) fall back
+    to a full parse.
 
-    If no previous offset exists, falls back to processing the last 50 messages
-    (same as legacy behavior for first run).
+    If no previous offset exists, processes ALL messages in the session.
 
     Args:
         message_filter: Optional callable(messages) -> messages to compress the
             transcript before formatting. Used by the pre-filter pipeline.
+        offsets: OffsetStore shared with save_session_offset(), so the offsets
+            file is read once per run.
+        max_chars: Keep only this many trailing characters of the transcript.
+        context_overlap: Old messages to include as context (default
+            CONTEXT_OVERLAP). The saved resume point always keeps
+            CONTEXT_OVERLAP, so a later run can still ask for the full overlap.
     """
+    if context_overlap is None:
+        context_overlap = CONTEXT_OVERLAP
     session_key = os.path.basename(session_path)
-    offsets = _load_session_offsets()
-    last_offset = offsets.get(session_key, -1)
-
-    all_messages = _parse_all_messages(session_path)
+    entry = (offsets or OffsetStore()).get(session_key, -1)
+    if isinstance(entry, dict):
+        last_offset = entry.get("msg_index", -1)
+        byte_offset = entry.get("byte_offset", 0)
+        byte_index = entry.get("byte_index", 0)
+        if byte_offset > os.path.getsize(session_path):
+            byte_offset = byte_index = 0  # File was rewritten — start over
+    else:
+        last_offset, byte_offset, byte_index = entry, 0, 0
+
+    # Only the context window onwards is held in memory; earlier messages are
+    # skipped by seeking (byte offset) or counted while streaming (legacy index).
+    # At least CONTEXT_OVERLAP are kept so the resume point below can reach back
+    # that far even when this run asks for less context.
+    kept = max(context_overlap, CONTEXT_OVERLAP)
+    keep_from = max(0, last_offset + 1 - kept) if last_offset >= 0 else 0
+    all_messages = _parse_messages_from(session_path, byte_offset, byte_index, keep_from)
     if not all_messages:
-        return "", 0, -1
+        if last_offset >= 0:
+            return "", last_offset + 1, last_offset, None
+        return "", 0, -1, None
 
-    total = len(all_messages)
+    first = all_messages[0]["index"]
+    total = all_messages[-1]["index"] + 1
 
     if last_offset < 0:
         # First time seeing this session — process ALL messages (not just last 50).
@@ -1132,12 +1898,18 @@ def parse_session_incremental(session_path: str, message_filter=None) -> tuple[s
         new_start = last_offset + 1
         if new_start >= total:
             # No new messages since last extraction
-            return "", new_start, last_offset
+            return "", new_start, last_offset, None
 
         # Context: last CONTEXT_OVERLAP messages from the already-processed window
-        context_start = max(0, new_start - CONTEXT_OVERLAP)
-        context_msgs = all_messages[context_start:new_start]
-        new_msgs = all_messages[new_start:]
+        context_start = max(0, new_start - context_overlap)
+        context_msgs = all_messages[max(0, context_start - first):new_start - first]
+        new_msgs = all_messages[new_start - first:]
+
+    new_end = all_messages[-1]["index"]
+
+    # Next run seeks straight to its context window
+    resume = all_messages[min(len(all_messages) - 1, max(0, new_end + 1 - CONTEXT_OVERLAP - first))]
+    resume_at = (resume["byte_offset"], resume["index"])
 
     # Apply message filter to compress transcript per pipeline stage
     if message_filter:
@@ -1145,28 +1917,131 @@ def parse_session_incremental(session_path: str, message_filter=None) -> tuple[s
         new_msgs = message_filter(new_msgs)
 
     # Build transcript with context separator
+    new_text = _format_messages(new_msgs, max_chars) if new_msgs else ""
+    if max_chars and len(new_text) >= max_chars:
+        return new_text, new_start, new_end, resume_at  # Context would be cut off anyway
+
     parts = []
     if context_msgs:
-        parts.append("[--- CONTEXT FROM PREVIOUS EXTRACTION (for reference only, already processed) ---]")
-        for m in context_msgs:
-            parts.append(f"[{m['role']}]: {m['content']}")
-        parts.append("")
-        parts.append("[--- NEW MESSAGES BELOW (extract knowledge from these) ---]")
-        parts.append("")
+        parts += ["[--- CONTEXT FROM PREVIOUS EXTRACTION (for reference only, already processed) ---]",
+                  _format_messages(context_msgs), "",
+                  _NEW_MESSAGES_MARKER, ""]
+    if new_msgs:
+        parts.append(new_text)
+
+    transcript = "\n\n".join(parts)
+    return (transcript[-max_chars:] if max_chars else transcript), new_start, new_end, resume_at
+
+
+def load_source_summary(db: sqlite3.Connection, source: str, limit: int = 20) -> str:
+    """Compact bullet list of current facts already extracted from `source`.
+
+    Stands in for the verbatim context-overlap messages on incremental runs:
+    the model keeps continuity with what earlier windows produced at a
+    fraction of the tokens.
+    """
+    rows = db.execute("""
+        SELECT e.name, f.attribute, f.value
+        FROM facts f JOIN entities e ON e.id = f.entity_id
+        WHERE f.source = ? AND f.valid_to IS NULL
+        ORDER BY f.created_at DESC
+        LIMIT ?
+    """, (source, limit)).fetchall()
+    if not rows:
+        return ""
+    lines = ["Already extracted from earlier in this session (for continuity — do not re-extract unless changed):"]
+    lines += [f"- {r['name']}: {r['attribute']}={r['value'][:60]}" for r in rows]
+    return "\n".join(lines)
+
+
+_token_encoding = None
+
+
+def _get_token_encoding():
+    """Shared tiktoken encoding, or None when tiktoken isn't installed.
+
+    Configurable via `tokenizer_encoding` (default cl100k_base) since
+    OpenRouter models have no tiktoken mapping of their own.
+    """
+    global _token_encoding
+    if _token_encoding is None and tiktoken is not None:
+        _token_encoding = tiktoken.get_encoding(cfg("tokenizer_encoding", "cl100k_base"))
+    return _token_encoding
 
-    for m in new_msgs:
-        parts.append(f"[{m['role']}]: {m['content']}")
 
-    new_end = all_messages[-1]["index"] if all_messages else -1
-    return "\n\n".join(parts), new_start, new_end
+def _count_tokens(text: str) -> int:
+    """Token count of `text`; estimated at ~4 chars per token without tiktoken."""
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
 
 
-def save_session_offset(session_path: str, offset: int):
-    """Update the high-water mark for a session after successful extraction."""
+def _shorten_value(value: str, max_tokens: int = 15) -> str:
+    """Cut a fact value for the domain context: 15 tokens, or 40 chars without tiktoken."""
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return value[:40]
+    tokens = encoding.encode(value, disallowed_special=())
+    return value if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def truncate_to_tokens(transcript: str, max_tokens: int = MAX_TRANSCRIPT_TOKENS) -> str:
+    """Keep the last `max_tokens` tokens of a transcript.
+
+    A no-op when max_tokens is 0 or tiktoken isn't installed.
+    """
+    encoding = _get_token_encoding()
+    if not max_tokens or encoding is None:
+        return transcript
+    tokens = encoding.encode(transcript, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return transcript
+    return encoding.decode(tokens[-max_tokens:])
+
+
+def _new_content_chars(transcript: str) -> int:
+    """Length of an incremental transcript excluding its context-overlap block."""
+    before, marker, after = transcript.partition(_NEW_MESSAGES_MARKER)
+    return len(after if marker else before)
+
+
+def save_session_offset(session_path: str, offset: int, resume_at: tuple | None = None,
+                        offsets: OffsetStore = None):
+    """Update the high-water mark for a session after successful extraction.
+
+    resume_at: (byte_offset, message_index) from parse_session_incremental(),
+        letting the next incremental parse seek instead of re-reading the file.
+    offsets: OffsetStore to record into (written when the store exits);
+        without one the offsets file is updated immediately.
+    """
+    if offsets is None:
+        with OffsetStore() as offsets:
+            save_session_offset(session_path, offset, resume_at, offsets)
+        return
     session_key = os.path.basename(session_path)
-    offsets = _load_session_offsets()
-    offsets[session_key] = offset
-    _save_session_offsets(offsets)
+    if resume_at:
+        offsets[session_key] = {"msg_index": offset, "byte_offset": resume_at[0],
+                                "byte_index": resume_at[1]}
+    else:
+        offsets[session_key] = offset
+
+
+def _walk_jsonl(directory: str):
+    """Yield (mtime_ns, path) for every *.jsonl file under directory."""
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _walk_jsonl(entry.path)
+                elif entry.name.endswith(".jsonl"):
+                    yield entry.stat().st_mtime_ns, entry.path
+            except OSError:
+                continue  # Vanished or unreadable mid-walk
 
 
 def find_last_session() -> tuple[str, str]:
@@ -1182,19 +2057,16 @@ def find_last_session() -> tuple[str, str]:
         print("Error: No Claude Code projects directory found", file=sys.stderr)
         sys.exit(2)
 
-    # Find the most recent session file
-    session_files = []
-    for f in projects_dir.rglob("*.jsonl"):
-        session_files.append(f)
-
-    if not session_files:
+    # Find the most recent session file — one pass, one stat per file
+    newest = max(_walk_jsonl(str(projects_dir)), default=None)
+    if newest is None:
         print("Error: No session files found", file=sys.stderr)
         sys.exit(2)
 
-    latest = max(session_files, key=lambda f: f.stat().st_mtime)
+    latest = newest[1]
     print(f"Found session: {latest}")
 
-    transcript = parse_session_jsonl(str(latest))
+    transcript = parse_session_jsonl(str(latest), max_chars=TRANSCRIPT_CHAR_BUDGET)
     return transcript, str(latest)
 
 
@@ -1205,6 +2077,8 @@ def main():
     input_group.add_argument('--session', help='Path to a Claude Code .jsonl session file (will be parsed)')
     input_group.add_argument('--last-session', action='store_true', help='Use most recent Claude Code session')
     input_group.add_argument('--stdin', action='store_true', help='Read transcript from stdin')
+    input_group.add_argument('--all-new-sessions', action='store_true',
+                             help='Extract new messages from recent sessions, batched into few API requests')
 
     parser.add_argument('--model', '-m', default=DEFAULT_MODEL,
                         help=f'OpenRouter model ID (default: {DEFAULT_MODEL})')
@@ -1216,12 +2090,32 @@ def main():
                         help='Source label for extracted facts')
     parser.add_argument('--no-incremental', action='store_true',
                         help='Disable incremental offset tracking (legacy: last 50 messages)')
+    parser.add_argument('--limit', '-l', type=int, default=cfg("daemon_max_per_run", 5),
+                        help='Max sessions for --all-new-sessions (default: daemon_max_per_run)')
+    parser.add_argument('--sessions-dir', default=None,
+                        help='Directory to scan for --all-new-sessions (default: configured sessions_dir)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Concurrent API requests for --all-new-sessions (default: 1)')
+    parser.add_argument('--sync-briefing', action='store_true',
+                        help='Regenerate BRIEF.md before exiting instead of in a detached process')
+    parser.add_argument('--force', action='store_true',
+                        help=f'Extract even if the new content is under {MIN_EXTRACTION_CHARS} chars')
 
     args = parser.parse_args()
 
+    with OffsetStore() as offsets:
+        if args.all_new_sessions:
+            run_all_new_sessions(args, offsets)
+        else:
+            run_extraction(args, offsets)
+
+
+def run_extraction(args: argparse.Namespace, offsets: OffsetStore):
+    """Extract from the input selected by the CLI args and write to the DB."""
     # Track whether we're doing incremental session extraction
     session_path_for_offset = None
     new_end_offset = -1
+    resume_at = None
 
     # Pre-filter: compress transcript for fact extraction (gems pattern)
     fact_filter = None
@@ -1231,23 +2125,49 @@ def main():
     except ImportError:
         pass  # Graceful degradation
 
+    # One connection for the whole run, opened on first use; a dry run only
+    # reads domain context and the extraction cache, so it gets a read-only one
+    db = None
+
+    def conn() -> sqlite3.Connection:
+        nonlocal db
+        if db is None:
+            db = get_db(read_only=args.dry_run)
+        return db
+
     # Get transcript
+    source_summary = ""
     if args.input:
         with open(args.input) as f:
             transcript = f.read()
         source = args.source or f"file:{os.path.basename(args.input)}"
     elif args.session:
         if args.no_incremental:
-            transcript = parse_session_jsonl(args.session, message_filter=fact_filter)
+            transcript = parse_session_jsonl(args.session, message_filter=fact_filter,
+                                             max_chars=TRANSCRIPT_CHAR_BUDGET)
         else:
-            transcript, new_start, new_end_offset = parse_session_incremental(
-                args.session, message_filter=fact_filter)
+            # Facts from earlier windows replace the raw overlap messages when available
+            if CONTEXT_SUMMARY and os.path.exists(DB_PATH):
+                source_summary = load_source_summary(conn(), args.source or args.session)
+            overlap = 0 if source_summary else CONTEXT_OVERLAP
+            transcript, new_start, new_end_offset, resume_at = parse_session_incremental(
+                args.session, message_filter=fact_filter, offsets=offsets,
+                max_chars=TRANSCRIPT_CHAR_BUDGET, context_overlap=overlap)
             session_path_for_offset = args.session
-            if not transcript.strip():
+            if not transcript or transcript.isspace():
                 print(f"No new messages in session (offset at {new_end_offset})")
                 sys.exit(0)
+            new_chars = _new_content_chars(transcript)
+            idle = time.time() - os.path.getmtime(args.session) >= SESSION_IDLE_SECONDS
+            if new_chars < MIN_EXTRACTION_CHARS and not (args.force or idle):
+                # Offset is not advanced, so these messages accumulate into the next window
+                print(f"Only {new_chars} chars of new content (< {MIN_EXTRACTION_CHARS}), "
+                      f"deferring extraction (use --force to extract now)")
+                sys.exit(EXIT_DEFERRED)
+            ctx = (f"{source_summary.count(chr(10))} prior facts as context" if source_summary
+                   else f"{overlap} overlap")
             print(f"Incremental: messages {new_start}-{new_end_offset} "
-                  f"({new_end_offset - new_start + 1} new, {CONTEXT_OVERLAP} overlap)")
+                  f"({new_end_offset - new_start + 1} new, {ctx})")
         source = args.source or args.session
     elif args.last_session:
         transcript, session_path = find_last_session()
@@ -1258,14 +2178,26 @@ def main():
 
     date = args.date or datetime.now(timezone.utc).strftime('%Y-%m-%d')
 
-    if not transcript.strip():
+    if not transcript or transcript.isspace():  # Stops at the first non-space char, no copy
         print("Error: Empty transcript", file=sys.stderr)
         sys.exit(2)
 
-    # Truncate if very long (keep under ~50k chars for cheap models)
-    if len(transcript) > 50000:
-        print(f"Transcript is {len(transcript)} chars, truncating to last 50000...")
-        transcript = transcript[-50000:]
+    # Truncate if very long (keep under ~50k chars for cheap models). Session
+    # parsers already return just the tail; this catches --input/--stdin.
+    if len(transcript) > TRANSCRIPT_CHAR_BUDGET:
+        print(f"Transcript is {len(transcript)} chars, truncating to last {TRANSCRIPT_CHAR_BUDGET}...")
+        transcript = transcript[-TRANSCRIPT_CHAR_BUDGET:]
+
+    # Over one model window: extract overlapping chunks separately and merge
+    chunks = chunk_transcript(transcript, MAX_TRANSCRIPT_CHARS)
+    for i, chunk in enumerate(chunks):
+        truncated = truncate_to_tokens(chunk)
+        if len(truncated) < len(chunk):
+            print(f"Transcript exceeds {MAX_TRANSCRIPT_TOKENS} tokens, keeping last {len(truncated)} chars...")
+            chunks[i] = truncated
+    if len(chunks) > 1:
+        print(f"Split into {len(chunks)} chunks of up to {MAX_TRANSCRIPT_CHARS} chars")
+    transcript = "\n\n".join(chunks) if len(chunks) > 1 else chunks[0]
 
     print(f"Extracting from {len(transcript)} chars of transcript...")
     print(f"Model: {args.model} | Source: {source} | Date: {date}")
@@ -1274,9 +2206,7 @@ def main():
     domain_context = ""
     domain = detect_session_domain(source)
     if domain:
-        db = get_db()
-        domain_context = load_domain_context(db, domain)
-        db.close()
+        domain_context = load_domain_context(conn(), domain)
         if domain_context:
             print(f"Domain: {domain} (injecting {domain_context.count(chr(10))} lines of context)")
 
@@ -1297,6 +2227,8 @@ def main():
 
     # Extract — combine domain context with linked task (no context frame)
     combined_context = domain_context
+    if source_summary:
+        combined_context = (combined_context + "\n\n" + source_summary) if combined_context else source_summary
     if linked_task:
         task_hint = (
             f"\nLINKED TASK: This session is explicitly linked to Konban task: "
@@ -1309,7 +2241,18 @@ def main():
             combined_context = task_hint + "\n" + combined_context
         else:
             combined_context = task_hint
-    extractions = call_extraction_model(transcript, args.model, combined_context)
+
+    # Content-hash cache: unchanged input (e.g. a re-run after a crash) skips the model call
+    cache_key = extraction_cache_key(transcript, args.model, combined_context)
+    extractions = None
+    if os.path.exists(DB_PATH):
+        extractions = load_cached_extraction(conn(), cache_key)
+    if extractions is not None:
+        print("Cache hit: identical transcript already extracted, skipping model call")
+    else:
+        extractions = extract_chunks(chunks, args.model, combined_context)
+        if not args.dry_run and os.path.exists(DB_PATH):
+            store_cached_extraction(conn(), cache_key, extractions)
 
     # Display
     print("Extracted:")
@@ -1334,29 +2277,213 @@ def main():
         print(f"  + Decision: {dec['title']}")
 
     if args.dry_run:
+        if db is not None:
+            db.close()
         print("\n[DRY RUN — nothing written]")
         return
 
     # Write to DB
     print()
-    db = get_db()
-    stats = upsert_extractions(db, extractions, source, date, domain=domain)
+    stats = upsert_extractions(conn(), extractions, source, date, domain=domain)
+    db.execute("PRAGMA optimize")
     db.close()
 
     print(f"Written: {stats['entities']} new entities, {stats['facts']} facts ({stats['superseded']} superseded), {stats['relations']} relations, {stats['decisions']} decisions")
 
     # Save offset AFTER successful DB write
     if session_path_for_offset and new_end_offset >= 0:
-        save_session_offset(session_path_for_offset, new_end_offset)
+        save_session_offset(session_path_for_offset, new_end_offset, resume_at, offsets)
         print(f"Offset saved: {os.path.basename(session_path_for_offset)} → {new_end_offset}")
 
-    # Regenerate briefing
     print()
+    _finish_run(offsets, args.sync_briefing)
+
+
+def _finish_run(offsets: OffsetStore, sync_briefing: bool = False):
+    """Persist offsets and regenerate BRIEF.md.
+
+    By default briefing.py runs as a detached process (output appended to
+    briefing.log) so the CLI returns as soon as the DB write is done; with
+    sync_briefing it runs in-process, overlapping the offsets write.
+    """
+    if not sync_briefing:
+        offsets.flush()
+        _spawn_briefing()
+        return
+    briefing_thread = _start_briefing()
+    offsets.flush()
+    briefing_thread.join()
+
+
+def _spawn_briefing():
+    """Start briefing.py in its own session, detached from this process."""
+    import subprocess
+    from config import get_briefing_log
+    script = Path(__file__).resolve().parent / "briefing.py"
+    log_path = get_briefing_log()
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, str(script)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    print(f"Regenerating BRIEF.md in the background (log: {log_path})")
+
+
+class _BriefingThread(threading.Thread):
+    """Runs briefing.generate(); join() re-raises its error, as a direct call would."""
+
+    def __init__(self, generate):
+        super().__init__(name="briefing")
+        self._generate = generate
+        self._error = None
+
+    def run(self):
+        try:
+            self._generate()
+        except BaseException as e:
+            self._error = e
+
+    def join(self, timeout=None):
+        super().join(timeout)
+        if self._error is not None:
+            raise self._error
+
+
+def _start_briefing() -> _BriefingThread:
+    """Regenerate BRIEF.md on a background thread (it opens its own DB connection)."""
     # Import from same directory as this script
     script_dir = Path(__file__).resolve().parent
     sys.path.insert(0, str(script_dir))
     import briefing
-    briefing.generate()
+    thread = _BriefingThread(briefing.generate)
+    thread.start()
+    return thread
+
+
+def run_all_new_sessions(args: argparse.Namespace, offsets: OffsetStore):
+    """Extract new messages from the most recently active sessions.
+
+    Picks up to args.limit sessions with unprocessed messages (skipping agent
+    subprocesses and sessions touched in the last SESSION_IDLE_SECONDS, which are
+    probably still being written), then packs their incremental windows into
+    as few call_extraction_model_multi() requests as BATCH_MAX_CHARS allows,
+    one domain (and its known-entity context) per request. Requests run on up to args.workers threads; DB writes stay on the calling
+    thread (SQLite is single-writer). Each session is still written with its
+    own source, domain and offset — a failed request leaves its sessions'
+    offsets untouched for the next run.
+    """
+    fact_filter = None
+    try:
+        from session_prefilter import filter_for_facts
+        fact_filter = filter_for_facts
+    except ImportError:
+        pass  # Graceful degradation
+
+    from config import get_sessions_dir
+    sessions_dir = os.path.expanduser(args.sessions_dir) if args.sessions_dir else str(get_sessions_dir())
+    cutoff = time.time_ns() - SESSION_IDLE_SECONDS * 10**9
+    candidates = sorted(
+        ((mtime, path) for mtime, path in _walk_jsonl(sessions_dir)
+         if mtime < cutoff and not os.path.basename(path).startswith("agent-")),
+        reverse=True,
+    )
+
+    pending = []  # {"path", "transcript", "end", "resume_at", "domain"}, newest first
+    for _, path in candidates:
+        if len(pending) >= args.limit:
+            break
+        transcript, _, end, resume_at = parse_session_incremental(
+            path, message_filter=fact_filter, offsets=offsets, max_chars=MAX_TRANSCRIPT_CHARS)
+        if not transcript or transcript.isspace():
+            continue
+        # Every candidate is idle, so even a window under MIN_EXTRACTION_CHARS is
+        # its session's final tail: extract it rather than deferring forever
+        pending.append({"path": path, "transcript": truncate_to_tokens(transcript), "end": end,
+                        "resume_at": resume_at, "domain": detect_session_domain(path)})
+
+    if not pending:
+        print("No sessions with new messages")
+        return
+    pending.reverse()  # Oldest first, like the daemon
+
+    # Pack same-domain sessions into requests up to the character budget, so
+    # each request carries a single domain context
+    by_domain = {}
+    for p in pending:
+        by_domain.setdefault(p["domain"], []).append(p)
+    batches = []
+    for group in by_domain.values():
+        size = BATCH_MAX_CHARS + 1
+        for p in group:
+            if size + len(p["transcript"]) <= BATCH_MAX_CHARS:
+                batches[-1].append(p)
+                size += len(p["transcript"])
+            else:
+                batches.append([p])
+                size = len(p["transcript"])
+
+    print(f"{len(pending)} session(s) with new messages, {len(batches)} request(s)")
+    date = args.date or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    # One connection for every write in this run (main thread only); a dry run
+    # only reads domain context, so it gets a read-only one
+    if args.dry_run:
+        db = get_db(read_only=True) if os.path.exists(DB_PATH) else None
+    else:
+        db = get_db()
+
+    # Domain context is read on this thread; workers only make API calls
+    contexts = {d: load_domain_context(db, d) if d and db else "" for d in by_domain}
+    if args.dry_run and db is not None:
+        db.close()
+        db = None
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def extract_batch(batch):
+        transcripts = [p["transcript"] for p in batch]
+        return batch, call_extraction_model_multi(transcripts, args.model, contexts[batch[0]["domain"]])
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(extract_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            try:
+                batch, results = future.result()
+            except SystemExit:
+                print("  Request FAILED (extraction error), offsets not advanced", file=sys.stderr)
+                continue
+            except Exception as e:
+                print(f"  Request FAILED ({e}), offsets not advanced", file=sys.stderr)
+                continue
+            _write_batch_results(db, batch, results, date, offsets)
+
+    if db is None:
+        print("\n[DRY RUN — nothing written]")
+        return
+    # Fold the run's WAL back into the DB once, instead of leaving it to
+    # auto-checkpoints between upserts; a busy reader just defers it.
+    # PRAGMA optimize refreshes planner stats the run's writes made stale
+    db.execute("PRAGMA optimize")
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+
+    print()
+    _finish_run(offsets, args.sync_briefing)
+
+
+def _write_batch_results(db: sqlite3.Connection | None, batch: list[dict], results: list[dict],
+                         date: str, offsets: OffsetStore):
+    """Upsert one request's per-session extractions and advance their offsets."""
+    for p, extractions in zip(batch, results):
+        n = sum(len(extractions.get(k, [])) for k in ('entities', 'facts', 'relations', 'decisions'))
+        print(f"  {os.path.basename(p['path'])}: {n} item(s) extracted")
+        if db is None:
+            continue
+        stats = upsert_extractions(db, extractions, p["path"], date, domain=p["domain"])
+        print(f"    Written: {stats['entities']} new entities, {stats['facts']} facts, "
+              f"{stats['relations']} relations, {stats['decisions']} decisions")
+        save_session_offset(p["path"], p["end"], p["resume_at"], offsets)
 
 
 if __name__ == '__main__':
@@ -23,6 +23,7 @@ print(f'SESSIONS_DIR=\"{get_sessions_dir()}\"')
 r = get_recall_script() or ''
 print(f'RECALL_SCRIPT=\"{r}\"')
 print(f'MAX_PER_RUN={cfg(\"daemon_max_per_run\", 5)}')
+print(f'IDLE_SECONDS={cfg(\"session_idle_seconds\", 300)}')
 " 2>/dev/null)"
 if [ -n "$_config_out" ]; then
     eval "$_config_out"
@@ -31,6 +32,7 @@ else
     SESSIONS_DIR="$HOME/.claude/projects"
     RECALL_SCRIPT=""
     MAX_PER_RUN=5
+    IDLE_SECONDS=300
 fi
 
 MARKER="$KB_DIR/.last-extraction"
@@ -100,8 +102,8 @@ for entry in "${SORTED[@]}"; do
     SESSION="${entry#*|}"
     AGE=$((NOW - MOD_TIME))
 
-    # Skip sessions still being written to (< 5 min old)
-    if [ "$AGE" -lt 300 ]; then
+    # Skip sessions still being written to (< 5 min old by default)
+    if [ "$AGE" -lt "$IDLE_SECONDS" ]; then
         SKIPPED=$((SKIPPED + 1))
         continue
     fi
@@ -154,6 +156,11 @@ print(f'skip_facts={s[\"skip_facts\"]} skip_artifacts={s[\"skip_artifacts\"]} us
             log "Fact extraction complete: $(basename "$SESSION")"
         elif [ "$EXIT_CODE" -eq 2 ]; then
             log "Fact extraction skipped (empty/no data): $(basename "$SESSION")"
+        elif [ "$EXIT_CODE" -eq 3 ]; then
+            # Deferred (window too small, session not idle yet): not done, so the
+            # marker must not move past it
+            log "Fact extraction deferred: $(basename "$SESSION") — will retry next run"
+            break
         else
             log "Extraction FAILED (exit $EXIT_CODE): $(basename "$SESSION") — stopping, will retry next run"
             FAILED=$((FAILED + 1))
@@ -5,33 +5,139 @@ import argparse
 import sqlite3
 import sys
 import os
-from datetime import datetime, timezone
+from collections import defaultdict
+from pathlib import Path
 
-from config import get_db_path, get_kb_dir, get_daemon_label, get_domains
+from config import get_db_path, get_kb_dir, get_daemon_label, get_domains, tail_lines
+from search_index import has_search_index, search_match
 
 DB_PATH = str(get_db_path())
 
 
-def get_db():
+# Per-connection tuning: synchronous=NORMAL is durable under WAL except for the
+# last commit on power loss; the caches keep the entity/fact indexes hot
+_CONN_PRAGMAS = """
+    PRAGMA busy_timeout=30000;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-20000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+"""
+
+
+# Open connections by read_only flag while `kb repl` runs; None otherwise
+_repl_conns = None
+
+
+class _SharedConnection(sqlite3.Connection):
+    """Connection kept open across `kb repl` commands.
+
+    close() only rolls back an unfinished transaction, so the cmd_* functions
+    can keep closing their connection as usual.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+
+def get_db(read_only: bool = False):
+    """Open the knowledge DB.
+
+    Read-only commands pass `read_only`, which opens it through a mode=ro
+    URI: no journal-mode switch or write-lock setup, and a stray write fails.
+    """
     if not os.path.exists(DB_PATH):
         print(f"Error: Database not found at {DB_PATH}", file=sys.stderr)
         print("Run setup.sh first.", file=sys.stderr)
         sys.exit(2)
-    conn = sqlite3.connect(DB_PATH, timeout=30)
+    if _repl_conns is not None and read_only in _repl_conns:
+        return _repl_conns[read_only]
+    factory = sqlite3.Connection if _repl_conns is None else _SharedConnection
+    if read_only:
+        conn = sqlite3.connect(f"{Path(DB_PATH).as_uri()}?mode=ro", uri=True, timeout=30,
+                               factory=factory)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=30, factory=factory)
+        conn.execute("PRAGMA journal_mode=WAL")
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(_CONN_PRAGMAS)
+    if _repl_conns is not None:
+        _repl_conns[read_only] = conn
     return conn
 
 
+# Output separators, built once
+_RULE = '=' * 60
+_THIN_RULE = '-' * 40
+_ENTITY_HEADER = f"\n{_RULE}\n  {{name}}  ({{type}})\n{_RULE}"
+
+# cmd_query statements over a batch of entity ids ({ids} = placeholders), in
+# current-only and --history variants; rows come back grouped per entity
+SQL_FACTS_CURRENT = """
+    SELECT * FROM facts WHERE entity_id IN ({ids}) AND valid_to IS NULL
+    ORDER BY entity_id, attribute
+"""
+SQL_FACTS_ALL = """
+    SELECT * FROM facts WHERE entity_id IN ({ids})
+    ORDER BY entity_id, attribute, valid_from DESC
+"""
+SQL_RELS_OUT_CURRENT = """
+    SELECT r.*, e.name as target_name FROM relations r
+    JOIN entities e ON r.to_entity_id = e.id
+    WHERE r.from_entity_id IN ({ids}) AND r.valid_to IS NULL
+    ORDER BY r.from_entity_id, r.relation_type
+"""
+SQL_RELS_OUT_ALL = """
+    SELECT r.*, e.name as target_name FROM relations r
+    JOIN entities e ON r.to_entity_id = e.id
+    WHERE r.from_entity_id IN ({ids})
+    ORDER BY r.from_entity_id, r.relation_type, r.valid_from DESC
+"""
+SQL_RELS_IN_CURRENT = """
+    SELECT r.*, e.name as source_name FROM relations r
+    JOIN entities e ON r.from_entity_id = e.id
+    WHERE r.to_entity_id IN ({ids}) AND r.valid_to IS NULL
+    ORDER BY r.to_entity_id, r.relation_type
+"""
+SQL_RELS_IN_ALL = """
+    SELECT r.*, e.name as source_name FROM relations r
+    JOIN entities e ON r.from_entity_id = e.id
+    WHERE r.to_entity_id IN ({ids})
+    ORDER BY r.to_entity_id, r.relation_type, r.valid_from DESC
+"""
+
+# Ids per IN (...) list, under SQLite's historical 999-variable limit
+_MAX_IN_IDS = 900
+
+# cmd_domain: latest current facts of one entity, values cut to the printed 80 chars
+SQL_DOMAIN_FACTS = """
+    SELECT attribute, substr(value, 1, 80) AS value FROM facts
+    WHERE entity_id = ? AND valid_to IS NULL
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+
+
+def _rows_by(db: sqlite3.Connection, sql: str, ids: list, key: str) -> dict:
+    """Run a batched `{ids}` query, returning {row[key]: [rows]} in query order."""
+    grouped = defaultdict(list)
+    for i in range(0, len(ids), _MAX_IN_IDS):
+        chunk = ids[i:i + _MAX_IN_IDS]
+        for row in db.execute(sql.format(ids=",".join("?" * len(chunk))), chunk):
+            grouped[row[key]].append(row)
+    return grouped
+
+
 def cmd_query(args):
     """Query all facts about an entity."""
-    db = get_db()
+    db = get_db(read_only=True)
     name_pattern = f"%{args.entity}%"
 
-    # Find matching entities
+    # Find matching entities. LIKE is already case-insensitive (ASCII, like
+    # SQLite's lower()), so no per-row lower() calls on either side
     entities = db.execute(
-        "SELECT * FROM entities WHERE lower(name) LIKE lower(?)",
+        "SELECT * FROM entities WHERE name LIKE ?",
         (name_pattern,)
     ).fetchall()
 
@@ -39,22 +145,21 @@ def cmd_query(args):
         print(f"No entities matching '{args.entity}'")
         sys.exit(1)
 
+    # Facts and relations for all matched entities in three queries, not three per entity
+    if args.history:
+        sql_facts, sql_rels_out, sql_rels_in = SQL_FACTS_ALL, SQL_RELS_OUT_ALL, SQL_RELS_IN_ALL
+    else:
+        sql_facts, sql_rels_out, sql_rels_in = SQL_FACTS_CURRENT, SQL_RELS_OUT_CURRENT, SQL_RELS_IN_CURRENT
+    ids = [e['id'] for e in entities]
+    facts_by_entity = _rows_by(db, sql_facts, ids, 'entity_id')
+    rels_out_by_entity = _rows_by(db, sql_rels_out, ids, 'from_entity_id')
+    rels_in_by_entity = _rows_by(db, sql_rels_in, ids, 'to_entity_id')
+
     for entity in entities:
-        print(f"\n{'='*60}")
-        print(f"  {entity['name']}  ({entity['type']})")
-        print(f"{'='*60}")
-
-        # Current facts
-        if args.history:
-            facts = db.execute(
-                "SELECT * FROM facts WHERE entity_id = ? ORDER BY attribute, valid_from DESC",
-                (entity['id'],)
-            ).fetchall()
-        else:
-            facts = db.execute(
-                "SELECT * FROM facts WHERE entity_id = ? AND valid_to IS NULL ORDER BY attribute",
-                (entity['id'],)
-            ).fetchall()
+        print(_ENTITY_HEADER.format(name=entity['name'], type=entity['type']))
+
+        # Facts (current, or all with --history)
+        facts = facts_by_entity.get(entity['id'], ())
 
         if facts:
             print("\n  Facts:")
@@ -66,37 +171,9 @@ def cmd_query(args):
                 if args.verbose and f['source']:
                     print(f"      source: {f['source']}  |  since: {f['valid_from']}")
 
-        # Current relations (outgoing)
-        if args.history:
-            rels_out = db.execute("""
-                SELECT r.*, e.name as target_name FROM relations r
-                JOIN entities e ON r.to_entity_id = e.id
-                WHERE r.from_entity_id = ?
-                ORDER BY r.relation_type, r.valid_from DESC
-            """, (entity['id'],)).fetchall()
-        else:
-            rels_out = db.execute("""
-                SELECT r.*, e.name as target_name FROM relations r
-                JOIN entities e ON r.to_entity_id = e.id
-                WHERE r.from_entity_id = ? AND r.valid_to IS NULL
-                ORDER BY r.relation_type
-            """, (entity['id'],)).fetchall()
-
-        # Current relations (incoming)
-        if args.history:
-            rels_in = db.execute("""
-                SELECT r.*, e.name as source_name FROM relations r
-                JOIN entities e ON r.from_entity_id = e.id
-                WHERE r.to_entity_id = ?
-                ORDER BY r.relation_type, r.valid_from DESC
-            """, (entity['id'],)).fetchall()
-        else:
-            rels_in = db.execute("""
-                SELECT r.*, e.name as source_name FROM relations r
-                JOIN entities e ON r.from_entity_id = e.id
-                WHERE r.to_entity_id = ? AND r.valid_to IS NULL
-                ORDER BY r.relation_type
-            """, (entity['id'],)).fetchall()
+        # Relations (outgoing, then incoming)
+        rels_out = rels_out_by_entity.get(entity['id'], ())
+        rels_in = rels_in_by_entity.get(entity['id'], ())
 
         if rels_out or rels_in:
             print("\n  Relations:")
@@ -112,18 +189,35 @@ def cmd_query(args):
 
 def cmd_search(args):
     """Full-text search across facts and decisions."""
-    db = get_db()
+    db = get_db(read_only=True)
     query = args.query
     found = False
 
-    like_pattern = f"%{query}%"
-    facts = db.execute("""
+    match = search_match(query)
+    if match and has_search_index(db):
+        # Same filters (and row order) as the LIKE scan below, with the text
+        # test answered by kb_fts
+        where = ("{alias}.id IN (SELECT m.ref FROM kb_fts JOIN kb_fts_map m ON m.id = kb_fts.rowid "
+                 "WHERE kb_fts MATCH ? AND m.kind = '{kind}')")
+        fact_where = where.format(alias="f", kind="fact")
+        decision_where = where.format(alias="decisions", kind="decision")
+        entity_where = where.format(alias="entities", kind="entity")
+        fact_params = decision_params = entity_params = (match,)
+    else:
+        like_pattern = f"%{query}%"
+        fact_where = "(f.value LIKE ? OR f.attribute LIKE ?)"
+        decision_where = "(title LIKE ? OR rationale LIKE ?)"
+        entity_where = "name LIKE ?"
+        fact_params = decision_params = (like_pattern, like_pattern)
+        entity_params = (like_pattern,)
+
+    facts = db.execute(f"""
         SELECT f.*, e.name as entity_name FROM facts f
         JOIN entities e ON f.entity_id = e.id
-        WHERE (lower(f.value) LIKE lower(?) OR lower(f.attribute) LIKE lower(?))
+        WHERE {fact_where}
         AND f.valid_to IS NULL
-        ORDER BY e.name
-    """, (like_pattern, like_pattern)).fetchall()
+        ORDER BY e.name, f.rowid
+    """, fact_params).fetchall()
 
     if facts:
         found = True
@@ -131,12 +225,12 @@ def cmd_search(args):
         for f in facts:
             print(f"    [{f['entity_name']}] {f['attribute']}: {f['value']}")
 
-    # Search decisions
-    decisions = db.execute("""
-        SELECT * FROM decisions
-        WHERE lower(title) LIKE lower(?) OR lower(rationale) LIKE lower(?)
-        ORDER BY decided_at DESC
-    """, (like_pattern, like_pattern)).fetchall()
+    # Search decisions; rationale comes back already cut to the printed 120 chars
+    decisions = db.execute(f"""
+        SELECT title, status, substr(rationale, 1, 120) AS rationale FROM decisions
+        WHERE {decision_where}
+        ORDER BY decided_at DESC, rowid
+    """, decision_params).fetchall()
 
     if decisions:
         found = True
@@ -145,12 +239,12 @@ def cmd_search(args):
             status_marker = "" if d['status'] == 'active' else f" [{d['status']}]"
             print(f"    {d['title']}{status_marker}")
             if d['rationale']:
-                print(f"      Rationale: {d['rationale'][:120]}")
+                print(f"      Rationale: {d['rationale']}")
 
     # Search entity names
     entities = db.execute(
-        "SELECT * FROM entities WHERE lower(name) LIKE lower(?)",
-        (like_pattern,)
+        f"SELECT * FROM entities WHERE {entity_where} ORDER BY rowid",
+        entity_params
     ).fetchall()
 
     if entities:
@@ -166,11 +260,9 @@ def cmd_search(args):
     db.close()
 
 
-def cmd_decisions(args):
-    """List decisions."""
-    db = get_db()
-
-    if args.all:
+def format_decisions(db, include_all: bool = False) -> str:
+    """Render decisions as `kb decisions` prints them ("" when there are none)."""
+    if include_all:
         decisions = db.execute(
             "SELECT * FROM decisions ORDER BY decided_at DESC"
         ).fetchall()
@@ -180,26 +272,34 @@ def cmd_decisions(args):
         ).fetchall()
 
     if not decisions:
-        print("No decisions recorded.")
-        sys.exit(1)
+        return ""
 
-    print(f"\n  {'Active ' if not args.all else ''}Decisions:")
-    print(f"  {'='*60}")
+    lines = [f"\n  {'Active ' if not include_all else ''}Decisions:", f"  {_RULE}"]
     for d in decisions:
         status_marker = "" if d['status'] == 'active' else f" [{d['status']}]"
-        print(f"\n  {d['title']}{status_marker}")
-        print(f"  Decided: {d['decided_at']}")
+        lines.append(f"\n  {d['title']}{status_marker}")
+        lines.append(f"  Decided: {d['decided_at']}")
         if d['rationale']:
-            print(f"  Rationale: {d['rationale']}")
+            lines.append(f"  Rationale: {d['rationale']}")
         if d['context']:
-            print(f"  Context: {d['context']}")
+            lines.append(f"  Context: {d['context']}")
+    return "\n".join(lines)
+
 
+def cmd_decisions(args):
+    """List decisions."""
+    db = get_db(read_only=True)
+    text = format_decisions(db, args.all)
+    if not text:
+        print("No decisions recorded.")
+        sys.exit(1)
+    print(text)
     db.close()
 
 
 def cmd_entities(args):
     """List all entities."""
-    db = get_db()
+    db = get_db(read_only=True)
 
     entities = db.execute("""
         SELECT e.*, COUNT(f.id) as fact_count
@@ -218,7 +318,7 @@ def cmd_entities(args):
         if e['type'] != current_type:
             current_type = e['type']
             print(f"\n  {current_type.upper()}")
-            print(f"  {'-'*40}")
+            print(f"  {_THIN_RULE}")
         print(f"    {e['name']}  ({e['fact_count']} facts)")
 
     db.close()
@@ -226,31 +326,50 @@ def cmd_entities(args):
 
 def cmd_assert(args):
     """Assert a fact (manual write)."""
-    import uuid
+    import secrets
+    from datetime import datetime, timezone
     db = get_db()
-    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-
-    # Find or create entity
-    entity = db.execute(
-        "SELECT * FROM entities WHERE lower(name) = lower(?)",
-        (args.entity,)
-    ).fetchone()
-
-    if not entity:
-        entity_id = str(uuid.uuid4())[:8]
-        entity_type = args.type or 'concept'
-        db.execute(
-            "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-            (entity_id, args.entity, entity_type, now, now)
-        )
-        print(f"  Created entity: {args.entity} ({entity_type})")
+    utc_now = datetime.now(timezone.utc)
+    now = utc_now.strftime('%Y-%m-%dT%H:%M:%SZ')
+    today = utc_now.strftime('%Y-%m-%d')
+
+    # One write transaction from the lookups on: a concurrent assert can't
+    # slip in between "no current fact" and the INSERT, and it commits once
+    db.execute("BEGIN IMMEDIATE")
+
+    # Find or create entity. With extract.py's unique lower(name) index this
+    # is one UPSERT (an existing entity just gets updated_at touched);
+    # otherwise look up through the plain expression index, then write
+    new_id = secrets.token_hex(4)
+    entity_type = args.type or 'concept'
+    has_name_index = db.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND name='idx_entities_name_lower'"
+    ).fetchone()[0]
+    if has_name_index:
+        entity_id = db.execute(
+            "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(lower(name)) DO UPDATE SET updated_at = excluded.updated_at RETURNING id",
+            (new_id, args.entity, entity_type, now, now)
+        ).fetchone()['id']
     else:
-        entity_id = entity['id']
-        db.execute(
-            "UPDATE entities SET updated_at = ? WHERE id = ?",
-            (now, entity_id)
-        )
+        entity = db.execute(
+            "SELECT id FROM entities WHERE lower(name) = lower(?)",
+            (args.entity,)
+        ).fetchone()
+        if entity:
+            entity_id = entity['id']
+            db.execute(
+                "UPDATE entities SET updated_at = ? WHERE id = ?",
+                (now, entity_id)
+            )
+        else:
+            entity_id = new_id
+            db.execute(
+                "INSERT INTO entities (id, name, type, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (entity_id, args.entity, entity_type, now, now)
+            )
+    if entity_id == new_id:
+        print(f"  Created entity: {args.entity} ({entity_type})")
 
     # Supersede existing fact for same attribute
     existing = db.execute(
@@ -258,7 +377,7 @@ def cmd_assert(args):
         (entity_id, args.attribute)
     ).fetchone()
 
-    fact_id = str(uuid.uuid4())[:8]
+    fact_id = secrets.token_hex(4)
 
     if existing:
         db.execute(
@@ -286,8 +405,10 @@ def cmd_correct(args):
 
 def cmd_delete_fact(args):
     """Delete a fact (expire it with no replacement)."""
+    from datetime import datetime, timezone
     db = get_db()
     now = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    db.execute("BEGIN IMMEDIATE")  # Lookup and expiry as one write transaction
 
     entity = db.execute(
         "SELECT * FROM entities WHERE lower(name) = lower(?)",
@@ -320,14 +441,16 @@ def cmd_delete_fact(args):
 
 def cmd_recent(args):
     """Show recently extracted facts for review."""
-    db = get_db()
-    cutoff = (datetime.now(timezone.utc) - __import__('datetime').timedelta(days=args.days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    from datetime import datetime, timedelta, timezone
+    db = get_db(read_only=True)
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime('%Y-%m-%dT%H:%M:%SZ')
 
     facts = db.execute("""
-        SELECT e.name, e.type, f.attribute, f.value, f.source, f.created_at
+        SELECT e.name, e.type, f.attribute, substr(f.value, 1, 80) AS value, f.source,
+               substr(f.created_at, 1, 16) AS created_at
         FROM facts f JOIN entities e ON f.entity_id = e.id
         WHERE f.created_at > ? AND f.valid_to IS NULL
-        ORDER BY f.created_at DESC
+        ORDER BY f.created_at DESC, f.rowid DESC
         LIMIT ?
     """, (cutoff, args.limit)).fetchall()
 
@@ -339,19 +462,21 @@ def cmd_recent(args):
     print(f"  Recent facts ({len(facts)} in last {args.days}d):\n")
     for f in facts:
         src = f['source'].split('/')[-1][:30] if f['source'] else '?'
-        print(f"  [{f['name']}] {f['attribute']} = {f['value'][:80]}")
-        print(f"    source: {src} | {f['created_at'][:16]}")
+        print(f"  [{f['name']}] {f['attribute']} = {f['value']}")
+        print(f"    source: {src} | {f['created_at']}")
     db.close()
 
 
 def cmd_decide(args):
     """Log a decision."""
-    import uuid
+    import secrets
+    from datetime import datetime, timezone
     db = get_db()
-    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    utc_now = datetime.now(timezone.utc)
+    now = utc_now.strftime('%Y-%m-%dT%H:%M:%SZ')
+    today = utc_now.strftime('%Y-%m-%d')
 
-    decision_id = str(uuid.uuid4())[:8]
+    decision_id = secrets.token_hex(4)
     db.execute(
         "INSERT INTO decisions (id, title, rationale, status, context, decided_at, created_at) VALUES (?, ?, ?, 'active', ?, ?, ?)",
         (decision_id, args.title, args.rationale, args.context, today, now)
@@ -362,9 +487,20 @@ def cmd_decide(args):
     db.close()
 
 
+def _age_str(secs: int) -> str:
+    """Coarse age for status lines: '12m ago', '3h ago', '2d ago'."""
+    if secs < 3600:
+        return f"{secs // 60}m ago"
+    if secs < 86400:
+        return f"{secs // 3600}h ago"
+    return f"{secs // 86400}d ago"
+
+
 def cmd_status(args):
     """Show KB health: daemon status, last extraction, DB stats."""
     import subprocess
+    from datetime import datetime, timezone
+    now = datetime.now(timezone.utc)
     kb_dir = str(get_kb_dir())
     marker_path = os.path.join(kb_dir, ".last-extraction")
     log_path = os.path.join(kb_dir, "extraction.log")
@@ -378,69 +514,69 @@ def cmd_status(args):
         with open(marker_path) as f:
             last_epoch = int(f.read().strip())
         last_dt = datetime.fromtimestamp(last_epoch, tz=timezone.utc)
-        age_secs = int((datetime.now(timezone.utc) - last_dt).total_seconds())
-        if age_secs < 3600:
-            age_str = f"{age_secs // 60}m ago"
-        elif age_secs < 86400:
-            age_str = f"{age_secs // 3600}h ago"
-        else:
-            age_str = f"{age_secs // 86400}d ago"
+        age_secs = int((now - last_dt).total_seconds())
+        age_str = _age_str(age_secs)
         healthy = age_secs < 7200  # <2h = healthy (daemon runs every 30m)
         indicator = "OK" if healthy else "STALE"
         print(f"\n  Last extraction: {last_dt.strftime('%Y-%m-%d %H:%M UTC')} ({age_str}) [{indicator}]")
     else:
         print(f"\n  Last extraction: NEVER (marker file missing)")
 
-    # 2. Daemon status
-    try:
-        result = subprocess.run(
-            ["launchctl", "print", f"gui/{os.getuid()}/{get_daemon_label()}"],
-            capture_output=True, text=True, timeout=5
-        )
-        if result.returncode == 0:
-            print(f"  Daemon: LOADED (launchd, every 30m)")
-        else:
-            print(f"  Daemon: NOT LOADED")
-    except Exception:
-        print(f"  Daemon: UNKNOWN (couldn't check launchctl)")
+    # 2. Daemon status: the launchd plist on disk plus extraction.log
+    # activity; forking launchctl for the loaded state only with --deep
+    plist_path = os.path.expanduser(f"~/Library/LaunchAgents/{get_daemon_label()}.plist")
+    if args.deep:
+        try:
+            result = subprocess.run(
+                ["launchctl", "print", f"gui/{os.getuid()}/{get_daemon_label()}"],
+                capture_output=True, text=True, timeout=5
+            )
+            if result.returncode == 0:
+                print(f"  Daemon: LOADED (launchd, every 30m)")
+            else:
+                print(f"  Daemon: NOT LOADED")
+        except Exception:
+            print(f"  Daemon: UNKNOWN (couldn't check launchctl)")
+    elif not os.path.exists(plist_path):
+        print(f"  Daemon: NOT INSTALLED (no launchd plist)")
+    elif os.path.exists(log_path):
+        log_age = int(now.timestamp() - os.path.getmtime(log_path))
+        print(f"  Daemon: INSTALLED (log written {_age_str(log_age)}; --deep to ask launchctl)")
+    else:
+        print(f"  Daemon: INSTALLED (no log yet; --deep to ask launchctl)")
 
     # 3. BRIEF.md age
     if os.path.exists(brief_path):
         brief_mtime = os.path.getmtime(brief_path)
         brief_dt = datetime.fromtimestamp(brief_mtime, tz=timezone.utc)
-        brief_age = int((datetime.now(timezone.utc) - brief_dt).total_seconds())
-        if brief_age < 3600:
-            brief_age_str = f"{brief_age // 60}m ago"
-        elif brief_age < 86400:
-            brief_age_str = f"{brief_age // 3600}h ago"
-        else:
-            brief_age_str = f"{brief_age // 86400}d ago"
-        print(f"  BRIEF.md: {brief_age_str}")
+        brief_age = int((now - brief_dt).total_seconds())
+        print(f"  BRIEF.md: {_age_str(brief_age)}")
     else:
         print(f"  BRIEF.md: MISSING")
 
     # 4. DB stats
-    db = get_db()
-    entity_count = db.execute("SELECT COUNT(*) as c FROM entities").fetchone()['c']
-    fact_count = db.execute("SELECT COUNT(*) as c FROM facts WHERE valid_to IS NULL").fetchone()['c']
-    superseded = db.execute("SELECT COUNT(*) as c FROM facts WHERE valid_to IS NOT NULL").fetchone()['c']
-    decision_count = db.execute("SELECT COUNT(*) as c FROM decisions WHERE status = 'active'").fetchone()['c']
-    relation_count = db.execute("SELECT COUNT(*) as c FROM relations WHERE valid_to IS NULL").fetchone()['c']
-
-    # Facts added in last 7 days
-    week_ago = (datetime.now(timezone.utc)).strftime('%Y-%m-%d')
-    recent_facts = db.execute(
-        "SELECT COUNT(*) as c FROM facts WHERE created_at > datetime('now', '-7 days')"
-    ).fetchone()['c']
+    db = get_db(read_only=True)
+    # One statement; the three facts counts (current, superseded, added in
+    # the last 7 days) share a single pass over facts
+    stats = db.execute("""
+        SELECT (SELECT COUNT(*) FROM entities) AS entities,
+               (SELECT COUNT(*) FROM decisions WHERE status = 'active') AS decisions,
+               (SELECT COUNT(*) FROM relations WHERE valid_to IS NULL) AS relations,
+               COALESCE(SUM(valid_to IS NULL), 0) AS current,
+               COALESCE(SUM(valid_to IS NOT NULL), 0) AS superseded,
+               COALESCE(SUM(created_at > datetime('now', '-7 days')), 0) AS recent
+        FROM facts
+    """).fetchone()
+    entity_count, fact_count, superseded = stats['entities'], stats['current'], stats['superseded']
+    decision_count, relation_count = stats['decisions'], stats['relations']
+    recent_facts = stats['recent']
 
     print(f"\n  DB: {entity_count} entities, {fact_count} facts, {relation_count} relations, {decision_count} decisions")
     print(f"  This week: {recent_facts} new facts, {superseded} total superseded")
 
     # 5. Last 5 log lines
     if os.path.exists(log_path):
-        with open(log_path) as f:
-            lines = f.readlines()
-        recent = lines[-5:] if len(lines) >= 5 else lines
+        recent = tail_lines(log_path, 5)
         if recent:
             print(f"\n  Recent log:")
             for line in recent:
@@ -452,7 +588,7 @@ def cmd_status(args):
 
 def cmd_domain(args):
     """List entities in a domain with their top facts."""
-    db = get_db()
+    db = get_db(read_only=True)
     # Normalize domain name (case-insensitive lookup from config)
     domain_map = {name.lower(): name for name, _ in get_domains()}
     domain_map["other"] = "Other"
@@ -474,7 +610,7 @@ def cmd_domain(args):
         LEFT JOIN facts f ON f.entity_id = e.id AND f.valid_to IS NULL
         WHERE ed.domain = ?
         GROUP BY e.id
-        ORDER BY fact_count DESC
+        ORDER BY fact_count DESC, e.name
     """, (domain,)).fetchall()
 
     if not entities:
@@ -484,30 +620,68 @@ def cmd_domain(args):
         sys.exit(1)
 
     print(f"\n  Domain: {domain} ({len(entities)} entities)")
-    print(f"  {'='*60}")
+    print(f"  {_RULE}")
 
     max_facts = args.facts if hasattr(args, 'facts') else 3
 
+    cur = db.cursor()
     for e in entities:
         conf = f" [{e['confidence']:.0%}]" if e['confidence'] < 1.0 else ""
         print(f"\n  **{e['name']}** ({e['type']}, {e['fact_count']}f){conf}")
 
         if max_facts > 0:
-            facts = db.execute("""
-                SELECT attribute, value FROM facts
-                WHERE entity_id = ? AND valid_to IS NULL
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, (e['id'], max_facts)).fetchall()
+            facts = cur.execute(SQL_DOMAIN_FACTS, (e['id'], max_facts)).fetchall()
 
             for f in facts:
-                val = f['value'][:80] if len(f['value']) > 80 else f['value']
-                print(f"    {f['attribute']}: {val}")
+                print(f"    {f['attribute']}: {f['value']}")
 
     db.close()
 
 
-def main():
+def cmd_repl(args):
+    """Run kb commands read from stdin, one per line, on shared connections.
+
+    Each line is parsed like a command line (`query Foo -v`); connect and
+    PRAGMA setup happen once per session instead of once per command.
+    """
+    import shlex
+    global _repl_conns
+    _repl_conns = {}
+    parser = build_parser()
+    prompt = "kb> " if sys.stdin.isatty() else ""
+    try:
+        while True:
+            try:
+                line = input(prompt)
+            except EOFError:
+                break
+            try:
+                argv = shlex.split(line)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                continue
+            if not argv:
+                continue
+            if argv[0] in ('quit', 'exit'):
+                break
+            try:
+                sub = parser.parse_args(argv)
+                if sub.command != 'repl':
+                    COMMANDS[sub.command](sub)
+            except SystemExit:
+                pass
+            except Exception as e:  # e.g. "database is locked": report it, keep the session
+                print(f"Error: {e}", file=sys.stderr)
+            for conn in _repl_conns.values():
+                conn.close()  # Rolls back whatever a failed command left open
+            sys.stdout.flush()
+    finally:
+        for conn in _repl_conns.values():
+            sqlite3.Connection.close(conn)
+        _repl_conns = None
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Knowledge Base CLI — query and manage semantic knowledge",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -562,30 +736,44 @@ def main():
     p_decide.add_argument('--context', help='Related context or entity names')
 
     # status
-    subparsers.add_parser('status', help='Show KB health: daemon, last extraction, stats')
+    p_status = subparsers.add_parser('status', help='Show KB health: daemon, last extraction, stats')
+    p_status.add_argument('--deep', action='store_true', help='Ask launchctl whether the daemon is loaded')
 
     # domain
     p_domain = subparsers.add_parser('domain', help='List entities in a domain (brain region)')
     p_domain.add_argument('domain', help='Domain name (as configured in config.json)')
     p_domain.add_argument('--facts', type=int, default=3, help='Max facts per entity (default: 3, 0=names only)')
 
-    args = parser.parse_args()
-
-    commands = {
-        'query': cmd_query,
-        'search': cmd_search,
-        'decisions': cmd_decisions,
-        'entities': cmd_entities,
-        'assert': cmd_assert,
-        'correct': cmd_correct,
-        'delete-fact': cmd_delete_fact,
-        'recent': cmd_recent,
-        'decide': cmd_decide,
-        'status': cmd_status,
-        'domain': cmd_domain,
-    }
-
-    commands[args.command](args)
+    # repl
+    subparsers.add_parser('repl', help='Read commands from stdin, reusing one DB connection')
+
+    return parser
+
+
+COMMANDS = {
+    'query': cmd_query,
+    'search': cmd_search,
+    'decisions': cmd_decisions,
+    'entities': cmd_entities,
+    'assert': cmd_assert,
+    'correct': cmd_correct,
+    'delete-fact': cmd_delete_fact,
+    'recent': cmd_recent,
+    'decide': cmd_decide,
+    'status': cmd_status,
+    'domain': cmd_domain,
+    'repl': cmd_repl,
+}
+
+
+def main():
+    # A terminal stdout is line-buffered, so the many short print() calls
+    # would each be a write; buffer them and flush once at exit (repl
+    # flushes after every command)
+    if sys.stdout.isatty():
+        sys.stdout.reconfigure(line_buffering=False)
+    args = build_parser().parse_args()
+    COMMANDS[args.command](args)
 
 
 if __name__ == '__main__':
@@ -12,12 +12,39 @@ Usage:
 import sqlite3
 import sys
 from collections import defaultdict
+from functools import lru_cache
 
 from config import get_db_path, get_domains, detect_domain
 
 DB_PATH = str(get_db_path())
 
 
+def _domain_case_sql(db: sqlite3.Connection) -> tuple[str, list]:
+    """SQL expression (and its parameters) giving detect_domain(f.source) or 'Other'.
+
+    Domains are tested in configured order with instr() on the lowercased
+    source. SQLite's lower() only folds ASCII, so with any non-ASCII pattern
+    detect_domain itself is registered instead, memoized per distinct source
+    (many facts share one session source).
+    """
+    domains = [(name, patterns) for name, patterns in get_domains() if patterns]
+    if not all(p.isascii() for _, patterns in domains for p in patterns):
+        @lru_cache(maxsize=None)
+        def classify(source: str) -> str:
+            return detect_domain(source) or "Other"
+
+        db.create_function("detect_domain", 1, classify, deterministic=True)
+        return "detect_domain(f.source)", []
+    whens, params = [], []
+    for name, patterns in domains:
+        whens.append("WHEN " + " OR ".join(["instr(lower(f.source), ?) > 0"] * len(patterns)) + " THEN ?")
+        params.extend(p.lower() for p in patterns)
+        params.append(name)
+    if not whens:
+        return "'Other'", []
+    return f"CASE {' '.join(whens)} ELSE 'Other' END", params
+
+
 def main():
     dry_run = "--dry" in sys.argv
 
@@ -28,31 +55,60 @@ def main():
 
     db = sqlite3.connect(DB_PATH)
     db.row_factory = sqlite3.Row
-
-    # Count facts per entity per domain
-    entity_domains = defaultdict(lambda: defaultdict(int))  # entity_id -> {domain -> count}
+    db.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+    """)
+
+    all_entities = dict(db.execute("SELECT id, name FROM entities ORDER BY rowid").fetchall())
+
+    # Count facts per entity per domain; SQLite classifies and groups, so
+    # Python sees one row per (entity, domain). Facts without a source get
+    # a NULL domain: not counted, but their entity isn't an orphan. Rows
+    # come sorted by entity name, then (as the old per-fact scan saw them)
+    # by each entity's, then domain's, first sourced fact
+    if not dry_run:
+        # Covering index for the scan below: entity_id, source and rowid
+        # straight from the index, in GROUP BY order. Dropped again after the
+        # scan: facts(entity_id) already serves everything else, and a
+        # permanent copy would cost every later fact insert
+        db.execute("CREATE INDEX IF NOT EXISTS idx_facts_entity_source ON facts(entity_id, source)")
+        db.execute("ANALYZE facts")
+    domain_sql, domain_params = _domain_case_sql(db)
+    entity_domains = defaultdict(dict)  # entity_id -> {domain -> count}
     entity_names = {}
-
-    for row in db.execute("""
-        SELECT f.entity_id, f.source, e.name
+    with_facts = set()
+
+    for row in db.execute(f"""
+        SELECT f.entity_id, e.name,
+               CASE WHEN f.source IS NOT NULL THEN {domain_sql} END AS domain,
+               COUNT(*) AS cnt,
+               MIN(MIN(CASE WHEN f.source IS NOT NULL THEN f.rowid END))
+                   OVER (PARTITION BY f.entity_id) AS entity_first,
+               MIN(f.rowid) AS domain_first
         FROM facts f
         JOIN entities e ON f.entity_id = e.id
-        WHERE f.source IS NOT NULL
-    """):
-        domain = detect_domain(row['source']) or "Other"
-        entity_domains[row['entity_id']][domain] += 1
+        GROUP BY f.entity_id, domain
+        ORDER BY e.name, entity_first, domain_first
+    """, domain_params):
+        with_facts.add(row['entity_id'])
+        if row['domain'] is None:
+            continue
+        entity_domains[row['entity_id']][row['domain']] = row['cnt']
         entity_names[row['entity_id']] = row['name']
+    if not dry_run:
+        db.execute("DROP INDEX IF EXISTS idx_facts_entity_source")
 
     # Also check relations — entities only connected via relations get the domain of their related entities
     # (skip for now, handle in reconciliation)
 
     total_assignments = 0
     domain_counts = defaultdict(int)
+    rows = []  # (entity_id, domain, confidence) for one executemany
+    preview = ["DRY RUN — no changes will be made\n"]  # dry-run lines, written at once
 
-    if dry_run:
-        print("DRY RUN — no changes will be made\n")
-
-    for entity_id, doms in sorted(entity_domains.items(), key=lambda x: entity_names.get(x[0], '')):
+    for entity_id, doms in entity_domains.items():
         total_facts = sum(doms.values())
         name = entity_names.get(entity_id, entity_id)
 
@@ -61,33 +117,34 @@ def main():
 
             if dry_run:
                 marker = " ★" if confidence >= 0.5 else ""
-                print(f"  {name:40s} → {domain:15s} ({count}/{total_facts} facts, conf={confidence}){marker}")
+                preview.append(f"  {name:40s} → {domain:15s} ({count}/{total_facts} facts, conf={confidence}){marker}")
             else:
-                db.execute("""
-                    INSERT OR REPLACE INTO entity_domains (entity_id, domain, confidence, source)
-                    VALUES (?, ?, ?, 'migration')
-                """, (entity_id, domain, confidence))
+                rows.append((entity_id, domain, confidence))
 
             total_assignments += 1
             domain_counts[domain] += 1
 
-    if not dry_run:
+    if dry_run:
+        sys.stdout.write("\n".join(preview) + "\n")
+    else:
+        db.execute("BEGIN IMMEDIATE")
+        db.executemany("""
+            INSERT OR REPLACE INTO entity_domains (entity_id, domain, confidence, source)
+            VALUES (?, ?, ?, 'migration')
+        """, rows)
         db.commit()
 
     print(f"\n{'Would assign' if dry_run else 'Assigned'} {total_assignments} domain memberships:")
     for domain, count in sorted(domain_counts.items(), key=lambda x: -x[1]):
         print(f"  {domain}: {count} entities")
 
-    # Entities with no facts (and thus no domain)
-    orphans = db.execute("""
-        SELECT e.id, e.name FROM entities e
-        WHERE NOT EXISTS (SELECT 1 FROM facts f WHERE f.entity_id = e.id)
-    """).fetchall()
+    # Entities with no facts (and thus no domain), from the same snapshot
+    orphans = [name for eid, name in all_entities.items() if eid not in with_facts]
 
     if orphans:
         print(f"\n{len(orphans)} entities with no facts (no domain assigned):")
-        for o in orphans[:10]:
-            print(f"  {o['name']}")
+        for name in orphans[:10]:
+            print(f"  {name}")
         if len(orphans) > 10:
             print(f"  ... and {len(orphans) - 10} more")
 
@@ -38,7 +38,8 @@ from pathlib import Path
 
 from config import (get_kb_dir, get_pending_file, get_review_file, get_audit_log,
                     get_skill_fixes_file, get_session_offsets_file,
-                    get_artifact_offsets_file, get_proposals_file)
+                    get_artifact_offsets_file, get_proposals_file, run_in_process,
+                    tail_lines)
 
 KB_DIR = get_kb_dir()
 PENDING_FILE = get_pending_file()
@@ -94,6 +95,8 @@ def show_status():
                 offsets = json.loads(Path(path).read_text())
                 print(f"**{label}**: {len(offsets)} session(s) tracked")
                 for k, v in sorted(offsets.items())[:5]:
+                    if isinstance(v, dict):
+                        v = v.get("msg_index")
                     print(f"  - {k[:30]}... → offset {v}")
                 if len(offsets) > 5:
                     print(f"  ... and {len(offsets) - 5} more")
@@ -105,8 +108,7 @@ def show_status():
 
     # Recent audit log
     if AUDIT_LOG.exists():
-        lines = AUDIT_LOG.read_text().strip().split("\n")
-        recent = lines[-10:] if len(lines) > 10 else lines
+        recent = tail_lines(AUDIT_LOG, 10)
         print(f"**Recent audit log** (last {len(recent)} entries):")
         for line in recent:
             print(f"  {line}")
@@ -122,44 +124,62 @@ def show_status():
         print("**Last review**: none")
 
 
+def _run_stage(module: str, script: Path, argv: list[str], timeout: int,
+               isolate: bool = False) -> int:
+    """Run a stage script's main(argv) in this interpreter; returns its exit code.
+
+    Saves a python3 startup and re-import per stage. With `isolate` the script
+    runs as a subprocess instead (raising subprocess.TimeoutExpired after
+    `timeout` seconds); in-process, only the stage's own network and
+    subprocess timeouts apply.
+    """
+    if isolate:
+        return subprocess.run(["python3", str(script), *argv], timeout=timeout).returncode
+    import importlib
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    return run_in_process(importlib.import_module(module).main, argv)
+
+
 def run_reconcile(dry_run: bool = False, execute: bool = False, output: str = None,
-                  skip_consistency: bool = False):
+                  skip_consistency: bool = False, isolate: bool = False):
     """Run Stage 2 reconciliation, batching if artifact count exceeds threshold."""
     BATCH_SIZE = 15  # GLM-5 times out with >15 artifacts + system state context
 
-    # Check artifact count to decide on batching
-    pending_count = 0
+    # Check artifact count to decide on batching (the parsed list is reused
+    # to split batches)
+    pending = []
     if PENDING_FILE.exists():
         try:
             pending = json.loads(PENDING_FILE.read_text())
-            pending_count = len(pending)
         except (json.JSONDecodeError, OSError):
             pass
+    pending_count = len(pending)
 
     print("=" * 60)
     print("STAGE 2: Reconciliation")
     print("=" * 60)
 
     def _build_cmd():
-        cmd = ["python3", str(RECONCILE_SCRIPT)]
+        cmd = []
         if dry_run:
             cmd.append("--dry-run")
         if execute:
             cmd.append("--execute")
         if skip_consistency:
             cmd.append("--skip-consistency")
+        if isolate:
+            cmd.append("--isolate")
         if output:
             cmd.extend(["--output", output])
         return cmd
 
     if pending_count <= BATCH_SIZE:
-        cmd = _build_cmd()
-        result = subprocess.run(cmd, timeout=600)
-        return result.returncode
+        return _run_stage("pipeline_reconcile", RECONCILE_SCRIPT, _build_cmd(), 600, isolate)
     else:
         # Batch: split artifacts, run reconciliation per batch
         print(f"Batching: {pending_count} artifacts in groups of {BATCH_SIZE}")
-        all_pending = json.loads(PENDING_FILE.read_text())
+        all_pending = pending
         overall_exit = 0
 
         for i in range(0, len(all_pending), BATCH_SIZE):
@@ -169,13 +189,13 @@ def run_reconcile(dry_run: bool = False, execute: bool = False, output: str = No
             print(f"\n--- Batch {batch_num}/{total_batches} ({len(batch)} artifacts) ---")
 
             # Write batch to pending file
-            PENDING_FILE.write_text(json.dumps(batch, indent=2))
+            with open(PENDING_FILE, "w") as f:
+                json.dump(batch, f, indent=2)
 
-            cmd = _build_cmd()
             try:
-                result = subprocess.run(cmd, timeout=600)
-                if result.returncode != 0:
-                    overall_exit = result.returncode
+                returncode = _run_stage("pipeline_reconcile", RECONCILE_SCRIPT, _build_cmd(), 600, isolate)
+                if returncode != 0:
+                    overall_exit = returncode
             except subprocess.TimeoutExpired:
                 print(f"  Batch {batch_num} timed out — skipping")
                 overall_exit = 1
@@ -185,17 +205,16 @@ def run_reconcile(dry_run: bool = False, execute: bool = False, output: str = No
         return overall_exit
 
 
-def run_executor(plan_file: str, dry_run: bool = False):
+def run_executor(plan_file: str, dry_run: bool = False, isolate: bool = False):
     """Run Stage 3 executor on an action plan."""
-    cmd = ["python3", str(EXECUTOR_SCRIPT), "--plan", plan_file]
+    argv = ["--plan", plan_file]
     if dry_run:
-        cmd.append("--dry-run")
+        argv.append("--dry-run")
 
     print("=" * 60)
     print("STAGE 3: Execution")
     print("=" * 60)
-    result = subprocess.run(cmd, timeout=120)
-    return result.returncode
+    return _run_stage("executor", EXECUTOR_SCRIPT, argv, 120, isolate)
 
 
 PROPOSALS_FILE = get_proposals_file()
@@ -229,7 +248,7 @@ def show_proposals():
     return proposals
 
 
-def approve_proposals(indices: str, dry_run: bool = False):
+def approve_proposals(indices: str, dry_run: bool = False, isolate: bool = False):
     """Approve and execute specific proposals by index (1-based) or 'all'.
 
     Usage:
@@ -289,9 +308,10 @@ def approve_proposals(indices: str, dry_run: bool = False):
         "summary": f"Standup approval: {len(actions)} proposal(s) approved by user",
     }
 
-    # Write to temp file and execute
+    # Write to temp file and execute (streamed: no full serialized copy in memory)
     plan_file = "/tmp/standup-approved-plan.json"
-    Path(plan_file).write_text(json.dumps(plan, indent=2))
+    with open(plan_file, "w") as f:
+        json.dump(plan, f, indent=2)
 
     if dry_run:
         print(f"\n[DRY RUN] Would execute {len(actions)} action(s):")
@@ -299,7 +319,7 @@ def approve_proposals(indices: str, dry_run: bool = False):
             print(f"  - {a['type']}: {a['target']}")
         return
 
-    exit_code = run_executor(plan_file)
+    exit_code = run_executor(plan_file, isolate=isolate)
 
     # Clear proposals file after execution (regardless of partial failures)
     PROPOSALS_FILE.write_text("[]")
@@ -487,6 +507,8 @@ def main():
                         help="Dismiss all pending skill fix proposals")
     parser.add_argument("--skip-consistency", action="store_true",
                         help="Skip live consistency check, use cached result")
+    parser.add_argument("--isolate", action="store_true",
+                        help="Run reconcile/executor stages as subprocesses instead of in-process")
 
     args = parser.parse_args()
 
@@ -511,7 +533,7 @@ def main():
         return
 
     if args.approve:
-        approve_proposals(args.approve, dry_run=args.dry_run)
+        approve_proposals(args.approve, dry_run=args.dry_run, isolate=args.isolate)
         return
 
     if args.dismiss_proposals:
@@ -532,7 +554,7 @@ def main():
 
     if args.plan:
         # Execute a specific action plan
-        return run_executor(args.plan, dry_run=args.dry_run)
+        return run_executor(args.plan, dry_run=args.dry_run, isolate=args.isolate)
 
     if args.reconcile or (not args.status and not args.show_pending and not args.clear_pending
                           and not args.plan and not args.show_proposals
@@ -546,6 +568,7 @@ def main():
             execute=args.execute,
             output=output if not args.execute else None,
             skip_consistency=args.skip_consistency,
+            isolate=args.isolate,
         )
 
         if exit_code != 0:
@@ -28,20 +28,22 @@ Usage:
 import argparse
 import json
 import os
-import subprocess
 import sys
+import threading
 import time
-import urllib.request
-import urllib.error
-from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import orjson  # Optional: faster JSON for the multi-KB API payloads and responses
+except ImportError:
+    orjson = None
+
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import (get_openrouter_url, get_reconciliation_model, get_kb_dir,
                     get_pending_file, get_konban_script, get_brain_script,
                     get_linear_script, get_skills_dir, get_api_key,
                     get_http_referer, get_git_repos, get_consistency_cache_file,
-                    cfg)
+                    get_state_cache_dir, get_llm_cache_dir, cfg, run_in_process, http_post)
 
 # --- Config ---
 
@@ -50,6 +52,15 @@ DEFAULT_MODEL = get_reconciliation_model()
 KB_DIR = get_kb_dir()
 PENDING_FILE = get_pending_file()
 TIMING_LOG = KB_DIR / "reconciliation-timing.log"
+STATE_CACHE_DIR = get_state_cache_dir()
+STATE_CACHE_TTL = cfg("state_cache_ttl", 120)  # seconds; 0 disables
+# Artifacts per reconciliation call; a run's batch is split into calls of this
+# size made concurrently (at most RECONCILE_CALL_WORKERS at a time)
+RECONCILE_CALL_SIZE = cfg("reconciliation_call_size", 8)
+RECONCILE_CALL_WORKERS = 4
+SHIP_MATCH_RATIO = cfg("ship_commit_match_ratio", 0.8)  # 0 disables the pre-filter
+LLM_CACHE_DIR = get_llm_cache_dir()
+LLM_CACHE_TTL = cfg("llm_cache_ttl", 3600)  # seconds; 0 disables
 
 
 # --- Timing ---
@@ -81,7 +92,7 @@ def _end(extra: str = ""):
 def _write_timing_log(exit_reason: str = "ok"):
     """Append timing breakdown to log file."""
     total = sum(d for _, d in _timings)
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    ts = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
     lines = [f"\n--- {ts} | exit={exit_reason} | total={total:.1f}s ---"]
     for phase, dur in _timings:
         pct = (dur / total * 100) if total > 0 else 0
@@ -320,6 +331,9 @@ If nothing needs to be done, return empty arrays. Do NOT create actions for arti
 
 def run_cmd(args: list[str], timeout: int = 30) -> str:
     """Run a command and return stdout, or empty string on failure."""
+    # Imported here: an idle run (nothing pending, cached consistency result)
+    # never spawns anything
+    import subprocess
     try:
         result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
         return result.stdout.strip() if result.returncode == 0 else ""
@@ -327,6 +341,78 @@ def run_cmd(args: list[str], timeout: int = 30) -> str:
         return ""
 
 
+def _atomic_write(path, data: bytes):
+    """Write `data` to a temp file in one write() and swap it in with os.replace().
+
+    A crash or SIGTERM mid-write leaves the previous file intact instead of a
+    truncated one.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _pretty_json(obj) -> bytes:
+    """Indented JSON for files people read (plans, reports, the pending queue)."""
+    return json.dumps(obj, indent=2, default=str).encode("utf-8")
+
+
+def _state_cache(name: str, loader, ttl: int = STATE_CACHE_TTL, key=None) -> str:
+    """Return loader() output, reusing a copy cached on disk for up to `ttl` seconds.
+
+    Back-to-back runs (--dry-run, then --execute) skip the subprocess and its
+    Notion/git round-trip. `key`, a callable, invalidates early when its value
+    changes (e.g. git HEADs). Placeholder outputs ("[... unavailable]") are
+    never cached.
+    """
+    if ttl <= 0:
+        return loader()
+    header = f"# key={key() if key else ''}\n"
+    path = STATE_CACHE_DIR / f"{name}.txt"
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            cached = path.read_text()
+            if cached.startswith(header):
+                return cached[len(header):]
+    except OSError:
+        pass
+
+    output = loader()
+    if output.startswith("["):
+        return output
+    try:
+        STATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _prune_cache_dir(STATE_CACHE_DIR, ttl)
+        _atomic_write(path, (header + output).encode("utf-8"))
+    except OSError:
+        pass
+    return output
+
+
+def _clear_state_cache():
+    """Drop every cached state load (after actions changed that state)."""
+    try:
+        for path in STATE_CACHE_DIR.glob("*.txt"):
+            path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def _limit_lines(text: str, n: int) -> tuple[str, int]:
+    """First `n` lines of `text` and the number of lines cut, without splitting it into a list."""
+    idx = -1
+    for _ in range(n):
+        idx = text.find("\n", idx + 1)
+        if idx < 0:
+            return text, 0
+    return text[:idx], text.count("\n", idx + 1) + 1
+
+
 def load_konban_state() -> str:
     """Load current Konban board state with task descriptions."""
     if not KONBAN_SCRIPT or not KONBAN_SCRIPT.exists():
@@ -352,44 +438,135 @@ def load_brain_active_context() -> str:
 
 
 def load_recent_decisions() -> str:
-    """Load recent KB decisions."""
+    """Load recent KB decisions.
+
+    Rendered in-process via kb.format_decisions rather than a `kb.py decisions`
+    subprocess, saving an interpreter start. (Konban and Brain stay
+    subprocesses: they are external scripts, and capturing their stdout
+    in-process isn't safe while the other loads run on sibling threads.)
+    """
     if not KB_SCRIPT.exists():
         return "[KB unavailable]"
-    output = run_cmd(["python3", str(KB_SCRIPT), "decisions"], timeout=15)
-    if output:
-        lines = output.split("\n")
-        if len(lines) > 25:
-            output = "\n".join(lines[:25]) + f"\n... ({len(lines) - 25} more)"
+    import sqlite3
+    import kb
+    output = ""
+    if os.path.exists(kb.DB_PATH):
+        try:
+            db = kb.get_db(read_only=True)
+            try:
+                output = kb.format_decisions(db).strip()
+            finally:
+                db.close()
+        except sqlite3.Error:
+            pass
+    output, more = _limit_lines(output, 25)
+    if more:
+        output += f"\n... ({more} more)"
     return output or "[No recent decisions]"
 
 
 GIT_REPOS = get_git_repos()
 
 
+# Lines of git log --stat kept per repo. Every commit takes at least one line,
+# so git can stop after this many commits without changing what's shown.
+GIT_LOG_MAX_LINES = 80
+
+
+def _repo_git_log(repo: Path, days: int) -> str:
+    """Compact recent history of one repo: message line plus changed files per commit."""
+    output = run_cmd(
+        ["git", "-C", str(repo), "log", "--all", f"--since={days} days ago",
+         f"--max-count={GIT_LOG_MAX_LINES}", "--no-merges", "--decorate=short",
+         "--format=%h %d %s (%ar)", "--stat", "--stat-width=80"],
+        timeout=15,
+    )
+    output, more = _limit_lines(output, GIT_LOG_MAX_LINES)
+    if more:
+        output += f"\n... ({more} more lines)"
+    return output
+
+
 def load_git_history(days: int = 7) -> str:
     """Load recent git commit history across tracked repos.
 
     Uses --stat to include changed filenames, so the reconciliation LLM can
     detect staleness from migration files, renamed functions, etc. — not just
-    commit message keywords.
+    commit message keywords. Repos are read concurrently (one git process
+    each); sections keep the configured repo order.
     """
-    sections = []
+    import concurrent.futures
+
+    repos = [repo for repo in GIT_REPOS if (repo / ".git").exists()]
+    if not repos:
+        return "[No recent commits]"
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(repos), 8)) as pool:
+        outputs = list(pool.map(lambda repo: _repo_git_log(repo, days), repos))
+    sections = [f"### {repo.name}\n{output}" for repo, output in zip(repos, outputs) if output]
+    return "\n\n".join(sections) if sections else "[No recent commits]"
+
+
+def _git_heads() -> str:
+    """HEAD commit of every tracked repo — cache key for load_git_history."""
+    return ",".join(run_cmd(["git", "-C", str(repo), "rev-parse", "HEAD"], timeout=5)
+                    for repo in GIT_REPOS if (repo / ".git").exists())
+
+
+def load_shipped_commit_subjects(days: int = 7) -> list[str]:
+    """Subjects of recent "Ship:" (production deploy) commits, prefix stripped."""
+    subjects = []
     for repo in GIT_REPOS:
         if not (repo / ".git").exists():
             continue
-        # Compact stat: commit message + changed files on one line each
         output = run_cmd(
             ["git", "-C", str(repo), "log", "--all", f"--since={days} days ago",
-             "--no-merges", "--decorate=short",
-             "--format=%h %d %s (%ar)", "--stat", "--stat-width=80"],
+             "--no-merges", "--grep=^Ship:", "--format=%s"],
             timeout=15,
         )
-        if output:
-            lines = output.split("\n")
-            if len(lines) > 80:
-                output = "\n".join(lines[:80]) + f"\n... ({len(lines) - 80} more lines)"
-            sections.append(f"### {repo.name}\n{output}")
-    return "\n\n".join(sections) if sections else "[No recent commits]"
+        subjects += [line[len("Ship:"):].strip() for line in output.split("\n")
+                     if line.startswith("Ship:")]
+    return subjects
+
+
+def prefilter_shipped_artifacts(artifacts: list, subjects: list[str],
+                                min_ratio: float = SHIP_MATCH_RATIO) -> tuple[list, list]:
+    """Settle artifacts that plainly restate an already-shipped commit without the model.
+
+    An artifact whose title matches a "Ship:" commit subject at `min_ratio`
+    similarity or better becomes a local no_action; everything else (and every
+    completion signal or error pattern, which the model turns into real
+    actions) goes on to reconciliation. Returns (remaining, no_action actions).
+    """
+    import difflib
+
+    if not subjects or min_ratio <= 0:
+        return artifacts, []
+    lowered = [(subject, subject.lower()) for subject in subjects]
+    remaining, settled = [], []
+    for a in artifacts:
+        title = (a.get("title") or "").strip()
+        match = None
+        if title and a.get("type") not in ("commitment_update", "error_pattern"):
+            # seq2 is the one SequenceMatcher indexes, so it's the fixed title
+            matcher = difflib.SequenceMatcher(None, "", title.lower())
+            for subject, subject_lower in lowered:
+                matcher.set_seq1(subject_lower)
+                if (matcher.real_quick_ratio() >= min_ratio and matcher.quick_ratio() >= min_ratio
+                        and matcher.ratio() >= min_ratio):
+                    match = subject
+                    break
+        if match is None:
+            remaining.append(a)
+            continue
+        settled.append({
+            "type": "no_action",
+            "target": title,
+            "content": "",
+            "confidence": "high",
+            "rationale": f"[pre-filter] Stale: already shipped per commit \"Ship: {match}\"",
+            "source_artifact": title,
+        })
+    return remaining, settled
 
 
 def load_brain_index() -> str:
@@ -455,7 +632,7 @@ def load_relevant_skill_docs(artifacts: list) -> str:
     return "\n\n".join(parts)
 
 
-def load_system_state(artifacts: list = None) -> str:
+def load_system_state(artifacts: list = None, use_cache: bool = True) -> str:
     """Load all system state for reconciliation context.
 
     Runs independent state loads in parallel for speed.
@@ -463,6 +640,8 @@ def load_system_state(artifacts: list = None) -> str:
     Args:
         artifacts: Optional list of pending artifacts. When provided,
             loads SKILL.md docs referenced by error_pattern artifacts.
+        use_cache: Reuse state loads cached within the last STATE_CACHE_TTL
+            seconds (see _state_cache). False forces fresh loads.
     """
     import concurrent.futures
 
@@ -475,14 +654,18 @@ def load_system_state(artifacts: list = None) -> str:
         elapsed = time.monotonic() - start
         return name, result, elapsed
 
-    # All independent loads run in parallel
+    def cache(name, loader, **kwargs):
+        return _state_cache(name, loader, **kwargs) if use_cache else loader()
+
+    # All independent loads run in parallel; the slow, rarely-changing ones
+    # go through the on-disk state cache
     loads = [
-        ("load_konban", load_konban_state),
+        ("load_konban", lambda: cache("load_konban", load_konban_state)),
         ("load_linear", load_linear_state),
-        ("load_brain_ac", load_brain_active_context),
-        ("load_brain_index", load_brain_index),
-        ("load_decisions", load_recent_decisions),
-        ("load_git", load_git_history),
+        ("load_brain_ac", lambda: cache("load_brain_ac", load_brain_active_context)),
+        ("load_brain_index", lambda: cache("load_brain_index", load_brain_index)),
+        ("load_decisions", lambda: cache("load_decisions", load_recent_decisions)),
+        ("load_git", lambda: cache("load_git", load_git_history, key=_git_heads)),
     ]
 
     results = {}
@@ -593,17 +776,179 @@ If nothing is stale, return empty stale_items array. Be thorough but PRECISE —
 
 # --- Model calls ---
 
-def call_state_consistency_check(system_state: str, model: str = DEFAULT_MODEL) -> dict:
+def _read_chat_content(resp, deadline: float | None = None) -> str:
+    """Collect the message content of a chat completion response.
+
+    Requests ask for a server-sent event stream, so content is assembled as
+    deltas arrive rather than after one large body read; a provider that
+    answers with plain JSON is handled too. The socket timeout only bounds
+    each read, so a stream still trickling at `deadline` (time.monotonic())
+    raises TimeoutError.
+    """
+    import http.client
+
+    if not (resp.getheader("Content-Type") or "").startswith("text/event-stream"):
+        result = _decode_response_json(resp.read())
+        return result.get("choices", [{}])[0].get("message", {}).get("content", "") or ""
+    parts = []
+    for line in resp:  # to EOF, past [DONE], so the connection stays reusable
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("response stream exceeded the request deadline")
+        if not line.startswith(b"data: ") or line.startswith(b"data: [DONE]"):
+            continue  # ": keep-alive" comments, blank separators
+        chunk = _decode_response_json(line[6:])
+        if "error" in chunk:
+            raise http.client.HTTPException(f"stream error: {chunk['error']}")
+        delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content")
+        if delta:
+            parts.append(delta)
+    return "".join(parts)
+
+
+def _decode_response_json(raw: bytes) -> dict:
+    """Parse one response body or stream chunk; a malformed or truncated one
+    raises http.client.HTTPException, like any other bad response."""
+    import http.client
+
+    try:
+        result = _json_from_bytes(raw)
+    except ValueError as e:  # orjson/json decode errors, bad UTF-8
+        raise http.client.HTTPException(f"malformed response: {e}") from e
+    if not isinstance(result, dict):
+        raise http.client.HTTPException(f"malformed response: {type(result).__name__}")
+    return result
+
+
+def _timed_call(fn, *args):
+    """Run fn(*args) and return (result, elapsed_seconds) — for worker threads,
+    which can't share the module-level _start/_end phase."""
+    t0 = time.monotonic()
+    result = fn(*args)
+    return result, time.monotonic() - t0
+
+
+def _llm_cache_key(*parts: str) -> str:
+    """Content hash of everything that determines a model result."""
+    import hashlib
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _load_llm_cache(key: str) -> dict | None:
+    """Return a model result cached for identical input within LLM_CACHE_TTL, or None."""
+    if LLM_CACHE_TTL <= 0:
+        return None
+    path = LLM_CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime < LLM_CACHE_TTL:
+            return json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        pass
+    return None
+
+
+def _store_llm_cache(key: str, result: dict):
+    """Remember a parsed model result so a re-run on unchanged input skips the call."""
+    if LLM_CACHE_TTL <= 0:
+        return
+    path = LLM_CACHE_DIR / f"{key}.json"
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _prune_cache_dir(LLM_CACHE_DIR, LLM_CACHE_TTL)
+        _atomic_write(path, _json_bytes(result))
+    except OSError:
+        pass
+
+
+def _prune_cache_dir(cache_dir: Path, ttl: int):
+    """Delete cache files (and stray temp files) older than `ttl` seconds.
+
+    Keys change with nearly every run's state, so entries would otherwise
+    pile up forever; run before each store.
+    """
+    cutoff = time.time() - ttl
+    for path in cache_dir.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def _json_bytes(obj) -> bytes:
+    """Compact JSON bytes, via orjson when installed (stdlib for what it can't encode)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(obj, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _json_from_bytes(raw: bytes):
+    """Parse a JSON response body, via orjson when installed."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw.decode("utf-8"))
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_model_json(content: str) -> dict:
+    """Parse the JSON object in a model response in one pass.
+
+    Scanning starts after any </think> or <output> tag; raw_decode then reads
+    from the first "{" and ignores whatever follows the object, so markdown
+    fences and trailing prose need no stripping. Raises json.JSONDecodeError
+    when no object is found.
+    """
+    start = content.rfind("</think>")
+    start = 0 if start < 0 else start + len("</think>")
+    output_tag = content.find("<output>", start)
+    if output_tag >= 0:
+        start = output_tag + len("<output>")
+    idx = content.find("{", start)
+    if idx < 0:
+        raise json.JSONDecodeError("No JSON object in response", content, start)
+    obj, _ = _JSON_DECODER.raw_decode(content, idx)
+    if not isinstance(obj, dict):
+        raise json.JSONDecodeError("Response JSON is not an object", content, idx)
+    return obj
+
+
+def _system_state_block(system_state: str) -> dict:
+    """User-message content part carrying the system state, marked for prompt caching.
+
+    Providers with explicit caching (Anthropic, Gemini via OpenRouter) cache
+    the prefix up to this part; automatic prefix caching needs it to come
+    before anything call-specific. Others ignore the marker.
+    """
+    return {
+        "type": "text",
+        "text": f"<system_state>\n{system_state}\n</system_state>",
+        "cache_control": {"type": "ephemeral"},
+    }
+
+
+def call_state_consistency_check(system_state: str, model: str = DEFAULT_MODEL,
+                                 use_cache: bool = True) -> dict:
     """Check system state for internal inconsistencies (Active Context vs git, etc.)."""
+    cache_key = _llm_cache_key(STATE_CONSISTENCY_PROMPT, model, system_state)
+    if use_cache and (cached := _load_llm_cache(cache_key)) is not None:
+        print("  State consistency: unchanged input, using cached result")
+        return cached
+
     api_key = get_api_key()
 
-    user_content = (
-        "Check this system state for inconsistencies.\n\n"
-        f"<system_state>\n{system_state}\n</system_state>\n\n"
-        "Return ONLY valid JSON."
-    )
+    user_content = [
+        _system_state_block(system_state),
+        {"type": "text", "text": "Check this system state for inconsistencies.\n\n"
+                                 "Return ONLY valid JSON."},
+    ]
 
-    payload = json.dumps({
+    payload = _json_bytes({
         "model": model,
         "messages": [
             {"role": "system", "content": STATE_CONSISTENCY_PROMPT},
@@ -611,46 +956,35 @@ def call_state_consistency_check(system_state: str, model: str = DEFAULT_MODEL)
         ],
         "temperature": 0.1,
         "provider": {"data_collection": "deny"},
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        OPENROUTER_URL,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-            **({"HTTP-Referer": get_http_referer()} if get_http_referer() else {}),
-            "X-Title": "KB State Consistency",
-        },
-    )
+        "stream": True,
+    })
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        **({"HTTP-Referer": get_http_referer()} if get_http_referer() else {}),
+        "X-Title": "KB State Consistency",
+    }
 
+    import http.client
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-    except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError) as e:
+        deadline = time.monotonic() + 120
+        status, content, _ = http_post(OPENROUTER_URL, payload, headers, timeout=120,
+                                     read=lambda resp: _read_chat_content(resp, deadline))
+    except (OSError, http.client.HTTPException) as e:
         print(f"  State consistency check failed: {e}", file=sys.stderr)
         return {"stale_items": [], "summary": f"Check failed: {type(e).__name__}"}
-
-    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+    if status != 200:  # Anything else carries an error body (bytes), not content
+        print(f"  State consistency check failed: HTTP {status}", file=sys.stderr)
+        return {"stale_items": [], "summary": "Check failed: HTTPError"}
     if not content:
         return {"stale_items": [], "summary": "Empty response"}
 
-    # Parse JSON (same cleanup as reconciliation)
-    content = content.strip()
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1]
-        content = content.rsplit("```", 1)[0]
-    if "<think>" in content:
-        content = content.split("</think>")[-1].strip()
-    if not content.startswith("{"):
-        idx = content.find("{")
-        if idx >= 0:
-            content = content[idx:]
-
     try:
-        return json.loads(content)
+        parsed = _parse_model_json(content)
     except json.JSONDecodeError:
         return {"stale_items": [], "summary": "Parse failed"}
+    _store_llm_cache(cache_key, parsed)
+    return parsed
 
 
 def _build_domain_preamble(artifacts_json: str) -> str:
@@ -678,21 +1012,47 @@ def _build_domain_preamble(artifacts_json: str) -> str:
     return "\n".join(lines)
 
 
-def call_reconciliation_model(artifacts_json: str, system_state: str, model: str = DEFAULT_MODEL) -> dict:
-    """Call GLM-5 to reconcile artifacts against system state."""
+class ReconciliationFailed(Exception):
+    """A reconciliation call failed (already reported on stderr).
+
+    Raised on a worker thread; main() ends the timed phase, logs
+    `exit_reason` and exits, so the phase bookkeeping stays on one thread.
+    """
+
+    def __init__(self, note: str, exit_reason: str):
+        super().__init__(note)
+        self.note = note
+        self.exit_reason = exit_reason
+
+
+def call_reconciliation_model(artifacts_json: str, system_state: str, model: str = DEFAULT_MODEL,
+                              use_cache: bool = True) -> dict:
+    """Call GLM-5 to reconcile artifacts against system state.
+
+    Runs on a pool thread; failures raise ReconciliationFailed.
+    """
+    cache_key = _llm_cache_key(RECONCILIATION_PROMPT, model, artifacts_json, system_state)
+    if use_cache and (cached := _load_llm_cache(cache_key)) is not None:
+        print("  Reconciliation: unchanged input, using cached result")
+        return cached
+
     api_key = get_api_key()
 
     domain_preamble = _build_domain_preamble(artifacts_json)
 
-    user_content = (
-        f"{domain_preamble}"
-        "Reconcile these artifacts against the current system state.\n\n"
-        f"<artifacts>\n{artifacts_json}\n</artifacts>\n\n"
-        f"<system_state>\n{system_state}\n</system_state>\n\n"
-        "Return ONLY valid JSON with your reconciliation results."
-    )
+    # System state first: it's identical across a run's sub-batch calls, so
+    # the prompt + state prefix is cacheable; the artifacts vary per call.
+    user_content = [
+        _system_state_block(system_state),
+        {"type": "text", "text": (
+            f"{domain_preamble}"
+            "Reconcile these artifacts against the current system state above.\n\n"
+            f"<artifacts>\n{artifacts_json}\n</artifacts>\n\n"
+            "Return ONLY valid JSON with your reconciliation results."
+        )},
+    ]
 
-    payload = json.dumps({
+    payload = _json_bytes({
         "model": model,
         "messages": [
             {"role": "system", "content": RECONCILIATION_PROMPT},
@@ -700,71 +1060,75 @@ def call_reconciliation_model(artifacts_json: str, system_state: str, model: str
         ],
         "temperature": 0.1,
         "provider": {"data_collection": "deny"},
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        OPENROUTER_URL,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-            **({"HTTP-Referer": get_http_referer()} if get_http_referer() else {}),
-            "X-Title": "KB Reconciliation",
-        },
-    )
+        "stream": True,
+    })
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        **({"HTTP-Referer": get_http_referer()} if get_http_referer() else {}),
+        "X-Title": "KB Reconciliation",
+    }
 
+    import http.client
     try:
-        with urllib.request.urlopen(req, timeout=180) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        print(f"Error: OpenRouter API returned {e.code}: {body}", file=sys.stderr)
-        _end(f"HTTP {e.code}")
-        _write_timing_log(f"reconciliation_http_{e.code}")
-        sys.exit(1)
-    except urllib.error.URLError as e:
-        print(f"Error: Could not reach OpenRouter: {e.reason}", file=sys.stderr)
-        _end(f"URLError: {e.reason}")
-        _write_timing_log("reconciliation_url_error")
-        sys.exit(1)
+        deadline = time.monotonic() + 180
+        status, content, _ = http_post(OPENROUTER_URL, payload, headers, timeout=180,
+                                     read=lambda resp: _read_chat_content(resp, deadline))
     except TimeoutError:
         print(f"Error: OpenRouter request timed out (180s)", file=sys.stderr)
-        _end("timeout_180s")
-        _write_timing_log("reconciliation_timeout")
-        sys.exit(1)
-
-    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        raise ReconciliationFailed("timeout_180s", "reconciliation_timeout")
+    except (OSError, http.client.HTTPException) as e:
+        print(f"Error: Could not reach OpenRouter: {e}", file=sys.stderr)
+        raise ReconciliationFailed(f"URLError: {e}", "reconciliation_url_error")
+    if status != 200:  # Anything else carries an error body (bytes), not content
+        body = content.decode("utf-8", errors="replace")
+        print(f"Error: OpenRouter API returned {status}: {body}", file=sys.stderr)
+        raise ReconciliationFailed(f"HTTP {status}", f"reconciliation_http_{status}")
     if not content:
         print("Error: Empty response from model", file=sys.stderr)
-        _write_timing_log("reconciliation_empty_response")
-        sys.exit(1)
-
-    # Parse JSON
-    content = content.strip()
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1]
-        content = content.rsplit("```", 1)[0]
-    if "<think>" in content:
-        content = content.split("</think>")[-1].strip()
-    if "<output>" in content:
-        content = content.split("<output>")[1].split("</output>")[0].strip()
-    if not content.startswith("{"):
-        idx = content.find("{")
-        if idx >= 0:
-            content = content[idx:]
+        raise ReconciliationFailed("empty response", "reconciliation_empty_response")
 
     try:
-        return json.loads(content)
+        parsed = _parse_model_json(content)
     except json.JSONDecodeError as e:
         print(f"Error parsing reconciliation response: {e}", file=sys.stderr)
         print(f"Raw (first 500 chars):\n{content[:500]}", file=sys.stderr)
-        _write_timing_log("reconciliation_parse_error")
-        sys.exit(1)
+        raise ReconciliationFailed("parse error", "reconciliation_parse_error")
+    _store_llm_cache(cache_key, parsed)
+    return parsed
+
+
+def _run_executor(executor_path: Path, plan: dict, isolate: bool = False) -> int:
+    """Execute an action plan in this interpreter; returns the exit code.
+
+    Saves a python3 startup and the executor's imports on every --execute run
+    (the module stays loaded across pipeline.py batches; run_plan resets its
+    per-run dedup caches). With `isolate` it runs as a subprocess with a 120s
+    timeout instead, as pipeline.py's stages do. Either way the plan is handed over directly (the subprocess
+    reads it from stdin), with no plan file for concurrent runs to clobber.
+    """
+    if isolate:
+        import subprocess
+        return subprocess.run(["python3", str(executor_path), "--stdin"],
+                              input=_json_bytes(plan), timeout=120).returncode
+    import executor
+    return run_in_process(executor.run_plan, plan)
+
+
+def _merge_action_plans(plans: list[dict]) -> dict:
+    """Combine the action plans of concurrently reconciled artifact sub-batches."""
+    if len(plans) == 1:
+        return plans[0]
+    return {
+        "proposed_actions": [a for p in plans for a in p.get("proposed_actions", [])],
+        "conflicts_flagged": [c for p in plans for c in p.get("conflicts_flagged", [])],
+        "summary": " ".join(p["summary"] for p in plans if p.get("summary")),
+    }
 
 
 # --- Main ---
 
-def main():
+def main(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(description="Reconcile pending artifacts against system state")
     parser.add_argument("--artifacts", help="Path to artifacts JSON (default: pending file)")
     parser.add_argument("--model", "-m", default=DEFAULT_MODEL,
@@ -778,10 +1142,17 @@ def main():
                         help="Only run state consistency check (no artifact reconciliation)")
     parser.add_argument("--skip-consistency", action="store_true",
                         help="Skip live consistency check, use cached result instead")
+    parser.add_argument("--isolate", action="store_true",
+                        help="With --execute, run the executor as a subprocess instead of in-process")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Reload all system state instead of reusing recently cached loads")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Call the models even when their input matches a cached result")
     parser.add_argument("--batch-size", type=int, default=None,
                         help="Max artifacts per run (default: from config, currently 15)")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    _timings.clear()  # pipeline.py may call main() once per batch in one process
 
     batch_size = args.batch_size or cfg("reconciliation_batch_size", 15)
 
@@ -790,6 +1161,7 @@ def main():
     has_artifacts = False
     actionable = []
     deferred = []
+    prefiltered = []
 
     if os.path.exists(artifacts_path):
         with open(artifacts_path) as f:
@@ -803,6 +1175,14 @@ def main():
                       or (a.get("type") == "commitment_update"
                           and a.get("update_type") == "completion")]
 
+        # Artifacts that just restate a shipped commit are settled here, so
+        # the model only sees ones that need judgment
+        if actionable and SHIP_MATCH_RATIO > 0:
+            actionable, prefiltered = prefilter_shipped_artifacts(
+                actionable, load_shipped_commit_subjects())
+            if prefiltered:
+                print(f"Pre-filter: {len(prefiltered)} artifact(s) already shipped per git")
+
         # Batch: process up to batch_size, keep the rest for next run
         if len(actionable) > batch_size:
             deferred = actionable[batch_size:]
@@ -811,9 +1191,42 @@ def main():
 
         has_artifacts = len(actionable) > 0
 
-    # Load system state (includes SKILL.md docs when error_patterns are pending)
-    system_state = load_system_state(artifacts=actionable if has_artifacts else None)
-    print()
+    # Load system state (includes SKILL.md docs when error_patterns are pending).
+    # Only the model calls read it: with nothing to reconcile and a cached
+    # consistency result, an idle tick skips the subprocess fan-out entirely.
+    system_state = ""
+    if has_artifacts or not args.skip_consistency:
+        system_state = load_system_state(artifacts=actionable if has_artifacts else None,
+                                         use_cache=not args.no_cache)
+        print()
+
+    # The model calls only need system_state, so they run side by side: the
+    # critical path is the slowest call, not the sum. Larger artifact sets are
+    # split into sub-batches reconciled concurrently.
+    import concurrent.futures
+    call_batches = [actionable[i:i + RECONCILE_CALL_SIZE]
+                    for i in range(0, len(actionable), RECONCILE_CALL_SIZE)]
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1 + min(len(call_batches), RECONCILE_CALL_WORKERS))
+
+    consistency_future = None
+    if not args.skip_consistency:
+        print(f"Running state consistency check ({args.model})...")
+        consistency_future = pool.submit(_timed_call, call_state_consistency_check,
+                                         system_state, args.model, not args.no_llm_cache)
+
+    reconcile_futures = []
+    if has_artifacts and not args.consistency_only:
+        _start("reconciliation")
+        calls = f" in {len(call_batches)} concurrent calls" if len(call_batches) > 1 else ""
+        print(f"Reconciling {len(actionable)} artifact(s){calls}...")
+        for batch in call_batches:
+            artifacts_json = _json_bytes(batch).decode("utf-8")
+            total_input = len(artifacts_json) + len(system_state)
+            print(f"Calling {args.model} ({total_input} chars total input)...")
+            reconcile_futures.append(pool.submit(call_reconciliation_model, artifacts_json,
+                                                 system_state, args.model, not args.no_llm_cache))
+    pool.shutdown(wait=False)
 
     # State consistency check
     cache_file = get_consistency_cache_file()
@@ -832,20 +1245,20 @@ def main():
                 pass
         print(f"Using cached consistency result ({cache_age_str})")
     else:
-        # Run live consistency check
-        _start("consistency_check")
-        print(f"Running state consistency check ({args.model})...")
-        consistency = call_state_consistency_check(system_state, args.model)
-        _end(f"{len(consistency.get('stale_items', []))} stale items")
+        # Live consistency check (submitted above)
+        consistency, elapsed = consistency_future.result()
+        _timings.append(("consistency_check", elapsed))
+        print(f"  [consistency_check] {elapsed:.1f}s — "
+              f"{len(consistency.get('stale_items', []))} stale items")
 
         # Cache the result
         try:
             cache_data = {
-                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
                 "model": args.model,
                 "result": consistency,
             }
-            cache_file.write_text(json.dumps(cache_data, indent=2, default=str))
+            _atomic_write(cache_file, _pretty_json(cache_data))
         except OSError:
             pass
 
@@ -863,16 +1276,15 @@ def main():
 
     if args.consistency_only:
         if args.output:
-            with open(args.output, "w") as f:
-                json.dump(consistency, f, indent=2, default=str)
+            _atomic_write(args.output, _pretty_json(consistency))
             print(f"Consistency report saved to {args.output}")
         _write_timing_log("consistency_only")
         return
 
-    if not has_artifacts and not stale_items:
+    if not has_artifacts and not stale_items and not prefiltered:
         print("No pending artifacts and state is consistent. Nothing to do.")
         if artifacts_path == str(PENDING_FILE) and os.path.exists(artifacts_path):
-            PENDING_FILE.write_text("[]")
+            _atomic_write(PENDING_FILE, b"[]")
         _write_timing_log("nothing_to_do")
         return
 
@@ -880,14 +1292,18 @@ def main():
     action_plan = {"proposed_actions": [], "conflicts_flagged": [], "summary": ""}
 
     # Artifact reconciliation (if any)
-    if has_artifacts:
-        _start("reconciliation")
-        print(f"Reconciling {len(actionable)} artifact(s)...")
-        artifacts_json = json.dumps(actionable, indent=2, default=str)
-        total_input = len(artifacts_json) + len(system_state)
-        print(f"Calling {args.model} ({total_input} chars total input)...")
-        action_plan = call_reconciliation_model(artifacts_json, system_state, args.model)
+    if reconcile_futures:
+        try:
+            plans = [f.result() for f in reconcile_futures]
+        except ReconciliationFailed as e:
+            pool.shutdown(wait=False, cancel_futures=True)  # drop sub-batches not yet started
+            _end(e.note)
+            _write_timing_log(e.exit_reason)
+            sys.exit(1)
+        action_plan = _merge_action_plans(plans)
         _end(f"{len(action_plan.get('proposed_actions', []))} actions")
+    if prefiltered:
+        action_plan.setdefault("proposed_actions", []).extend(prefiltered)
 
     # Merge stale state findings — promote completed tasks/issues with git evidence
     # to done actions; route the rest as conflicts for review.
@@ -957,8 +1373,7 @@ def main():
 
     # Save action plan
     if args.output:
-        with open(args.output, "w") as f:
-            json.dump(action_plan, f, indent=2, default=str)
+        _atomic_write(args.output, _pretty_json(action_plan))
         print(f"Action plan saved to {args.output}")
 
     if args.dry_run:
@@ -973,7 +1388,7 @@ def main():
         if artifacts_path == str(PENDING_FILE):
             # Keep deferred artifacts (not yet reconciled) in the queue
             remaining = deferred if deferred else []
-            PENDING_FILE.write_text(json.dumps(remaining, indent=2, default=str))
+            _atomic_write(PENDING_FILE, _pretty_json(remaining))
             if deferred:
                 print(f"Queue updated: {len(deferred)} artifacts deferred to next run.")
             else:
@@ -983,17 +1398,12 @@ def main():
     if args.execute:
         executor_path = Path(__file__).resolve().parent / "executor.py"
         if executor_path.exists():
-            plan_file = "/tmp/reconciliation-plan.json"
-            with open(plan_file, "w") as f:
-                json.dump(action_plan, f, indent=2, default=str)
-
             print(f"\nExecuting action plan...")
-            result = subprocess.run(
-                ["python3", str(executor_path), "--plan", plan_file],
-                timeout=120,
-            )
-
-            if result.returncode == 0:
+            exit_code = _run_executor(executor_path, action_plan, args.isolate)
+            # Executed actions changed Konban/Brain/decisions: the next batch
+            # must not reconcile against the state cached before them
+            _clear_state_cache()
+            if exit_code == 0:
                 _write_deferred()
         else:
             print(f"Executor not found at {executor_path}")
@@ -17,180 +17,303 @@ import sqlite3
 import os
 import sys
 from collections import defaultdict
-from datetime import datetime, timezone
+from functools import lru_cache
 
-from config import get_db_path, get_owner_entity_names
+from config import get_db_path, get_owner_entity_names, cfg
 
 DB_PATH = str(get_db_path())
+SQLITE_CACHE_SIZE = cfg("sqlite_cache_size", -65536)  # Negative = KiB (64 MB)
 
 # Manually confirmed semantic duplicates: (canonical_name, duplicate_name)
 SEMANTIC_MERGES = get_owner_entity_names()
 
 
+_TRANS = str.maketrans('-_.', '   ')
+
+
+@lru_cache(maxsize=None)
 def normalize(name: str) -> str:
     """Normalize entity name for duplicate detection."""
-    n = name.lower().strip()
-    n = n.replace('-', ' ').replace('_', ' ').replace('.', ' ')
-    return ' '.join(n.split())
+    # Cached: the SQL window query calls it twice per row
+    return ' '.join(name.lower().translate(_TRANS).split())
 
 
-def find_duplicates(db) -> list[tuple[str, str]]:
-    """Find duplicate entity pairs: (keep_id, merge_id).
+def find_duplicates(db) -> list[tuple[str, str, str, str]]:
+    """Find duplicate entity pairs: (keep_id, keep_name, merge_id, merge_name).
 
-    Keep the entity with more facts. If tied, keep the one with the human-readable name.
+    Duplicates are grouped transitively; each group keeps one primary (a
+    configured canonical name, else the entity with more facts, else the one
+    with the human-readable name) and every other member merges into it.
     """
-    entities = db.execute('SELECT id, name, type FROM entities ORDER BY name').fetchall()
+    # Group by normalized name in SQL; only members of groups with 2+ entities
+    # come back, groups ordered by their first name and members by name (the
+    # order a full name-sorted scan met them in). normalize() stays in Python
+    # because SQLite's lower() is ASCII-only; it's registered per connection
+    # rather than indexed, so other writers never need the function.
+    # Each group is also ranked in SQL (rn = 1 is its primary: most current
+    # facts, then human-readable name, then highest name); current facts are
+    # only counted for group members.
+    db.create_function("normalize", 1, normalize, deterministic=True)
+    entities = db.execute("""
+        SELECT id, name, type, norm, fact_count,
+               ROW_NUMBER() OVER (PARTITION BY norm
+                                  ORDER BY fact_count DESC, readable DESC, name DESC) AS rn
+        FROM (
+            SELECT id, name, type, norm, group_first,
+                   (SELECT COUNT(*) FROM facts f
+                    WHERE f.entity_id = d.id AND f.valid_to IS NULL) AS fact_count,
+                   CASE WHEN instr(name, '-') OR instr(name, '_') THEN 0 ELSE 1 END AS readable
+            FROM (
+                SELECT id, name, type, normalize(name) AS norm,
+                       COUNT(*) OVER w AS group_size, MIN(name) OVER w AS group_first
+                FROM entities
+                WINDOW w AS (PARTITION BY normalize(name))
+            ) d
+            WHERE group_size > 1
+        )
+        ORDER BY group_first, name
+    """).fetchall()
 
-    # Group by normalized name
     groups = defaultdict(list)
     for e in entities:
-        groups[normalize(e['name'])].append(e)
-
-    merges = []
-    for norm, entries in groups.items():
-        if len(entries) < 2:
-            continue
-
-        # Pick the primary: most facts, then prefer human-readable name (no dashes)
-        def score(e):
-            fc = db.execute(
-                'SELECT COUNT(*) FROM facts WHERE entity_id = ? AND valid_to IS NULL',
-                (e['id'],)
-            ).fetchone()[0]
-            readable = 0 if '-' in e['name'] or '_' in e['name'] else 1
-            return (fc, readable, e['name'])
-
-        ranked = sorted(entries, key=score, reverse=True)
-        primary = ranked[0]
-        for secondary in ranked[1:]:
-            merges.append((primary['id'], primary['name'], secondary['id'], secondary['name']))
-
-    # Add semantic merges
+        groups[e['norm']].append(e)
+
+    fact_counts = {e['id']: e['fact_count'] for e in entities}
+    ranked_out = {e['id'] for e in entities if e['rn'] > 1}
+
+    # Union-find over every duplicate edge (normalization groups + semantic
+    # pairs) so chains like A~B, B~C collapse into one component.
+    parent = {}
+    names_by_id = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        for x in (a, b):
+            parent.setdefault(x, x)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    for entries in groups.values():
+        for e in entries:
+            names_by_id[e['id']] = e['name']
+            union(entries[0]['id'], e['id'])
+
+    # Semantic merges (every configured name resolved in one query)
+    names = list({n for pair in SEMANTIC_MERGES for n in pair})
+    name_ids = {}
+    if names:
+        for row in db.execute(f"""
+            SELECT name, id, (SELECT COUNT(*) FROM facts f
+                              WHERE f.entity_id = e.id AND f.valid_to IS NULL) AS fact_count
+            FROM entities e WHERE name IN ({",".join("?" * len(names))})
+        """, names):
+            name_ids.setdefault(row['name'], row['id'])
+            fact_counts.setdefault(row['id'], row['fact_count'])
+    canonical_ids = set()
     for canonical, duplicate in SEMANTIC_MERGES:
-        canon = db.execute('SELECT id FROM entities WHERE name = ?', (canonical,)).fetchone()
-        dupe = db.execute('SELECT id FROM entities WHERE name = ?', (duplicate,)).fetchone()
-        if canon and dupe:
-            # Don't add if already covered by normalization
-            pair = (canon['id'], dupe['id'])
-            existing_pairs = {(m[0], m[2]) for m in merges}
-            if pair not in existing_pairs:
-                merges.append((canon['id'], canonical, dupe['id'], duplicate))
+        canon_id, dupe_id = name_ids.get(canonical), name_ids.get(duplicate)
+        if canon_id and dupe_id and canon_id != dupe_id:
+            names_by_id[canon_id], names_by_id[dupe_id] = canonical, duplicate
+            canonical_ids.add(canon_id)
+            union(canon_id, dupe_id)
+
+    components = defaultdict(list)
+    for eid in parent:  # insertion order: normalization groups first, then semantic
+        components[find(eid)].append(eid)
+
+    # Pick each primary: a configured canonical name, then most facts, then
+    # human-readable name (no dashes). Only components joined by semantic
+    # pairs have more than one candidate; a plain group's is its rn = 1 row.
+    def score(eid):
+        name = names_by_id[eid]
+        fc = fact_counts.get(eid, 0)
+        readable = 0 if '-' in name or '_' in name else 1
+        return (eid in canonical_ids, fc, readable, name)
+
+    # Secondaries keep discovery order
+    merges = []
+    for members in components.values():
+        primary = max((m for m in members if m in canonical_ids or m not in ranked_out), key=score)
+        for secondary in members:
+            if secondary != primary:
+                merges.append((primary, names_by_id[primary], secondary, names_by_id[secondary]))
 
     return merges
 
 
-def merge_entity(db, keep_id: str, keep_name: str, merge_id: str, merge_name: str, dry: bool) -> dict:
-    """Merge merge_id into keep_id."""
-    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    stats = {"facts_moved": 0, "facts_skipped": 0, "relations_moved": 0, "domains_moved": 0}
+def merge_all(db, merges: list[tuple[str, str, str, str]], dry: bool) -> list[dict]:
+    """Merge every (keep_id, keep_name, merge_id, merge_name) pair with set statements.
 
-    # 1. Move facts (skip if same attribute already exists on primary)
-    facts = db.execute(
-        'SELECT * FROM facts WHERE entity_id = ?', (merge_id,)
-    ).fetchall()
-
-    for f in facts:
-        existing = db.execute(
-            'SELECT id FROM facts WHERE entity_id = ? AND attribute = ? AND valid_to IS NULL',
-            (keep_id, f['attribute'])
-        ).fetchone()
-
-        if existing and f['valid_to'] is None:
-            # Primary already has a current fact for this attribute — skip
-            stats["facts_skipped"] += 1
-            continue
-
-        if not dry:
-            db.execute('UPDATE facts SET entity_id = ? WHERE id = ?', (keep_id, f['id']))
-        stats["facts_moved"] += 1
-
-    # 2. Move relations (re-point from/to)
-    rels_from = db.execute(
-        'SELECT id FROM relations WHERE from_entity_id = ?', (merge_id,)
-    ).fetchall()
-    rels_to = db.execute(
-        'SELECT id FROM relations WHERE to_entity_id = ?', (merge_id,)
-    ).fetchall()
-
-    for r in rels_from:
-        if not dry:
-            db.execute('UPDATE relations SET from_entity_id = ? WHERE id = ?', (keep_id, r['id']))
-        stats["relations_moved"] += 1
-    for r in rels_to:
-        if not dry:
-            db.execute('UPDATE relations SET to_entity_id = ? WHERE id = ?', (keep_id, r['id']))
-        stats["relations_moved"] += 1
-
-    # 3. Move domain assignments
-    domains = db.execute(
-        'SELECT domain, confidence FROM entity_domains WHERE entity_id = ?', (merge_id,)
-    ).fetchall()
-
-    for d in domains:
-        existing = db.execute(
-            'SELECT confidence FROM entity_domains WHERE entity_id = ? AND domain = ?',
-            (keep_id, d['domain'])
-        ).fetchone()
-
-        if existing:
-            # Keep higher confidence
-            if d['confidence'] > existing['confidence']:
-                if not dry:
-                    db.execute(
-                        'UPDATE entity_domains SET confidence = ? WHERE entity_id = ? AND domain = ?',
-                        (d['confidence'], keep_id, d['domain'])
-                    )
-                stats["domains_moved"] += 1
+    Gives the same result as merging the pairs one at a time in list order;
+    returns each pair's stats in that order.
+    """
+    db.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS merge_map (
+            merge_id TEXT PRIMARY KEY, keep_id TEXT NOT NULL, seq INTEGER NOT NULL)
+    """)
+    db.execute("DELETE FROM merge_map")
+    db.executemany("INSERT INTO merge_map VALUES (?, ?, ?)",
+                   [(merge_id, keep_id, i) for i, (keep_id, _, merge_id, _) in enumerate(merges)])
+    stats = {m[2]: {"facts_moved": 0, "facts_skipped": 0, "relations_moved": 0, "domains_moved": 0}
+             for m in merges}
+
+    # 1. Move facts (skip if same attribute already exists on primary). In
+    # merge order, then rowid, the first current fact moved for an attribute
+    # the primary lacked makes it "already exist" for every later one (rn = 1).
+    # A dry run changes nothing, so each is judged against the primary alone.
+    first_only = "" if dry else "AND c.rn = 1"
+    moves = []
+    for row in db.execute(f"""
+        WITH c AS (
+            SELECT f.id, f.attribute, f.valid_to, m.merge_id, m.keep_id,
+                   ROW_NUMBER() OVER (PARTITION BY m.keep_id, f.attribute, f.valid_to IS NULL
+                                      ORDER BY m.seq, f.rowid) AS rn
+            FROM facts f JOIN merge_map m ON f.entity_id = m.merge_id
+        )
+        SELECT c.id, c.merge_id, c.keep_id,
+               c.valid_to IS NOT NULL
+               OR (NOT EXISTS (SELECT 1 FROM facts k
+                               WHERE k.entity_id = c.keep_id AND k.attribute = c.attribute
+                                 AND k.valid_to IS NULL) {first_only}) AS moves
+        FROM c
+    """):
+        if row['moves']:
+            stats[row['merge_id']]["facts_moved"] += 1
+            moves.append((row['keep_id'], row['id']))
         else:
-            if not dry:
-                db.execute(
-                    'INSERT INTO entity_domains (entity_id, domain, confidence, source) VALUES (?, ?, ?, ?)',
-                    (keep_id, d['domain'], d['confidence'], 'reconcile')
-                )
-            stats["domains_moved"] += 1
-
-    # 4. Delete secondary entity and its domain assignments
+            stats[row['merge_id']]["facts_skipped"] += 1
+    if moves and not dry:
+        db.executemany('UPDATE facts SET entity_id = ? WHERE id = ?', moves)
+
+    # 2. Move relations (re-point from/to in one statement). Counted per
+    # re-pointed endpoint, so a self-relation counts twice
+    for merge_id, n in db.execute("""
+        SELECT m.merge_id, SUM((r.from_entity_id = m.merge_id) + (r.to_entity_id = m.merge_id))
+        FROM merge_map m
+        JOIN relations r ON r.from_entity_id = m.merge_id OR r.to_entity_id = m.merge_id
+        GROUP BY m.merge_id
+    """):
+        stats[merge_id]["relations_moved"] = n
+    if not dry:
+        db.execute("""
+            UPDATE relations SET
+                from_entity_id = COALESCE((SELECT keep_id FROM merge_map WHERE merge_id = from_entity_id),
+                                          from_entity_id),
+                to_entity_id = COALESCE((SELECT keep_id FROM merge_map WHERE merge_id = to_entity_id),
+                                        to_entity_id)
+            WHERE from_entity_id IN (SELECT merge_id FROM merge_map)
+               OR to_entity_id IN (SELECT merge_id FROM merge_map)
+        """)
+
+    # 3. Move domain assignments: new domains are added, shared ones keep the
+    # highest confidence. An assignment counts when it beats the primary's and
+    # (merging in order) every earlier merged entity's for that domain.
+    earlier = "" if dry else """
+          AND NOT EXISTS (SELECT 1 FROM entity_domains e JOIN merge_map p ON e.entity_id = p.merge_id
+                          WHERE p.keep_id = m.keep_id AND p.seq < m.seq
+                            AND e.domain = d.domain AND e.confidence >= d.confidence)"""
+    for merge_id, n in db.execute(f"""
+        SELECT m.merge_id, COUNT(*) FROM entity_domains d
+        JOIN merge_map m ON d.entity_id = m.merge_id
+        WHERE NOT EXISTS (SELECT 1 FROM entity_domains k
+                          WHERE k.entity_id = m.keep_id AND k.domain = d.domain
+                            AND k.confidence >= d.confidence){earlier}
+        GROUP BY m.merge_id
+    """):
+        stats[merge_id]["domains_moved"] = n
     if not dry:
-        db.execute('DELETE FROM entity_domains WHERE entity_id = ?', (merge_id,))
-        db.execute('DELETE FROM entities WHERE id = ?', (merge_id,))
+        db.execute("""
+            INSERT INTO entity_domains (entity_id, domain, confidence, source)
+            SELECT m.keep_id, d.domain, MAX(d.confidence), 'reconcile'
+            FROM entity_domains d JOIN merge_map m ON d.entity_id = m.merge_id
+            GROUP BY m.keep_id, d.domain
+            ON CONFLICT(entity_id, domain) DO UPDATE SET confidence = excluded.confidence
+            WHERE excluded.confidence > entity_domains.confidence
+        """)
+
+    # 4. Delete secondary entities and their domain assignments
+    if not dry:
+        db.execute("DELETE FROM entity_domains WHERE entity_id IN (SELECT merge_id FROM merge_map)")
+        db.execute("DELETE FROM entities WHERE id IN (SELECT merge_id FROM merge_map)")
+
+    return [stats[m[2]] for m in merges]
 
-    return stats
+
+_ORPHAN_PREDICATE = """
+    NOT EXISTS (SELECT 1 FROM facts f WHERE f.entity_id = e.id)
+    AND NOT EXISTS (SELECT 1 FROM relations r WHERE r.from_entity_id = e.id OR r.to_entity_id = e.id)
+"""
 
 
 def prune_orphans(db, dry: bool) -> int:
     """Remove entities with no facts and no relations."""
-    orphans = db.execute("""
-        SELECT e.id, e.name, e.type FROM entities e
-        WHERE NOT EXISTS (SELECT 1 FROM facts f WHERE f.entity_id = e.id)
-        AND NOT EXISTS (SELECT 1 FROM relations r WHERE r.from_entity_id = e.id OR r.to_entity_id = e.id)
-    """).fetchall()
+    count = db.execute(f"SELECT COUNT(*) FROM entities e WHERE {_ORPHAN_PREDICATE}").fetchone()[0]
 
-    if orphans:
-        print(f"\n  Orphan entities ({len(orphans)}):")
-        for o in orphans[:20]:
+    if count:
+        print(f"\n  Orphan entities ({count}):")
+        for o in db.execute(f"SELECT e.name, e.type FROM entities e WHERE {_ORPHAN_PREDICATE} LIMIT 20"):
             print(f"    {o['name']} ({o['type']})")
-        if len(orphans) > 20:
-            print(f"    ... and {len(orphans) - 20} more")
+        if count > 20:
+            print(f"    ... and {count - 20} more")
 
         if not dry:
-            for o in orphans:
-                db.execute('DELETE FROM entity_domains WHERE entity_id = ?', (o['id'],))
-                db.execute('DELETE FROM entities WHERE id = ?', (o['id'],))
+            # Set-based deletes; domains first while the orphans still exist
+            db.execute(f"""
+                DELETE FROM entity_domains WHERE entity_id IN (
+                    SELECT e.id FROM entities e WHERE {_ORPHAN_PREDICATE})
+            """)
+            db.execute(f"DELETE FROM entities WHERE id IN (SELECT e.id FROM entities e WHERE {_ORPHAN_PREDICATE})")
 
-    return len(orphans)
+    return count
 
 
-def main():
-    dry = "--dry" in sys.argv
-    do_prune = "--prune" in sys.argv
+def _ensure_indexes(db):
+    """Endpoint indexes the merge and prune queries filter on.
 
-    db = sqlite3.connect(DB_PATH)
-    db.row_factory = sqlite3.Row
-
-    if dry:
-        print("DRY RUN — no changes will be made\n")
-
-    # Find and merge duplicates
+    facts(entity_id) and entity_domains(entity_id) come from schema.sql; the
+    per-side relation indexes are added by extract.py's migration, which a DB
+    reconciled before its next extraction may not have had yet. Same names,
+    so either side creating them first is fine. A one-time ANALYZE gives the
+    planner statistics to choose them.
+    """
+    db.execute("CREATE INDEX IF NOT EXISTS idx_facts_entity ON facts(entity_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_entity_domains_entity ON entity_domains(entity_id)")
+    for side in ("from", "to"):
+        db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_relations_{side}_entity ON relations({side}_entity_id)"
+        )
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        db.execute("ANALYZE")
+    db.commit()
+
+
+def _restore_unique_name_index(db):
+    """Swap extract.py's non-unique lower(name) fallback for the UNIQUE index.
+
+    extract.py only builds idx_entities_name_lower_dup when duplicate names
+    block the UNIQUE index, and doesn't retry while it exists; with the
+    duplicates merged, the UNIQUE build can succeed now.
+    """
+    if not db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_entities_name_lower_dup'"
+    ).fetchone():
+        return
+    try:
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_name_lower ON entities(lower(name))")
+    except sqlite3.IntegrityError:
+        return  # Names differing only in ways normalize() keeps apart; keep the fallback
+    db.execute("DROP INDEX idx_entities_name_lower_dup")
+    db.commit()
+
+
+def _reconcile(db, dry: bool, do_prune: bool):
+    """Find and merge duplicates, then optionally prune orphans."""
     merges = find_duplicates(db)
 
     if not merges:
@@ -199,22 +322,13 @@ def main():
         print(f"Found {len(merges)} duplicate pairs to merge:\n")
 
         total_stats = {"facts_moved": 0, "facts_skipped": 0, "relations_moved": 0, "domains_moved": 0}
-        merged_ids = set()  # Track already-merged entity IDs
-
-        for keep_id, keep_name, merge_id, merge_name in merges:
-            if merge_id in merged_ids:
-                print(f"  Skip: {merge_name} (already merged)")
-                continue
-            if keep_id in merged_ids:
-                print(f"  Skip: {keep_name} → {merge_name} (primary was merged into another entity)")
-                continue
-            stats = merge_entity(db, keep_id, keep_name, merge_id, merge_name, dry)
+
+        for (keep_id, keep_name, merge_id, merge_name), stats in zip(merges, merge_all(db, merges, dry)):
             action = "Would merge" if dry else "Merged"
             print(f"  {action}: {merge_name} → {keep_name}  "
                   f"({stats['facts_moved']}f moved, {stats['facts_skipped']}f skipped, "
                   f"{stats['relations_moved']}r, {stats['domains_moved']}d)")
 
-            merged_ids.add(merge_id)
             for k in total_stats:
                 total_stats[k] += stats[k]
 
@@ -229,8 +343,40 @@ def main():
         action = "Would prune" if dry else "Pruned"
         print(f"\n  {action} {pruned} orphan entities")
 
+
+def main():
+    dry = "--dry" in sys.argv
+    do_prune = "--prune" in sys.argv
+
+    db = sqlite3.connect(DB_PATH)
+    db.row_factory = sqlite3.Row
+    db.executescript(f"""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size={SQLITE_CACHE_SIZE};
+    """)
+
+    if dry:
+        print("DRY RUN — no changes will be made\n")
+    else:
+        _ensure_indexes(db)
+        # One write transaction for detection, every merge and the prune:
+        # a single commit, and no other writer can slip in between them
+        db.execute("BEGIN IMMEDIATE")
+
+    try:
+        _reconcile(db, dry, do_prune)
+    except BaseException:
+        if db.in_transaction:
+            db.rollback()
+        raise
+
     if not dry:
         db.commit()
+        _restore_unique_name_index(db)
+        # Refresh planner stats the merges made stale
+        db.execute("PRAGMA optimize")
 
     # Summary
     entity_count = db.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
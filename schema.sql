@@ -55,9 +55,16 @@ CREATE TABLE IF NOT EXISTS entity_domains (
 CREATE INDEX IF NOT EXISTS idx_facts_entity ON facts(entity_id);
 CREATE INDEX IF NOT EXISTS idx_facts_current ON facts(entity_id, attribute) WHERE valid_to IS NULL;
 CREATE INDEX IF NOT EXISTS idx_facts_attribute ON facts(attribute, value);
-CREATE INDEX IF NOT EXISTS idx_relations_from ON relations(from_entity_id) WHERE valid_to IS NULL;
-CREATE INDEX IF NOT EXISTS idx_relations_to ON relations(to_entity_id) WHERE valid_to IS NULL;
+CREATE INDEX IF NOT EXISTS idx_relations_from_type ON relations(from_entity_id, relation_type) WHERE valid_to IS NULL;
+CREATE INDEX IF NOT EXISTS idx_relations_to_type ON relations(to_entity_id, relation_type) WHERE valid_to IS NULL;
+CREATE INDEX IF NOT EXISTS idx_relations_from_entity ON relations(from_entity_id);
+CREATE INDEX IF NOT EXISTS idx_relations_to_entity ON relations(to_entity_id);
 CREATE INDEX IF NOT EXISTS idx_decisions_status ON decisions(status);
 CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name COLLATE NOCASE);
 CREATE INDEX IF NOT EXISTS idx_entity_domains_domain ON entity_domains(domain);
 CREATE INDEX IF NOT EXISTS idx_entity_domains_entity ON entity_domains(entity_id);
+
+-- Case-insensitive name lookups and the entity UPSERT (extract.py). Last, so an
+-- older DB whose duplicate names block it still gets everything above; extract.py
+-- then falls back to a non-unique idx_entities_name_lower_dup until reconcile.py merges them.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_name_lower ON entities(lower(name));
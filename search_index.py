@@ -0,0 +1,130 @@
+"""
+Trigram full-text index behind `kb search`.
+
+kb_fts is an FTS5 trigram index over fact, decision and entity text. A quoted
+trigram phrase matches exactly the substrings LIKE '%term%' finds, but through
+the index instead of a scan of every row. Kept current by triggers, so rows
+written by extract.py, reconcile.py etc. are indexed too. kb_fts_map gives each
+(kind, ref) an integer id used as its kb_fts rowid: the triggers find an FTS
+row through that B-tree, never by scanning kb_fts.
+
+Writers build it from their schema migration (extract.py); readers only check
+that it exists and otherwise fall back to LIKE.
+
+Usage:
+    from search_index import ensure_search_index, has_search_index, search_match
+"""
+
+import sqlite3
+import sys
+
+SEARCH_INDEX_SOURCES = (
+    # (kind, table, title column, body column)
+    ("fact", "facts", "attribute", "value"),
+    ("decision", "decisions", "title", "rationale"),
+    ("entity", "entities", "name", None),
+)
+
+
+def _search_index_schema() -> str:
+    """DDL and backfill for kb_fts, kb_fts_map and their triggers."""
+    parts = ["""
+        CREATE TABLE kb_fts_map (
+            id INTEGER PRIMARY KEY, kind TEXT NOT NULL, ref TEXT NOT NULL, UNIQUE (kind, ref)
+        );
+        CREATE VIRTUAL TABLE kb_fts USING fts5(title, body, tokenize='trigram');
+    """]
+    for kind, table, title, body in SEARCH_INDEX_SOURCES:
+        body_new, body_set = (f"new.{body}", f", body = new.{body}") if body else ("NULL", "")
+        rowid = f"(SELECT id FROM kb_fts_map WHERE kind = '{kind}' AND ref = {{row}}.id)"
+        parts.append(f"""
+        INSERT INTO kb_fts_map (kind, ref) SELECT '{kind}', id FROM {table};
+        INSERT INTO kb_fts (rowid, title, body)
+            SELECT m.id, t.{title}, {f"t.{body}" if body else "NULL"} FROM {table} t
+            JOIN kb_fts_map m ON m.kind = '{kind}' AND m.ref = t.id;
+
+        CREATE TRIGGER kb_fts_{table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO kb_fts_map (kind, ref) VALUES ('{kind}', new.id);
+            INSERT INTO kb_fts (rowid, title, body) VALUES ({rowid.format(row="new")}, new.{title}, {body_new});
+        END;
+        CREATE TRIGGER kb_fts_{table}_au AFTER UPDATE OF {title}{f", {body}" if body else ""} ON {table} BEGIN
+            UPDATE kb_fts SET title = new.{title}{body_set} WHERE rowid = {rowid.format(row="old")};
+        END;
+        CREATE TRIGGER kb_fts_{table}_ad AFTER DELETE ON {table} BEGIN
+            DELETE FROM kb_fts WHERE rowid = {rowid.format(row="old")};
+            DELETE FROM kb_fts_map WHERE kind = '{kind}' AND ref = old.id;
+        END;
+        """)
+    return "".join(parts)
+
+
+def _fts_supported(db: sqlite3.Connection) -> bool:
+    """Whether this SQLite has FTS5 with the trigram tokenizer (probed in the temp schema)."""
+    try:
+        db.execute("CREATE VIRTUAL TABLE temp.kb_fts_probe USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    db.execute("DROP TABLE temp.kb_fts_probe")
+    return True
+
+
+def ensure_search_index(db: sqlite3.Connection) -> bool:
+    """Build kb_fts (one-time backfill) on a writable connection; True if present.
+
+    Replaces the earlier layout (kind/ref as UNINDEXED kb_fts columns, which
+    made every trigger scan the index). On a SQLite without FTS5/trigram the
+    kb_fts_unsupported marker records its version, so later connections skip
+    the attempt until SQLite is upgraded; search then scans with LIKE.
+    """
+    if has_search_index(db):
+        return True
+    marker = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='kb_fts_unsupported'"
+    ).fetchone()
+    if marker and db.execute("SELECT 1 FROM kb_fts_unsupported WHERE sqlite_version = ?",
+                             (sqlite3.sqlite_version,)).fetchone():
+        return False
+    if not _fts_supported(db):
+        print(f"Warning: SQLite {sqlite3.sqlite_version} lacks FTS5 trigram support; "
+              "kb search will scan with LIKE", file=sys.stderr)
+        try:
+            db.executescript(f"""
+                BEGIN IMMEDIATE;
+                CREATE TABLE IF NOT EXISTS kb_fts_unsupported (sqlite_version TEXT NOT NULL);
+                DELETE FROM kb_fts_unsupported;
+                INSERT INTO kb_fts_unsupported VALUES ('{sqlite3.sqlite_version}');
+                COMMIT;
+            """)
+        except sqlite3.OperationalError:  # locked: recorded by a later connection
+            if db.in_transaction:
+                db.rollback()
+        return False
+    drops = "".join(f"DROP TRIGGER IF EXISTS kb_fts_{table}_{op};"
+                    for _, table, _, _ in SEARCH_INDEX_SOURCES for op in ("ai", "au", "ad"))
+    try:
+        db.executescript(f"BEGIN IMMEDIATE; {drops} DROP TABLE IF EXISTS kb_fts; "
+                         "DROP TABLE IF EXISTS kb_fts_unsupported; "
+                         f"{_search_index_schema()} COMMIT;")
+    except sqlite3.OperationalError:
+        # Another process built it first ("already exists")
+        if db.in_transaction:
+            db.rollback()
+    return has_search_index(db)
+
+
+def has_search_index(db: sqlite3.Connection) -> bool:
+    """Whether the kb_fts search index exists (read-only check, never builds it)."""
+    return db.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('kb_fts', 'kb_fts_map')"
+    ).fetchone()[0] == 2
+
+
+def search_match(query: str) -> str | None:
+    """FTS5 phrase equivalent to LIKE '%query%', or None if LIKE must be used.
+
+    Trigrams need 3+ characters, and % / _ are LIKE wildcards the phrase
+    would take literally.
+    """
+    if len(query) < 3 or "%" in query or "_" in query:
+        return None
+    return '"' + query.replace('"', '""') + '"'
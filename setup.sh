@@ -45,8 +45,11 @@ if [ ! -f "$CONFIG_FILE" ]; then
     echo "  Config: $CONFIG_FILE (created from template — edit to customize)"
 fi
 
-# Apply schema (IF NOT EXISTS makes this idempotent)
-sqlite3 "$DB_PATH" < "$REPO_DIR/schema.sql"
+# Apply schema (IF NOT EXISTS makes this idempotent). On an existing DB with
+# case-insensitive duplicate names only the final UNIQUE index can fail.
+if ! sqlite3 "$DB_PATH" < "$REPO_DIR/schema.sql"; then
+    echo "  Warning: schema applied with errors (duplicate entity names? run reconcile.py)"
+fi
 echo "  Database: $DB_PATH"
 
 # Symlink scripts
@@ -0,0 +1,110 @@
+"""Tests for extract.py's database writes (stdlib unittest, in-memory DB)."""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extract  # noqa: E402
+
+
+def _memory_db():
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.executescript((Path(extract.__file__).parent / "schema.sql").read_text())
+    extract._migrate_schema(db)
+    return db
+
+
+class UpsertExtractionsTest(unittest.TestCase):
+    def test_non_string_fact_values(self):
+        db = _memory_db()
+        extractions = {
+            "entities": [{"name": "Widget", "type": "tool"}],
+            "facts": [
+                {"entity_name": "Widget", "attribute": "port", "value": 49},
+                {"entity_name": "Widget", "attribute": "enabled", "value": True},
+            ],
+        }
+        stats = extract.upsert_extractions(db, extractions, "test", "2026-01-01")
+        db.commit()
+        self.assertEqual(stats["facts"], 2)
+        self.assertEqual(
+            db.execute("SELECT value FROM facts WHERE attribute = 'port'").fetchone()[0], "49"
+        )
+
+        # Re-asserting the same number compares against the stored TEXT value
+        again = {"facts": [{"entity_name": "Widget", "attribute": "port", "value": 49}]}
+        stats = extract.upsert_extractions(db, again, "test", "2026-01-02")
+        self.assertEqual((stats["facts"], stats["superseded"]), (0, 0))
+
+
+class MergeExtractionsTest(unittest.TestCase):
+    def test_malformed_entries_are_skipped(self):
+        merged = extract.merge_extractions([
+            {"entities": [{"name": "Widget"}, {"type": "tool"}, {"name": None}],
+             "decisions": [{"title": 7}, {"title": "Ship it"}]},
+            "not a dict",
+            {"entities": [{"name": "widget"}, {"name": "Gadget"}],
+             "decisions": [{"rationale": "no title"}, {"title": "ship it"}]},
+        ])
+        self.assertEqual([e["name"] for e in merged["entities"]], ["Widget", "Gadget"])
+        self.assertEqual([d["title"] for d in merged["decisions"]], ["Ship it"])
+
+
+class IncrementalParseTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "session.jsonl")
+
+    def _append(self, start, count):
+        with open(self.path, "a") as f:
+            for i in range(start, start + count):
+                role = "user" if i % 2 == 0 else "assistant"
+                f.write(json.dumps({"type": role, "message": {"content": f"message {i}"}}) + "\n")
+
+    def _run(self, offsets, context_overlap=None):
+        transcript, start, end, resume_at = extract.parse_session_incremental(
+            self.path, offsets=offsets, context_overlap=context_overlap)
+        extract.save_session_offset(self.path, end, resume_at, offsets)
+        return transcript, start, end
+
+    def test_resume_after_saved_offset(self):
+        overlap = extract.CONTEXT_OVERLAP
+        offsets = extract.OffsetStore()
+        offsets._offsets = {}  # never touch the real offsets file
+        self._append(0, overlap + 5)
+        transcript, start, end = self._run(offsets)
+        self.assertEqual((start, end), (0, overlap + 4))
+
+        self._append(overlap + 5, 3)
+        transcript, start, end = self._run(offsets)
+        self.assertEqual((start, end), (overlap + 5, overlap + 7))
+        context, new = transcript.split(extract._NEW_MESSAGES_MARKER)
+        self.assertIn("message 5\n", context)  # exactly CONTEXT_OVERLAP back
+        self.assertNotIn("message 4\n", context)
+        self.assertIn(f"message {overlap + 7}", new)
+
+        # A run without raw overlap (source summary) must not shrink the
+        # context a later raw-overlap run gets
+        self._append(overlap + 8, 2)
+        transcript, start, end = self._run(offsets, context_overlap=0)
+        self.assertNotIn(extract._NEW_MESSAGES_MARKER, transcript)
+        self._append(overlap + 10, 1)
+        transcript, start, end = self._run(offsets)
+        context = transcript.split(extract._NEW_MESSAGES_MARKER)[0]
+        self.assertIn("message 10\n", context)
+        self.assertNotIn("message 9\n", context)
+
+        transcript, start, end = self._run(offsets)
+        self.assertEqual(transcript, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
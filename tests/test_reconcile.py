@@ -0,0 +1,117 @@
+"""Tests for reconcile.py's set-based merges (stdlib unittest, in-memory DB)."""
+
+import random
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import reconcile  # noqa: E402
+
+DOMAINS = ("KH", "Personal", "Infrastructure", "VSS")
+
+
+def _random_db(rng: random.Random) -> tuple[sqlite3.Connection, list]:
+    """Small random graph plus merge pairs (keeps are never merged themselves)."""
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.executescript((Path(reconcile.__file__).parent / "schema.sql").read_text())
+    ids = [f"e{i}" for i in range(rng.randint(3, 8))]
+    for i in ids:
+        db.execute("INSERT INTO entities (id, name, type) VALUES (?, ?, 'tool')", (i, f"name {i}"))
+    for n in range(rng.randint(0, 20)):
+        db.execute(
+            "INSERT INTO facts (id, entity_id, attribute, value, valid_from, valid_to) "
+            "VALUES (?, ?, ?, 'v', '2026-01-01', ?)",
+            (f"f{n}", rng.choice(ids), rng.choice("abc"), rng.choice([None, None, "2026-02-01"])))
+    for n in range(rng.randint(0, 10)):
+        db.execute(
+            "INSERT INTO relations (id, from_entity_id, relation_type, to_entity_id, valid_from) "
+            "VALUES (?, ?, 'uses', ?, '2026-01-01')",
+            (f"r{n}", rng.choice(ids), rng.choice(ids)))
+    for i in ids:
+        for domain in rng.sample(DOMAINS, rng.randint(0, 2)):
+            db.execute("INSERT INTO entity_domains (entity_id, domain, confidence) VALUES (?, ?, ?)",
+                       (i, domain, rng.choice([0.5, 0.8, 1.0])))
+    shuffled = rng.sample(ids, len(ids))
+    keeps, merged = shuffled[:rng.randint(1, 2)], shuffled[2:]
+    merges = []
+    for m in merged:
+        k = rng.choice(keeps)
+        merges.append((k, f"name {k}", m, f"name {m}"))
+    return db, merges
+
+
+def _merge_sequentially(db, keep_id, merge_id, dry) -> dict:
+    """The row-at-a-time merge merge_all replaced, as the reference."""
+    stats = {"facts_moved": 0, "facts_skipped": 0, "relations_moved": 0, "domains_moved": 0}
+    for f in db.execute("SELECT * FROM facts WHERE entity_id = ? ORDER BY rowid", (merge_id,)).fetchall():
+        existing = db.execute(
+            "SELECT id FROM facts WHERE entity_id = ? AND attribute = ? AND valid_to IS NULL",
+            (keep_id, f["attribute"])).fetchone()
+        if existing and f["valid_to"] is None:
+            stats["facts_skipped"] += 1
+            continue
+        if not dry:
+            db.execute("UPDATE facts SET entity_id = ? WHERE id = ?", (keep_id, f["id"]))
+        stats["facts_moved"] += 1
+    for side in ("from", "to"):
+        for r in db.execute(f"SELECT id FROM relations WHERE {side}_entity_id = ?", (merge_id,)).fetchall():
+            if not dry:
+                db.execute(f"UPDATE relations SET {side}_entity_id = ? WHERE id = ?", (keep_id, r["id"]))
+            stats["relations_moved"] += 1
+    for d in db.execute("SELECT domain, confidence FROM entity_domains WHERE entity_id = ?",
+                        (merge_id,)).fetchall():
+        existing = db.execute("SELECT confidence FROM entity_domains WHERE entity_id = ? AND domain = ?",
+                              (keep_id, d["domain"])).fetchone()
+        if existing and d["confidence"] <= existing["confidence"]:
+            continue
+        if not dry:
+            db.execute(
+                "INSERT INTO entity_domains (entity_id, domain, confidence, source) VALUES (?, ?, ?, 'reconcile') "
+                "ON CONFLICT(entity_id, domain) DO UPDATE SET confidence = excluded.confidence",
+                (keep_id, d["domain"], d["confidence"]))
+        stats["domains_moved"] += 1
+    if not dry:
+        db.execute("DELETE FROM entity_domains WHERE entity_id = ?", (merge_id,))
+        db.execute("DELETE FROM entities WHERE id = ?", (merge_id,))
+    return stats
+
+
+def _snapshot(db) -> tuple:
+    return (
+        db.execute("SELECT id FROM entities ORDER BY id").fetchall(),
+        db.execute("SELECT id, entity_id FROM facts ORDER BY id").fetchall(),
+        db.execute("SELECT id, from_entity_id, to_entity_id FROM relations ORDER BY id").fetchall(),
+        db.execute("SELECT entity_id, domain, confidence FROM entity_domains ORDER BY 1, 2").fetchall(),
+    )
+
+
+class MergeAllTest(unittest.TestCase):
+    def test_matches_sequential_merges(self):
+        for seed in range(300):
+            for dry in (False, True):
+                with self.subTest(seed=seed, dry=dry):
+                    expected_db, merges = _random_db(random.Random(seed))
+                    actual_db, _ = _random_db(random.Random(seed))
+                    expected = [_merge_sequentially(expected_db, k, m, dry) for k, _, m, _ in merges]
+                    self.assertEqual(reconcile.merge_all(actual_db, merges, dry), expected)
+                    self.assertEqual([tuple(r) for t in _snapshot(actual_db) for r in t],
+                                     [tuple(r) for t in _snapshot(expected_db) for r in t])
+
+    def test_self_relation_counts_both_endpoints(self):
+        db, _ = _random_db(random.Random(0))
+        db.execute("DELETE FROM relations")
+        db.execute("INSERT INTO entities (id, name, type) VALUES ('k', 'keep', 'tool'), ('m', 'dup', 'tool')")
+        db.execute("INSERT INTO relations (id, from_entity_id, relation_type, to_entity_id, valid_from) "
+                   "VALUES ('self', 'm', 'uses', 'm', '2026-01-01')")
+        [stats] = reconcile.merge_all(db, [("k", "keep", "m", "dup")], dry=False)
+        self.assertEqual(stats["relations_moved"], 2)
+        self.assertEqual(tuple(db.execute("SELECT from_entity_id, to_entity_id FROM relations").fetchone()),
+                         ("k", "k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
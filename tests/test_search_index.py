@@ -0,0 +1,72 @@
+"""Tests for the kb_fts search index and `kb search` (stdlib unittest, temp DB)."""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import kb  # noqa: E402
+import search_index  # noqa: E402
+
+
+class SearchMatchTest(unittest.TestCase):
+    def test_phrase_or_like_fallback(self):
+        self.assertEqual(search_index.search_match('say "hi"'), '"say ""hi"""')
+        self.assertIsNone(search_index.search_match("ab"))  # Shorter than a trigram
+        self.assertIsNone(search_index.search_match("50%"))
+        self.assertIsNone(search_index.search_match("snake_case"))
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "knowledge.db")
+        db = sqlite3.connect(self.path)
+        db.executescript((Path(kb.__file__).parent / "schema.sql").read_text())
+        if not search_index.ensure_search_index(db):
+            self.skipTest("SQLite without FTS5 trigram support")
+        db.executescript("""
+            INSERT INTO entities (id, name, type) VALUES
+                ('e1', 'Payment Service', 'project'), ('e2', 'Payroll', 'tool'), ('e3', 'Old', 'tool');
+            INSERT INTO facts (id, entity_id, attribute, value, valid_from, valid_to) VALUES
+                ('f1', 'e1', 'provider', 'Stripe payments', '2026-01-01', NULL),
+                ('f2', 'e1', 'provider', 'PayPal', '2025-01-01', '2026-01-01'),
+                ('f3', 'e2', 'payment_day', 'the 25th', '2026-01-01', NULL);
+            INSERT INTO decisions (id, title, rationale, decided_at) VALUES
+                ('d1', 'Switch payment provider', 'Lower fees on Payment links', '2026-01-02');
+            UPDATE facts SET value = 'Stripe payouts' WHERE id = 'f3';
+            DELETE FROM entities WHERE id = 'e3';
+        """)
+        db.close()
+        patcher = mock.patch.object(kb, "DB_PATH", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, query: str) -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.suppress(SystemExit):  # exit 1: no results
+            kb.cmd_search(argparse.Namespace(query=query))
+        return out.getvalue()
+
+    def test_index_matches_like_scan(self):
+        for query in ("payment", "PAY", "stripe pay", "Old", "nothing here"):
+            with self.subTest(query=query):
+                indexed = self._search(query)
+                with mock.patch.object(kb, "has_search_index", return_value=False):
+                    self.assertEqual(indexed, self._search(query))
+        self.assertIn("[Payroll] payment_day: Stripe payouts", self._search("payouts"))
+        self.assertNotIn("PayPal", self._search("paypal"))  # Superseded fact
+        self.assertNotIn("Old", self._search("old"))  # Deleted entity
+
+
+if __name__ == "__main__":
+    unittest.main()